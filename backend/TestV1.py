@@ -1,16 +1,53 @@
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import base64
 import json
 import os
 import logging
 from dotenv import load_dotenv
 from websockets import connect
-from typing import Dict, Optional
-import threading
+from typing import List, Optional, Sequence
 import time
 import pytchat
 import websockets
+try:
+    import httpx  # pytchat's HTTP client
+except ImportError:  # pragma: no cover - only missing with the load-test fake pytchat
+    httpx = None
+from admission import AdmissionController
+from audio_codec import ENCODING_PCM16, SAMPLE_RATE as DOWNSTREAM_SAMPLE_RATE, AudioEncoder, negotiate_audio_encoding
+from audio_coalescer import AudioCoalescer
+from barge_in import TurnTracker
+from chat_digest import ChatDigest
+from frame_filter import FrameFilter
+from gemini_decoder import KIND_AUDIO as PART_AUDIO, KIND_MALFORMED, audio_json_frame, decode_server_message
+from gemini_failover import Backoff, GeminiLink
+from gemini_pool import GeminiPool
+from image_transcoder import ImageTranscoder
+from loop_monitor import LoopMonitor
+from media_queue import MediaQueue
+import metrics
+from moderation import Moderator, load_blocklist, sanitize_for_model
+from timer_wheel import TimerWheel
+from vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
+from session_capture import SOURCE_CLIENT_BINARY, SOURCE_CLIENT_TEXT, SOURCE_GEMINI, SessionRecorder, open_recorder
+from session_registry import create_registry
+from session_state import MODES, Session
+from yt_chat_hub import ChatHub
+from wire_protocol import (
+    KIND_AUDIO,
+    KIND_IMAGE,
+    FLAG_MULAW,
+    PROTOCOL_BINARY,
+    FrameError,
+    decode_frame,
+    encode_frame,
+    kind_name,
+    media_message,
+    negotiate_protocol,
+)
 
 load_dotenv()
 
@@ -31,6 +68,125 @@ if not GEMINI_API_KEY:
 FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000")
 DEBUG_MODE = os.environ.get("DEBUG", "false").lower() == "true"
 
+# Gemini Live endpoint; override to point at a local stand-in (see loadtest/)
+GEMINI_WS_URL = os.environ.get(
+    "GEMINI_WS_URL",
+    "wss://generativelanguage.googleapis.com/ws/"
+    "google.ai.generativelanguage.v1alpha.GenerativeService.BidiGenerateContent",
+)
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash-exp")
+
+# Upstream mic audio batching: window size (0 disables) and hard latency deadline
+AUDIO_COALESCE_MS = float(os.environ.get("AUDIO_COALESCE_MS", "100"))
+AUDIO_COALESCE_MAX_DELAY_MS = float(os.environ.get("AUDIO_COALESCE_MAX_DELAY_MS", "200"))
+
+# Server-side voice activity detection (opt-in): silent mic audio is held
+# back except one chunk every VAD_KEEPALIVE_MS (0 drops it all); pre-roll and
+# hangover keep speech edges intact
+SERVER_VAD = os.environ.get("SERVER_VAD", "false").lower() == "true"
+VAD_THRESHOLD_DB = float(os.environ.get("VAD_THRESHOLD_DB", "-50"))
+VAD_HANGOVER_MS = float(os.environ.get("VAD_HANGOVER_MS", "300"))
+VAD_PREROLL_MS = float(os.environ.get("VAD_PREROLL_MS", "200"))
+VAD_KEEPALIVE_MS = float(os.environ.get("VAD_KEEPALIVE_MS", "1000"))
+
+# Pre-dialed Gemini sessions per (model, voice, systemPrompt); min 0 disables pre-warming
+GEMINI_POOL_MIN = int(os.environ.get("GEMINI_POOL_MIN", "1"))
+GEMINI_POOL_MAX = int(os.environ.get("GEMINI_POOL_MAX", "4"))
+GEMINI_POOL_MAX_IDLE = float(os.environ.get("GEMINI_POOL_MAX_IDLE", "60"))
+
+# Opt-in hot standby: a second Gemini session per client for instant failover,
+# replaying up to GEMINI_FAILOVER_REPLAY_MS of mic audio to the new link
+GEMINI_FAILOVER = os.environ.get("GEMINI_FAILOVER", "false").lower() == "true"
+GEMINI_FAILOVER_REPLAY_MS = float(os.environ.get("GEMINI_FAILOVER_REPLAY_MS", "500"))
+
+# Screen/camera frame dedup on a 32x18 tile grid: a frame is "unchanged" when
+# at most FRAME_DEDUP_THRESHOLD tiles moved by more than FRAME_TILE_DELTA grey
+# levels (negative threshold disables); and the longest gap between forwarded frames
+FRAME_DEDUP_THRESHOLD = int(os.environ.get("FRAME_DEDUP_THRESHOLD", "0"))
+FRAME_TILE_DELTA = int(os.environ.get("FRAME_TILE_DELTA", "4"))
+FRAME_KEYFRAME_INTERVAL = float(os.environ.get("FRAME_KEYFRAME_INTERVAL", "10"))
+
+# Server-side frame downscaling in a process pool: longest edge in pixels
+# (0 disables), JPEG quality, worker processes and concurrent transcodes
+# before new frames are dropped (0 = 2 per worker)
+IMAGE_MAX_EDGE = int(os.environ.get("IMAGE_MAX_EDGE", "1024"))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", "70"))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "2"))
+IMAGE_MAX_INFLIGHT = int(os.environ.get("IMAGE_MAX_INFLIGHT", "0"))
+
+# Per-direction send queues: audio older than the budget is dropped,
+# only the newest image is kept, text/control is never dropped
+UPSTREAM_AUDIO_BUDGET_MS = float(os.environ.get("UPSTREAM_AUDIO_BUDGET_MS", "500"))
+DOWNSTREAM_AUDIO_BUDGET_MS = float(os.environ.get("DOWNSTREAM_AUDIO_BUDGET_MS", "2000"))
+
+# Packet size for model audio when the client negotiated a compressed encoding
+DOWNSTREAM_AUDIO_FRAME_MS = float(os.environ.get("DOWNSTREAM_AUDIO_FRAME_MS", "40"))
+
+# Barge-in: when the user starts speaking over the model, drop the rest of
+# its turn and tell the browser to flush playback ('interrupted')
+BARGE_IN = os.environ.get("BARGE_IN", "true").lower() == "true"
+QUEUE_MAX_AUDIO = int(os.environ.get("QUEUE_MAX_AUDIO", "64"))
+
+# Idle / proactive small-talk thresholds (seconds)
+IDLE_AFTER_S = 10.0
+PROACTIVE_SCREEN_FRESH_S = 5.0
+PROACTIVE_CHAT_QUIET_S = 20.0
+PROACTIVE_COOLDOWN_S = 30.0
+
+# Session registry: 'local' (this worker only) or 'broker' (shared by every
+# worker on the host over REGISTRY_ADDRESS); MAX_SESSIONS caps sessions (0 = no cap)
+REGISTRY_BACKEND = os.environ.get("REGISTRY_BACKEND", "local")
+REGISTRY_ADDRESS = os.environ.get("REGISTRY_ADDRESS", "unix:/tmp/ai-eva-registry.sock")
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "0"))
+
+# Admission control: new sessions per second per worker (token bucket,
+# 0 = unlimited) and burst. Under pressure (loop lag in ms, measured only with
+# LOOP_MONITOR=true, or mean send-queue depth past each of three thresholds)
+# the worker degrades step by step:
+# frames at most every ADMISSION_IMAGE_INTERVAL_S, then no proactive prompts,
+# then new sessions are refused with 1013 (retryable)
+ADMISSION_RATE = float(os.environ.get("ADMISSION_RATE", "0"))
+ADMISSION_BURST = int(os.environ.get("ADMISSION_BURST", "10"))
+ADMISSION_LAG_MS = tuple(float(v) for v in os.environ.get("ADMISSION_LAG_MS", "50,100,250").split(","))
+ADMISSION_QUEUE_DEPTH = tuple(float(v) for v in os.environ.get("ADMISSION_QUEUE_DEPTH", "8,16,32").split(","))
+ADMISSION_IMAGE_INTERVAL_S = float(os.environ.get("ADMISSION_IMAGE_INTERVAL_S", "2"))
+ADMISSION_COOLDOWN_S = float(os.environ.get("ADMISSION_COOLDOWN_S", "5"))
+
+# Event-loop health: lag sample interval, stall threshold for stack capture,
+# and whether GET /debug/loop (stall stacks, per-session CPU) is served
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "true").lower() == "true"
+LOOP_LAG_INTERVAL_S = float(os.environ.get("LOOP_LAG_INTERVAL_S", "0.5"))
+LOOP_STALL_MS = float(os.environ.get("LOOP_STALL_MS", "100"))
+LOOP_DEBUG_ENDPOINT = os.environ.get("LOOP_DEBUG_ENDPOINT", str(DEBUG_MODE)).lower() == "true"
+
+# Opt-in capture of every inbound client/Gemini message for loadtest.replay
+# (holds raw user audio and frames; empty disables)
+CAPTURE_DIR = os.environ.get("CAPTURE_DIR", "")
+
+# YouTube live chat is fetched with pytchat.LiveChatAsync on the event loop, paced
+# by YouTube's own poll timeout; YT_CHAT_BLOCKING=true falls back to the threaded
+# pytchat.create poller, polled every YT_CHAT_POLL_INTERVAL seconds
+YT_CHAT_BLOCKING = os.environ.get("YT_CHAT_BLOCKING", "false").lower() == "true"
+YT_CHAT_POLL_INTERVAL = float(os.environ.get("YT_CHAT_POLL_INTERVAL", "0.1"))
+
+# YouTube chat reaching the model: lines are deduped, rate-limited per author
+# and batched over YT_DIGEST_WINDOW_S into one turn, at most YT_TURNS_PER_MINUTE
+YT_DIGEST_WINDOW_S = float(os.environ.get("YT_DIGEST_WINDOW_S", "3"))
+YT_DIGEST_MAX_LINES = int(os.environ.get("YT_DIGEST_MAX_LINES", "20"))
+YT_TURNS_PER_MINUTE = int(os.environ.get("YT_TURNS_PER_MINUTE", "6"))
+YT_AUTHOR_LINES_PER_MINUTE = float(os.environ.get("YT_AUTHOR_LINES_PER_MINUTE", "6"))
+YT_DEDUP_WINDOW_S = float(os.environ.get("YT_DEDUP_WINDOW_S", "60"))
+
+# Local pre-moderation of YouTube chat lines: blocklist file (one pattern per
+# line, '#' comments; empty = none), and how long chat lines that got the
+# Gemini session closed with 1007 stay denied. A 1007 seen by the receiver is
+# blamed on the last chat digest sent within MODERATION_BLAME_WINDOW_S
+MODERATION = os.environ.get("MODERATION", "true").lower() == "true"
+MODERATION_BLOCKLIST = os.environ.get("MODERATION_BLOCKLIST", "")
+MODERATION_DENY_TTL_S = float(os.environ.get("MODERATION_DENY_TTL_S", "600"))
+MODERATION_DENY_SIZE = int(os.environ.get("MODERATION_DENY_SIZE", "4096"))
+MODERATION_BLAME_WINDOW_S = float(os.environ.get("MODERATION_BLAME_WINDOW_S", "5"))
+
 app = FastAPI(title="AI Eva Backend", version="1.0.0", debug=DEBUG_MODE)
 
 # Add CORS middleware with secure configuration
@@ -45,19 +201,18 @@ app.add_middleware(
 class GeminiConnection:
     def __init__(self):
         self.api_key = GEMINI_API_KEY
-        self.model = "gemini-2.0-flash-exp"
-        self.uri = (
-            "wss://generativelanguage.googleapis.com/ws/"
-            "google.ai.generativelanguage.v1alpha.GenerativeService.BidiGenerateContent"
-            f"?key={self.api_key}"
-        )
+        self.model = GEMINI_MODEL
+        self.uri = f"{GEMINI_WS_URL}?key={self.api_key}"
         self.ws = None
         self.config = None
         logger.info("GeminiConnection initialized")
 
     async def connect(self):
         """Initialize connection to Gemini"""
+        started = time.perf_counter()
         self.ws = await connect(self.uri, additional_headers={"Content-Type": "application/json"})
+        dialed = time.perf_counter()
+        metrics.gemini_connect_seconds.observe(dialed - started, "dial")
         
         if not self.config:
             raise ValueError("Configuration must be set before connecting")
@@ -85,10 +240,13 @@ class GeminiConnection:
                 }
             }
         }
-        await self.ws.send(json.dumps(setup_message))
+        setup = json.dumps(setup_message)
+        await self.ws.send(setup)
+        metrics.count_message("gemini_out", "setup", len(setup))
         
         # Wait for setup completion
         setup_response = await self.ws.recv()
+        metrics.gemini_connect_seconds.observe(time.perf_counter() - dialed, "setup")
         return setup_response
 
     def set_config(self, config):
@@ -107,7 +265,16 @@ class GeminiConnection:
                 ]
             }
         }
-        await self.ws.send(json.dumps(realtime_input_msg)) # type: ignore
+        data = json.dumps(realtime_input_msg)
+        await self.ws.send(data) # type: ignore
+        metrics.count_message("gemini_out", "audio", len(data))
+
+    async def send_audio_bytes(self, pcm: bytes):
+        """Send raw PCM16 audio (binary protocol) to Gemini"""
+        b64 = base64.b64encode(pcm).decode("ascii")
+        data = media_message(b64, "audio/pcm")
+        await self.ws.send(data) # type: ignore
+        metrics.count_message("gemini_out", "audio", len(data))
 
     async def receive(self):
         """Receive message from Gemini"""
@@ -130,7 +297,16 @@ class GeminiConnection:
                 ]
             }
         }
-        await self.ws.send(json.dumps(image_message)) # type: ignore
+        data = json.dumps(image_message)
+        await self.ws.send(data) # type: ignore
+        metrics.count_message("gemini_out", "image", len(data))
+
+    async def send_image_bytes(self, jpeg: bytes):
+        """Send raw JPEG bytes (binary protocol) to Gemini"""
+        b64 = base64.b64encode(jpeg).decode("ascii")
+        data = media_message(b64, "image/jpeg")
+        await self.ws.send(data) # type: ignore
+        metrics.count_message("gemini_out", "image", len(data))
 
     async def send_text(self, text: str):
         """Send text message to Gemini"""
@@ -145,106 +321,416 @@ class GeminiConnection:
                 "turn_complete": True
             }
         }
-        await self.ws.send(json.dumps(text_message)) # type: ignore
+        data = json.dumps(text_message)
+        await self.ws.send(data) # type: ignore
+        metrics.count_message("gemini_out", "text", len(data))
+
+# Warm Gemini sessions leased by new clients and reconnects
+gemini_pool = GeminiPool(
+    GeminiConnection,
+    GEMINI_MODEL,
+    min_size=GEMINI_POOL_MIN,
+    max_size=GEMINI_POOL_MAX,
+    max_idle=GEMINI_POOL_MAX_IDLE,
+)
+
+# Loop lag / stall watchdog and per-session task CPU accounting
+loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL_S, LOOP_STALL_MS / 1000.0, enabled=LOOP_MONITOR)
+
+# Load shedding for this worker, driven by loop lag and send-queue depth
+admission = AdmissionController(
+    lambda: loop_monitor.last_lag,
+    rate=ADMISSION_RATE,
+    burst=ADMISSION_BURST,
+    lag_ms=ADMISSION_LAG_MS,
+    queue_depth=ADMISSION_QUEUE_DEPTH,
+    image_interval=ADMISSION_IMAGE_INTERVAL_S,
+    cooldown=ADMISSION_COOLDOWN_S,
+)
+if not LOOP_MONITOR and any(v > 0 for v in ADMISSION_LAG_MS):
+    logger.warning("LOOP_MONITOR=false: loop lag reads 0, so ADMISSION_LAG_MS never sheds load (queue depth still does)")
+
+# Shared frame transcoding pool for every session of this worker
+image_transcoder = ImageTranscoder(
+    IMAGE_MAX_EDGE, IMAGE_QUALITY, IMAGE_WORKERS, IMAGE_MAX_INFLIGHT, dedup=FRAME_DEDUP_THRESHOLD >= 0
+)
+
+# Blocklist + learned 1007 deny cache, shared by every session of this worker
+moderator = Moderator(load_blocklist(MODERATION_BLOCKLIST), MODERATION_DENY_TTL_S, MODERATION_DENY_SIZE, enabled=MODERATION)
+
+
+def create_live_chat(video_id: str, interruptable: bool = False):
+    # LiveChatAsync's default client and processor are single instances shared
+    # by every chat, and the client is closed when a chat ends: give each its own
+    kwargs = {"client": httpx.AsyncClient(http2=True)} if httpx is not None else {}
+    return pytchat.LiveChatAsync(video_id, interruptable=interruptable, processor=pytchat.DefaultProcessor(), **kwargs)
+
+
+# One pytchat poller per video_id, fanned out to every subscribed client
+# (and, with the broker registry, to every worker on the host)
+if YT_CHAT_BLOCKING:
+    chat_hub = ChatHub(pytchat.create, poll_interval=YT_CHAT_POLL_INTERVAL, blocking=True)
+else:
+    chat_hub = ChatHub(create_live_chat)
+
+# Sessions of this worker, keyed by client_id (session_state.Session)
+registry = create_registry(REGISTRY_BACKEND, chat_hub, REGISTRY_ADDRESS, MAX_SESSIONS)
+
+@app.on_event("startup")
+async def start_shared_services():
+    await registry.start()
+    await gemini_pool.start()
+    image_transcoder.start()
+    loop_monitor.start()
+    if CAPTURE_DIR:
+        os.makedirs(CAPTURE_DIR, exist_ok=True)
+
+@app.on_event("shutdown")
+async def stop_shared_services():
+    await gemini_pool.stop()
+    await registry.stop()
+    await image_transcoder.stop()
+    await loop_monitor.stop()
 
-# Store active connections
-connections: Dict[str, GeminiConnection] = {}
+# Shared deadline scheduler for idle / proactive timers of every session
+timers = TimerWheel(tick=0.25)
 
-# Track YouTube chat watchers per client
-yt_watchers: Dict[str, Dict[str, Optional[threading.Thread]]] = {}
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
-# Per-client state: last activity and whether YT auto-reply is allowed
-client_states: Dict[str, Dict[str, object]] = {}
+if LOOP_DEBUG_ENDPOINT:
+    @app.get("/debug/loop")
+    async def loop_debug_endpoint(top: int = 10):
+        return JSONResponse(loop_monitor.snapshot(top))
+
+# Message types the browser sends; anything else is counted as "other"
+CLIENT_MESSAGE_TYPES = frozenset((
+    "audio", "image", "text", "mode", "user_activity", "yt_chat_start", "yt_chat_stop", "stats", "ping",
+))
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     logger.info(f"New WebSocket connection attempt for client: {client_id}")
     await websocket.accept()
-    
-    try:
-        # Create new Gemini connection for this client
-        logger.info(f"Creating Gemini connection for client: {client_id}")
-        gemini = GeminiConnection()
-        connections[client_id] = gemini
-        yt_watchers[client_id] = {"thread": None, "stop": None}
-        client_states[client_id] = {
-            "last_activity": time.time(),
-            "allow_yt_reply": False,
-            "mode": "audio",            # 'audio' | 'camera' | 'screen'
-            "last_image": 0.0,            # timestamp of last image frame
-            "last_yt_chat": 0.0,          # timestamp of last received yt chat line
-            "last_proactive": 0.0,        # cooldown for proactive prompts
-        }
-
-        # Grab the running loop to schedule tasks from threads
-        loop = asyncio.get_running_loop()
+    metrics.active_sessions.inc()
+    audio_batcher: Optional[AudioCoalescer] = None
+    send_queues: List[MediaQueue] = []
+    image_task: Optional[asyncio.Task] = None
+    pending_image: Optional[bytes] = None  # newest frame waiting for the transcoder
+    token: Optional[str] = None
+    recorder: Optional[SessionRecorder] = open_recorder(CAPTURE_DIR, client_id) if CAPTURE_DIR else None
+    cpu = loop_monitor.account(client_id)
+
+    # Everything the session owns (Gemini link, YT subscription, timers,
+    # tasks) plus its idle / turn state; released by session.close()
+    session = Session(client_id)
 
-        # Helper: sanitize text to avoid invalid frames / unsafe payloads
-        def sanitize_for_model(s: str, max_len: int = 500) -> str:
+    try:
+        # Shed load before any Gemini session is opened
+        refused = admission.admit()
+        if refused is not None:
+            logger.warning(f"Admission refused ({refused}), closing client: {client_id}")
+            await websocket.close(code=1013, reason="Server busy, retry later")
+            return
+
+        # The same client_id connecting again (here or on another worker) supersedes this one
+        async def evict():
+            if websocket.client_state.value != 3:
+                await websocket.close(code=1000, reason="Superseded by a newer connection")
+
+        token = await registry.register(client_id, session, evict)
+        if token is None:
+            admission.refund()  # the bucket is for sessions that start
+            logger.warning(f"Session cap reached, refusing client: {client_id}")
+            await websocket.close(code=1013, reason="Server at capacity, retry later")
+            return
+
+        # Helper: replace ``failed`` (the connection the caller saw close) with the standby
+        # (failover mode) or a fresh pooled Gemini session. The sender and the receiver can
+        # both see the same close; the second caller gets the already-switched connection
+        async def reconnect_gemini(failed):
+            fresh = await session.link.switch(failed) # type: ignore[union-attr]
+            if fresh is not session.gemini:
+                session.gemini = fresh
+                if session.turn is not None:
+                    session.turn.reconnected()
+
+        # Everything sent to the browser goes through these two, so client_out
+        # counts what was actually sent (queued audio that gets dropped never is)
+        async def send_client_json(msg: dict):
+            text = json.dumps(msg, separators=(",", ":"), ensure_ascii=False)
+            await websocket.send_text(text)
+            metrics.count_message("client_out", msg["type"], len(text))
+
+        async def send_client_audio(frame):
+            if isinstance(frame, str):
+                await websocket.send_text(frame)
+            else:
+                await websocket.send_bytes(frame)
+            metrics.count_message("client_out", "audio", len(frame))
+
+        async def notify_skipped(reason: str):
             try:
-                # Remove control chars except tab and space
-                s = ''.join(ch if (ord(ch) >= 32 or ch in '\t ') else ' ' for ch in s)
-                # Normalize line breaks to spaces
-                s = s.replace('\r', ' ').replace('\n', ' ')
-                # Drop any problematic surrogates
-                s = s.encode('utf-8', 'ignore').decode('utf-8', 'ignore')
-            except Exception:
-                pass
-            s = s.strip()
-            if len(s) > max_len:
-                s = s[:max_len] + '…'
-            return s
-
-        # Helper: safely send text to Gemini; reconnect if connection was closed by server (e.g., 1007 Unsafe prompt)
-        async def safe_send_text(payload: str):
+                if websocket.client_state.value != 3:
+                    await send_client_json({
+                        "type": "yt_chat_skipped",
+                        "data": {"reason": reason}
+                    })
+            except Exception as send_error:
+                logger.error(f"Failed to send unsafe prompt notification: {send_error}")
+
+        # Helper: safely send text to Gemini; reconnect if connection was closed by server (e.g., 1007 Unsafe prompt).
+        # Only for text the server sends on its own; ``lines`` are the chat lines a digest was made of
+        # Digest lines were already screened one by one in on_yt_chat
+        async def safe_send_text(payload: str, lines: Sequence[str] = ()):
+            conn = session.gemini
             try:
-                await gemini.send_text(payload)
+                await conn.send_text(payload) # type: ignore[union-attr]
+                session.sent_server_text(payload, lines)
                 logger.debug(f"Sent text to Gemini for client {client_id}: {payload[:50]}...")
             except websockets.exceptions.ConnectionClosed as e:  # pyright: ignore[reportGeneralTypeIssues]
                 reason = getattr(e, 'reason', '') or ''
                 code = getattr(e, 'code', None)
                 logger.warning(f"Gemini connection closed for client {client_id}: code={code}, reason={reason}")
+                metrics.gemini_reconnects.inc("send_text", str(code))
                 # If unsafe prompt or 1007, do not resend the same payload
                 if code == 1007 or ('Unsafe prompt' in str(reason)):
                     logger.warning(f"Unsafe prompt detected for client {client_id}. Skipping message.")
-                    try:
-                        if websocket.client_state.value != 3:
-                            await websocket.send_json({
-                                "type": "yt_chat_skipped",
-                                "data": {"reason": "unsafe"}
-                            })
-                    except Exception as send_error:
-                        logger.error(f"Failed to send unsafe prompt notification: {send_error}")
+                    moderator.learn(lines)  # never the server's own prompts
+                    await notify_skipped("unsafe")
                     # Try to reconnect for subsequent messages
                     try:
-                        await gemini.connect()
+                        await reconnect_gemini(conn)
                         logger.info(f"Reconnected to Gemini after unsafe prompt for client {client_id}")
                     except Exception as reconnect_error:
                         logger.error(f"Gemini reconnect after unsafe failed for client {client_id}: {reconnect_error}")
                     return
                 # For other close reasons, try to reconnect and resend once
                 try:
-                    await gemini.connect()
-                    await gemini.send_text(payload)
+                    await reconnect_gemini(conn)
+                    await session.gemini.send_text(payload)
                     logger.info(f"Reconnected and resent message for client {client_id}")
                 except Exception as retry_error:
                     logger.error(f"Gemini send_text failed after reconnect for client {client_id}: {retry_error}")
             except Exception as e:
                 logger.error(f"Gemini send_text error for client {client_id}: {e}")
 
+        # Idle / proactive deadlines: re-armed on events instead of polled
+        def mark_activity():
+            session.last_activity = time.time()
+            session.allow_yt_reply = False
+            session.rearm_idle(timers.schedule(IDLE_AFTER_S, on_idle))
+            session.rearm_proactive(None)
+
+        def on_idle():
+            session.idle_timer = None
+            # Idle after no user activity: allow YT replies
+            session.allow_yt_reply = True
+            check_proactive()
+
+        def on_image():
+            session.last_image = time.time()
+            if session.proactive_timer is None and session.allow_yt_reply and session.mode == "screen":
+                check_proactive()
+
+        def on_proactive_timer():
+            session.proactive_timer = None
+            check_proactive()
+
+        def check_proactive():
+            # When idle, in screen mode, recent image, and no yt chat, occasionally prompt small talk about the screen
+            if not session.allow_yt_reply or session.mode != "screen":
+                return  # re-checked on idle / image / mode events
+            now = time.time()
+            if now - session.last_image > PROACTIVE_SCREEN_FRESH_S:
+                return  # re-checked when the next screen frame arrives
+            ready_at = max(
+                session.last_yt_chat + PROACTIVE_CHAT_QUIET_S,
+                session.last_proactive + PROACTIVE_COOLDOWN_S,
+            )
+            if now >= ready_at and not admission.proactive_allowed():
+                # Shed under load; try again after a full cooldown
+                session.last_proactive = now
+                ready_at = now + PROACTIVE_COOLDOWN_S
+            elif now >= ready_at:
+                prompt = (
+                    "จากภาพหน้าจอปัจจุบัน ชวนคุยด้วยประโยคสั้นๆ 1-2 ประโยคเกี่ยวกับสิ่งที่ผู้ใช้กำลังทำอยู่ "
+                    "ให้เป็นกันเองแบบเพื่อน พูดสั้น กระชับ และสุภาพน้อยลงเล็กน้อยตามโทนบทบาทเดิม"
+                )
+                session.last_proactive = now
+                session.track(asyncio.create_task(safe_send_text(prompt)))
+                ready_at = now + PROACTIVE_COOLDOWN_S
+            session.rearm_proactive(timers.schedule(ready_at - now, on_proactive_timer))
+
+        # Chat lines bound for Gemini, batched into digest turns while idle
+        session.digest = chat_digest = ChatDigest(
+            lambda text, lines: session.track(asyncio.create_task(safe_send_text(text, lines))),
+            lambda: session.allow_yt_reply,
+            timers,
+            window=YT_DIGEST_WINDOW_S,
+            max_lines=YT_DIGEST_MAX_LINES,
+            turns_per_minute=YT_TURNS_PER_MINUTE,
+            author_per_minute=YT_AUTHOR_LINES_PER_MINUTE,
+            dedup_window=YT_DEDUP_WINDOW_S,
+        )
+
+        # YouTube chat fan-out callback (runs on the loop, must not block: UI
+        # messages go through the downstream queue as droppable events)
+        def on_yt_chat(user: str, msg: str):
+            session.last_yt_chat = time.time()
+            # Forward to Gemini only when idle mode allows
+            if session.allow_yt_reply:
+                # Sanitize/limit, and screen locally before it can cost a 1007 close
+                line = sanitize_for_model(str(msg))
+                blocked = moderator.check(line) or moderator.check(user)
+                if blocked is None:
+                    chat_digest.add(user, line)
+                elif websocket.client_state.value != 3:
+                    downstream.put_event(lambda r=blocked: notify_skipped(r))
+            # Forward to client UI
+            if websocket.client_state.value != 3:
+                downstream.put_event(lambda: send_client_json({
+                    "type": "yt_chat",
+                    "data": {"user": user, "message": msg}
+                }))
+
         # Wait for initial configuration
         config_data = await websocket.receive_json()
+        if recorder is not None:
+            recorder.record(SOURCE_CLIENT_TEXT, json.dumps(config_data))
         if config_data.get("type") != "config":
             raise ValueError("First message must be configuration")
 
-        # Set the configuration
-        gemini.set_config(config_data.get("config", {}))
+        # Wire protocol for media frames: 'json' (base64) or 'binary' (header + raw bytes)
+        protocol = negotiate_protocol(config_data)
+        binary_mode = protocol == PROTOCOL_BINARY
+
+        # Model speech encoding: raw PCM16 passes through, anything else is
+        # re-framed into even packets and encoded
+        audio_encoding = negotiate_audio_encoding(config_data)
+        audio_encoder = AudioEncoder(audio_encoding, DOWNSTREAM_AUDIO_FRAME_MS) if audio_encoding != ENCODING_PCM16 else None
+
+        # Lease a Gemini connection already past setup (dials one on a pool miss)
+        logger.info(f"Creating Gemini connection for client: {client_id}")
+        session.link = link = GeminiLink(
+            gemini_pool,
+            config_data.get("config", {}),
+            standby=GEMINI_FAILOVER,
+            replay_ms=GEMINI_FAILOVER_REPLAY_MS,
+        )
+        session.gemini = await link.start()
+
+        # Bounded send queues so a slow peer can't stall the other direction;
+        # entries resolve gemini at send time so a reconnect swaps the target
+        upstream = MediaQueue("upstream", QUEUE_MAX_AUDIO, UPSTREAM_AUDIO_BUDGET_MS)
+        downstream = MediaQueue("downstream", QUEUE_MAX_AUDIO, DOWNSTREAM_AUDIO_BUDGET_MS)
+        session.track(asyncio.create_task(loop_monitor.meter(cpu, "upstream", upstream.drain())))
+        session.track(asyncio.create_task(loop_monitor.meter(cpu, "downstream", downstream.drain())))
+        send_queues = [upstream, downstream]
+        admission.watch(*send_queues)
+
+        # Model turn state; user speech onset cuts the model off (barge-in)
+        session.turn = turn = TurnTracker(
+            downstream,
+            lambda: send_client_json({"type": "interrupted", "data": True}),
+            audio_encoder,
+            enabled=BARGE_IN,
+        )
+
+        async def queue_audio(pcm: bytes):
+            upstream.put_audio(lambda: link.send_audio(pcm))
+
+        # Batch small mic chunks into fewer upstream realtime_input messages
+        audio_batcher = AudioCoalescer(
+            queue_audio,
+            window_ms=AUDIO_COALESCE_MS,
+            max_delay_ms=AUDIO_COALESCE_MAX_DELAY_MS,
+        )
+        was_speaking = False
+
+        vad = VoiceActivityDetector(
+            threshold_db=VAD_THRESHOLD_DB,
+            hangover_ms=VAD_HANGOVER_MS,
+            preroll_ms=VAD_PREROLL_MS,
+            keepalive_ms=VAD_KEEPALIVE_MS,
+        ) if SERVER_VAD else None
+
+        async def add_mic_audio(pcm: bytes):
+            if vad is None:
+                await audio_batcher.add(pcm) # type: ignore[union-attr]
+                return
+            chunks, event = vad.process(pcm)
+            if event == SPEECH_START:
+                await turn.speech_started("vad")
+            # Heard speech counts as activity even if the client never says so
+            if event == SPEECH_START or (vad.speaking and time.time() - session.last_activity >= 1.0):
+                mark_activity()
+            for chunk in chunks:
+                await audio_batcher.add(chunk) # type: ignore[union-attr]
+            if event == SPEECH_END:
+                turn.speech_ended(keep_first=True)
+                await audio_batcher.flush("speech_end") # type: ignore[union-attr]
+
+        # Skip screen/camera frames that look the same as the last one sent
+        # (compared in the transcoder pool, off the event loop)
+        frame_filter = FrameFilter(FRAME_DEDUP_THRESHOLD, FRAME_TILE_DELTA, FRAME_KEYFRAME_INTERVAL)
+
+        async def transcode_images():
+            nonlocal pending_image, image_task
+            try:
+                while pending_image is not None:
+                    jpeg, pending_image = pending_image, None
+                    data = await image_transcoder.submit(jpeg, frame_filter)
+                    if data is not None:
+                        session.image_sent_at = time.monotonic()
+                        upstream.put_image(lambda d=data: session.gemini.send_image_bytes(d)) # type: ignore[union-attr]
+            finally:
+                image_task = None
+
+        def image_wanted() -> bool:
+            # Rate limit under load first, so a skipped frame doesn't become the dedup reference
+            return admission.image_allowed(session.image_sent_at)
 
-        # Initialize Gemini connection
-        await gemini.connect()
+        def forward_image(jpeg: bytes, b64: Optional[str] = None):
+            nonlocal pending_image, image_task
+            if not image_transcoder.enabled:
+                # No pool (no Pillow, or nothing to resize or dedup): at most a byte-hash check here
+                if not frame_filter.should_send(jpeg):
+                    return
+                session.image_sent_at = time.monotonic()
+                if b64 is not None:
+                    upstream.put_image(lambda: session.gemini.send_image(b64)) # type: ignore[union-attr]
+                else:
+                    upstream.put_image(lambda: session.gemini.send_image_bytes(jpeg)) # type: ignore[union-attr]
+                return
+            # One transcode per session at a time; a frame still waiting is replaced by a newer one
+            pending_image = jpeg
+            if image_task is None:
+                image_task = session.track(asyncio.create_task(loop_monitor.meter(cpu, "images", transcode_images())))
+
+        if binary_mode:
+            await send_client_json({"type": "protocol", "data": PROTOCOL_BINARY})
+        if audio_encoder is not None:
+            await send_client_json({
+                "type": "audio_encoding",
+                "data": audio_encoding,
+                "sampleRate": DOWNSTREAM_SAMPLE_RATE,
+                "frameMs": DOWNSTREAM_AUDIO_FRAME_MS,
+            })
+
+        def queue_model_audio(packets: List[bytes]):
+            for packet in packets:
+                if binary_mode:
+                    frame = encode_frame(KIND_AUDIO, packet, FLAG_MULAW)
+                    downstream.put_audio(lambda f=frame: send_client_audio(f))
+                else:
+                    text_frame = audio_json_frame(base64.b64encode(packet), audio_encoding)
+                    downstream.put_audio(lambda f=text_frame: send_client_audio(f))
 
     # Handle bidirectional communication
         async def receive_from_client():
+            nonlocal was_speaking
             try:
                 while True:
                     try:
@@ -259,8 +745,29 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                         if message["type"] == "websocket.disconnect":
                             print("Received disconnect message")
                             return
+                        if recorder is not None:
+                            if message.get("text") is not None:
+                                recorder.record(SOURCE_CLIENT_TEXT, message["text"])
+                            elif message.get("bytes") is not None:
+                                recorder.record(SOURCE_CLIENT_BINARY, message["bytes"])
 
                         raw = message.get("text")
+                        if raw is None and binary_mode and message.get("bytes") is not None:
+                            # Binary media frame: header + raw PCM/JPEG, no JSON involved
+                            try:
+                                kind, _flags, payload = decode_frame(message["bytes"])
+                            except FrameError as e:
+                                print(f"Binary frame error: {e}")
+                                continue
+                            metrics.count_message("client_in", kind_name(kind) or metrics.OTHER, len(payload))
+                            if kind == KIND_AUDIO:
+                                await add_mic_audio(payload) # type: ignore[arg-type]
+                            elif kind == KIND_IMAGE:
+                                # Dropped frames still count as a live screen for proactive prompts
+                                on_image()
+                                if image_wanted():
+                                    forward_image(bytes(payload))
+                            continue
                         if raw is None and message.get("bytes") is not None:
                             try:
                                 raw = message.get("bytes").decode("utf-8") # pyright: ignore[reportOptionalMemberAccess]
@@ -271,126 +778,77 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                         message_content = json.loads(raw)
 
                         msg_type = message_content.get("type")
+                        # Client-chosen type: a fixed label set, or any client could mint new series
+                        metrics.count_message("client_in", msg_type if msg_type in CLIENT_MESSAGE_TYPES else metrics.OTHER, len(raw))
                         if msg_type == "audio":
-                            await gemini.send_audio(message_content["data"])
+                            await add_mic_audio(base64.b64decode(message_content["data"]))
                             # Audio frames come continuously; don't use them for idle detection directly
                         elif msg_type == "image":
-                            await gemini.send_image(message_content["data"])
-                            st = client_states.get(client_id)
-                            if st is not None:
-                                st["last_image"] = time.time()
+                            on_image()
+                            if image_wanted():
+                                forward_image(base64.b64decode(message_content["data"]), message_content["data"])
                         elif msg_type == "text":
-                            await gemini.send_text(message_content["data"])
+                            await upstream.put_control(lambda d=message_content["data"]: session.gemini.send_text(d)) # type: ignore[union-attr]
                             # Treat explicit text as activity
-                            st = client_states.get(client_id)
-                            if st is not None:
-                                st["last_activity"] = time.time()
-                                st["allow_yt_reply"] = False
+                            mark_activity()
                         elif msg_type == "mode":
                             # Expect { type: 'mode', mode: 'audio'|'camera'|'screen' }
                             m = message_content.get("mode")
-                            if m in ("audio", "camera", "screen"):
-                                st = client_states.get(client_id)
-                                if st is not None:
-                                    st["mode"] = m
+                            if m in MODES:
+                                session.mode = m
+                                if m == "screen" and session.proactive_timer is None:
+                                    check_proactive()
                         elif msg_type == "user_activity":
                             # Expect { type: 'user_activity', speaking: true/false }
                             speaking = bool(message_content.get("speaking", False))
+                            if was_speaking and not speaking:
+                                turn.speech_ended()
+                                # Speech ended: don't hold the tail of the utterance back
+                                await audio_batcher.flush("speech_end")
+                            elif speaking and not was_speaking:
+                                await turn.speech_started("client")
+                            was_speaking = speaking
                             if speaking:
-                                st = client_states.get(client_id)
-                                if st is not None:
-                                    st["last_activity"] = time.time()
-                                    st["allow_yt_reply"] = False
+                                mark_activity()
                         elif msg_type == "yt_chat_start":
                             # message_content expects { type: 'yt_chat_start', video_id: '...' }
                             video_id = message_content.get("video_id")
                             if not video_id:
-                                await websocket.send_json({"type": "error", "data": "Missing video_id for yt_chat_start"})
+                                await send_client_json({"type": "error", "data": "Missing video_id for yt_chat_start"})
                             else:
-                                # Start watcher in a thread
-                                def run_chat():
-                                    stop_flag = yt_watchers[client_id]["stop"]
-                                    # Disable signal handling in non-main thread
-                                    chat = pytchat.create(video_id=video_id, interruptable=False)
-                                    try:
-                                        while chat.is_alive():
-                                            if stop_flag and stop_flag.is_set(): # type: ignore
-                                                break
-                                            for c in chat.get().sync_items(): # type: ignore
-                                                user = c.author.name
-                                                msg = c.message
-                                                # Sanitize/limit to avoid unsafe payloads
-                                                clean_msg = sanitize_for_model(str(msg))
-                                                text = f"[YouTube] {user}: {clean_msg}"
-                                                # Update last yt chat time
-                                                try:
-                                                    st = client_states.get(client_id)
-                                                    if st is not None:
-                                                        st["last_yt_chat"] = time.time()
-                                                except Exception:
-                                                    pass
-                                                # Forward to Gemini only when idle mode allows
-                                                try:
-                                                    st = client_states.get(client_id)
-                                                    allow = bool(st.get("allow_yt_reply", False)) if st else False
-                                                except Exception:
-                                                    allow = False
-                                                if allow:
-                                                    try:
-                                                        asyncio.run_coroutine_threadsafe(
-                                                            safe_send_text(text), loop
-                                                        )
-                                                    except Exception:
-                                                        pass
-                                                # Forward to client UI on main loop
-                                                try:
-                                                    if websocket.client_state.value != 3:
-                                                        asyncio.run_coroutine_threadsafe(
-                                                            websocket.send_json({
-                                                                "type": "yt_chat",
-                                                                "data": {"user": user, "message": msg}
-                                                            }),
-                                                            loop,
-                                                        )
-                                                except Exception:
-                                                    pass
-                                            # small sleep to avoid tight loop
-                                            time.sleep(0.1)
-                                    finally:
-                                        try:
-                                            chat.terminate()
-                                        except Exception:
-                                            pass
-
-                                # Ensure previous watcher is stopped
-                                prev_thread = yt_watchers[client_id].get("thread")
-                                prev_stop = yt_watchers[client_id].get("stop")
-                                if prev_stop and isinstance(prev_stop, threading.Event):
-                                    prev_stop.set()
-                                if prev_thread and prev_thread.is_alive():
-                                    prev_thread.join(timeout=2)
-
-                                stop_event = threading.Event()
-                                yt_watchers[client_id]["stop"] = stop_event # type: ignore
-                                t = threading.Thread(target=run_chat, daemon=True)
-                                yt_watchers[client_id]["thread"] = t
-                                t.start()
-                                await websocket.send_json({"type": "yt_chat_status", "data": "started"})
+                                # Join the shared watcher for this stream (one poller per video_id)
+                                session.subscribe_yt(None)
+                                session.subscribe_yt(registry.chat_hub.subscribe(video_id, on_yt_chat))
+                                await send_client_json({"type": "yt_chat_status", "data": "started"})
                         elif msg_type == "yt_chat_stop":
-                            prev_thread = yt_watchers[client_id].get("thread")
-                            prev_stop = yt_watchers[client_id].get("stop")
-                            if prev_stop and isinstance(prev_stop, threading.Event):
-                                prev_stop.set()
-                            if prev_thread and prev_thread.is_alive():
-                                prev_thread.join(timeout=2)
-                            yt_watchers[client_id]["thread"] = None
-                            yt_watchers[client_id]["stop"] = None
-                            await websocket.send_json({"type": "yt_chat_status", "data": "stopped"})
+                            session.subscribe_yt(None)
+                            await send_client_json({"type": "yt_chat_status", "data": "stopped"})
+                        elif msg_type == "stats":
+                            await send_client_json({
+                                "type": "stats",
+                                "data": {
+                                    "session": session.stats(),
+                                    "audio": audio_batcher.stats(),
+                                    "vad": vad.stats() if vad is not None else None,
+                                    "frames": frame_filter.stats(),
+                                    "images": image_transcoder.stats(),
+                                    "queues": {"upstream": upstream.stats(), "downstream": downstream.stats()},
+                                    "downstream_audio": audio_encoder.stats() if audio_encoder is not None else None,
+                                    "pool": gemini_pool.stats(),
+                                    "link": link.stats(),
+                                    "yt_chat": registry.chat_hub.stats(),
+                                    "yt_digest": chat_digest.stats(),
+                                    "moderation": moderator.stats(),
+                                    "registry": registry.stats(),
+                                    "admission": admission.stats(),
+                                    "cpu": cpu.as_dict(),
+                                }
+                            })
                         elif msg_type == "ping":
                             # simple pong for latency measurement
                             ts = message_content.get("ts")
                             try:
-                                await websocket.send_json({"type": "pong", "ts": ts})
+                                await send_client_json({"type": "pong", "ts": ts})
                             except Exception:
                                 pass
                         else:
@@ -411,143 +869,120 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 return
 
         async def receive_from_gemini():
+            backoff = Backoff()
             try:
                 while True:
                     if websocket.client_state.value == 3:  # WebSocket.CLOSED
                         print("WebSocket closed, stopping Gemini receiver")
                         return
 
+                    conn = session.gemini
                     try:
-                        msg = await gemini.receive()
+                        msg = await conn.receive()
+                        if recorder is not None:
+                            recorder.record(SOURCE_GEMINI, msg)
                     except websockets.exceptions.ConnectionClosed as e:  # pyright: ignore[reportGeneralTypeIssues]
                         # Try to reconnect and continue listening
                         print(f"Gemini connection closed ({e.code} {e.reason}), reconnecting…")
+                        metrics.gemini_reconnects.inc("receive", str(e.code))
+                        if e.code == 1007:
+                            blamed = session.take_server_text(MODERATION_BLAME_WINDOW_S)
+                            if blamed is not None:
+                                moderator.learn(blamed[1])  # chat lines only, never a proactive prompt
                         try:
-                            await gemini.connect()
+                            await reconnect_gemini(conn)
+                            backoff.reset()
                             continue
                         except Exception as e2:
-                            print(f"Gemini reconnect failed: {e2}")
-                            await asyncio.sleep(1)
+                            delay = backoff.next()
+                            print(f"Gemini reconnect failed: {e2}; retrying in {delay:.1f}s")
+                            await asyncio.sleep(delay)
                             continue
 
-                    response = json.loads(msg)
-
-                    # Forward audio data to client
+                    # Lone audio parts are sliced out of the raw frame without a JSON parse
                     try:
-                        parts = response["serverContent"]["modelTurn"]["parts"]
-                        for p in parts:
-                            # Check connection state before each send
-                            if websocket.client_state.value == 3:
-                                return
-
-                            if "inlineData" in p:
-                                audio_data = p["inlineData"]["data"]
-                                await websocket.send_json({
-                                    "type": "audio",
-                                    "data": audio_data
-                                })
-                            elif "text" in p:
-                                print(f"Received text: {p['text']}")
-                                await websocket.send_json({
-                                    "type": "text",
-                                    "text": p["text"]
-                                })
-                    except KeyError:
-                        pass
+                        response = decode_server_message(msg)
+                    except (ValueError, KeyError, TypeError) as e:
+                        # One unreadable message must not end the receiver (and the session)
+                        print(f"Skipping malformed Gemini message ({len(msg)} bytes): {e!r}")
+                        metrics.count_message("gemini_in", KIND_MALFORMED, len(msg))
+                        continue
+                    metrics.count_message("gemini_in", response.kind, len(msg))
+                    # Drops the audio of a turn the user talked over
+                    await turn.model_response(response)
+
+                    # Forward audio / text parts to client
+                    for part_kind, data in response.parts:
+                        # Check connection state before each send
+                        if websocket.client_state.value == 3:
+                            return
+
+                        if part_kind == PART_AUDIO:
+                            turn.audio_sent(data)
+                            if audio_encoder is not None:
+                                queue_model_audio(audio_encoder.encode(base64.b64decode(data)))
+                            elif binary_mode:
+                                frame = encode_frame(KIND_AUDIO, base64.b64decode(data))
+                                downstream.put_audio(lambda f=frame: send_client_audio(f))
+                            else:
+                                text_frame = audio_json_frame(data)
+                                downstream.put_audio(lambda f=text_frame: send_client_audio(f))
+                        else:
+                            print(f"Received text: {data}")
+                            await downstream.put_control(lambda t=data: send_client_json({
+                                "type": "text",
+                                "text": t
+                            }))
 
                     # Handle turn completion
-                    try:
-                        if response["serverContent"]["turnComplete"]:
-                            await websocket.send_json({
-                                "type": "turn_complete",
-                                "data": True
-                            })
-                    except KeyError:
-                        pass
+                    if response.turn_complete:
+                        turn.turn_complete()
+                        if audio_encoder is not None:
+                            queue_model_audio(audio_encoder.flush())
+                        await downstream.put_control(lambda: send_client_json({
+                            "type": "turn_complete",
+                            "data": True
+                        }))
             except Exception as e:
                 print(f"Error receiving from Gemini: {e}")
 
-        # Run both receiving tasks concurrently
-        async def idle_monitor():
-            # Toggle allow_yt_reply after 10s of no user activity
-            try:
-                while True:
-                    st = client_states.get(client_id)
-                    if st is None:
-                        await asyncio.sleep(1)
-                        continue
-                    last = float(st.get("last_activity", time.time())) # type: ignore
-                    idle = (time.time() - last) >= 10.0
-                    st["allow_yt_reply"] = bool(idle)
-                    await asyncio.sleep(1)
-            except asyncio.CancelledError:
-                return
-
-        async def proactive_monitor():
-            # When idle, in screen mode, recent image, and no yt chat, occasionally prompt small talk about the screen
-            try:
-                while True:
-                    st = client_states.get(client_id)
-                    if st is None:
-                        await asyncio.sleep(1)
-                        continue
-                    now = time.time()
-                    mode = st.get("mode", "audio")
-                    idle = bool(st.get("allow_yt_reply", False))
-                    last_img = float(st.get("last_image", 0.0)) # type: ignore
-                    last_chat = float(st.get("last_yt_chat", 0.0)) # type: ignore
-                    last_pro = float(st.get("last_proactive", 0.0)) # type: ignore
-
-                    screen_active = (mode == "screen") and (now - last_img <= 5.0)
-                    chat_quiet = (now - last_chat >= 20.0)
-                    cooldown_over = (now - last_pro >= 30.0)
-
-                    if idle and screen_active and chat_quiet and cooldown_over:
-                        prompt = (
-                            "จากภาพหน้าจอปัจจุบัน ชวนคุยด้วยประโยคสั้นๆ 1-2 ประโยคเกี่ยวกับสิ่งที่ผู้ใช้กำลังทำอยู่ "
-                            "ให้เป็นกันเองแบบเพื่อน พูดสั้น กระชับ และสุภาพน้อยลงเล็กน้อยตามโทนบทบาทเดิม"
-                        )
-                        try:
-                            await safe_send_text(prompt)
-                            st["last_proactive"] = now
-                        except Exception as e:
-                            print(f"proactive_monitor send error: {e}")
-                    await asyncio.sleep(2)
-            except asyncio.CancelledError:
-                return
+        # Start the idle countdown from connect time
+        mark_activity()
 
+        # Run both receiving tasks concurrently
         async with asyncio.TaskGroup() as tg:
-            tg.create_task(receive_from_client())
-            tg.create_task(receive_from_gemini())
-            tg.create_task(idle_monitor())
-            tg.create_task(proactive_monitor())
+            client_task = tg.create_task(loop_monitor.meter(cpu, "client", receive_from_client()))
+            gemini_task = tg.create_task(loop_monitor.meter(cpu, "gemini", receive_from_gemini()))
+            # The session ends with the client; don't keep waiting on Gemini
+            client_task.add_done_callback(lambda _t: gemini_task.cancel())
 
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
         # Cleanup
-        if client_id in connections:
-            await connections[client_id].close()
-            del connections[client_id]
-        # Stop yt watcher if running
-        if client_id in yt_watchers:
-            try:
-                prev_thread = yt_watchers[client_id].get("thread")
-                prev_stop = yt_watchers[client_id].get("stop")
-                if prev_stop and isinstance(prev_stop, threading.Event):
-                    prev_stop.set()
-                if prev_thread and prev_thread.is_alive():
-                    prev_thread.join(timeout=2)
-            except Exception:
-                pass
-            finally:
-                del yt_watchers[client_id]
-        if client_id in client_states:
+        metrics.active_sessions.dec()
+        if audio_batcher is not None:
             try:
-                del client_states[client_id]
+                await audio_batcher.close()
             except Exception:
                 pass
+            logger.info(f"Audio batching stats for client {client_id}: {audio_batcher.stats()}")
+        admission.unwatch(*send_queues)
+        # Timers, digest, YT watcher, drain/transcode tasks and the Gemini link
+        await session.close()
+        if token is not None:
+            await registry.unregister(client_id, token)
+        if recorder is not None:
+            await recorder.close()
+            logger.info(f"Session capture for client {client_id}: {recorder.stats()}")
+        loop_monitor.forget(cpu)
+        logger.info(f"Session task CPU for client {client_id}: {cpu.as_dict()}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # More than one worker needs REGISTRY_BACKEND=broker to share sessions and YT chat
+    workers = int(os.environ.get("WORKERS", "1"))
+    if workers > 1:
+        uvicorn.run("TestV1:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""Admission control and load shedding for new and running sessions.
+
+Every session of a worker shares one event loop, so past capacity all of
+them get slower together. ``AdmissionController`` keeps latency stable at
+the edge by degrading in steps, driven by two measurements:
+
+* event-loop lag (``LoopMonitor.last_lag``),
+* mean depth of the per-session send queues (``MediaQueue.depth``).
+
+Each signal is smoothed (exponential moving average over evaluations, so a
+single GC pause doesn't trip it) and compared against three thresholds;
+the worse of the two sets the pressure level:
+
+* ``LEVEL_REDUCE_IMAGES``: screen/camera frames are forwarded at most once
+  per ``image_interval`` seconds per session;
+* ``LEVEL_NO_PROACTIVE``: proactive small-talk prompts are skipped as well;
+* ``LEVEL_REFUSE``: new sessions are refused (the endpoint closes them with
+  1013, "try again later").
+
+The level goes up as soon as a threshold is crossed and comes down one step
+at a time once pressure has stayed lower for ``cooldown`` seconds, so it
+doesn't flap. New sessions also draw from a token bucket (``rate`` per
+second, ``burst`` deep) so a reconnect storm can't open hundreds of Gemini
+sessions at once. A session that was admitted but could not start after
+all (the host's session cap) gives its token back with ``refund()``, so
+refusals at capacity don't drain the bucket for the sessions that follow.
+Signals are evaluated lazily, at most every ``interval`` seconds, by
+whichever call needs the level.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Optional, Sequence, Set
+
+import metrics
+from media_queue import MediaQueue
+
+logger = logging.getLogger(__name__)
+
+LEVEL_NORMAL = 0
+LEVEL_REDUCE_IMAGES = 1
+LEVEL_NO_PROACTIVE = 2
+LEVEL_REFUSE = 3
+
+LEVEL_NAMES = ("normal", "reduce_images", "no_proactive", "refuse")
+
+REFUSED_RATE = "rate"
+REFUSED_OVERLOAD = "overload"
+
+
+def _level_for(value: float, thresholds: Sequence[float]) -> int:
+    level = LEVEL_NORMAL
+    for i, threshold in enumerate(thresholds[:LEVEL_REFUSE]):
+        if threshold > 0 and value >= threshold:
+            level = i + 1
+    return level
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        lag: Callable[[], float],
+        rate: float = 0.0,
+        burst: int = 10,
+        lag_ms: Sequence[float] = (50.0, 100.0, 250.0),
+        queue_depth: Sequence[float] = (8.0, 16.0, 32.0),
+        image_interval: float = 2.0,
+        cooldown: float = 5.0,
+        interval: float = 1.0,
+        smoothing: float = 0.5,
+    ):
+        self._lag = lag
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.lag_ms = tuple(lag_ms)
+        self.queue_depth = tuple(queue_depth)
+        self.image_interval = image_interval
+        self.cooldown = cooldown
+        self.interval = interval
+        self.smoothing = smoothing  # weight of the newest sample
+
+        self._queues: Set[MediaQueue] = set()
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._evaluated = 0.0
+        self._calm_since = 0.0  # since when pressure has been below the current level
+        self._level = LEVEL_NORMAL
+
+        self.last_lag_ms = 0.0
+        self.last_queue_depth = 0.0
+        self.admitted = 0
+        self.refused_rate = 0
+        self.refused_overload = 0
+        self.refunded = 0
+        self.level_changes = 0
+
+    @property
+    def level(self) -> int:
+        now = time.monotonic()
+        if now - self._evaluated >= self.interval:
+            self._evaluate(now)
+        return self._level
+
+    def watch(self, *queues: MediaQueue):
+        self._queues.update(queues)
+
+    def unwatch(self, *queues: MediaQueue):
+        self._queues.difference_update(queues)
+
+    def admit(self) -> Optional[str]:
+        """None if a new session may start, else why not (REFUSED_*)."""
+        if self.level >= LEVEL_REFUSE:
+            self.refused_overload += 1
+            metrics.load_shed.inc("refuse_overload")
+            return REFUSED_OVERLOAD
+        if self.rate > 0:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1.0:
+                self.refused_rate += 1
+                metrics.load_shed.inc("refuse_rate")
+                return REFUSED_RATE
+            self._tokens -= 1.0
+        self.admitted += 1
+        return None
+
+    def refund(self):
+        """Undo the last ``admit()`` for a session that was refused further on (e.g. host full)."""
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + 1.0)
+        self.admitted -= 1
+        self.refunded += 1
+
+    def image_allowed(self, last_sent: float) -> bool:
+        """Whether a session that last forwarded a frame at ``last_sent`` (monotonic) may send another."""
+        if self.level < LEVEL_REDUCE_IMAGES or time.monotonic() - last_sent >= self.image_interval:
+            return True
+        metrics.load_shed.inc("image")
+        return False
+
+    def proactive_allowed(self) -> bool:
+        if self.level < LEVEL_NO_PROACTIVE:
+            return True
+        metrics.load_shed.inc("proactive")
+        return False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "level": LEVEL_NAMES[self.level],
+            "lag_ms": round(self.last_lag_ms, 2),
+            "queue_depth": round(self.last_queue_depth, 2),
+            "queues": len(self._queues),
+            "tokens": round(self._tokens, 2),
+            "admitted": self.admitted,
+            "refused_rate": self.refused_rate,
+            "refused_overload": self.refused_overload,
+            "refunded": self.refunded,
+            "level_changes": self.level_changes,
+        }
+
+    def _evaluate(self, now: float):
+        self._evaluated = now
+        depths = [q.depth() for q in self._queues]
+        depth = sum(depths) / len(depths) if depths else 0.0
+        a = self.smoothing
+        self.last_lag_ms += a * (self._lag() * 1000.0 - self.last_lag_ms)
+        self.last_queue_depth += a * (depth - self.last_queue_depth)
+        target = max(_level_for(self.last_lag_ms, self.lag_ms), _level_for(self.last_queue_depth, self.queue_depth))
+
+        if target >= self._level:
+            self._calm_since = now
+            if target > self._level:
+                self._set_level(target)
+        elif now - self._calm_since >= self.cooldown:
+            # Step down one level per cooldown period
+            self._calm_since = now
+            self._set_level(self._level - 1)
+
+    def _set_level(self, level: int):
+        logger.warning(
+            f"Load level {LEVEL_NAMES[self._level]} -> {LEVEL_NAMES[level]} "
+            f"(loop lag {self.last_lag_ms:.0f} ms, mean queue depth {self.last_queue_depth:.1f})"
+        )
+        self._level = level
+        self.level_changes += 1
+        metrics.load_level.set(value=level)
@@ -0,0 +1,138 @@
+"""Per-session batching of microphone audio before it is sent to Gemini.
+
+The browser streams 16 kHz PCM16 in small chunks (512 samples = 32 ms).
+Forwarding each chunk as its own ``realtime_input`` message means one
+upstream WebSocket send per chunk. ``AudioCoalescer`` buffers raw PCM and
+flushes it as a single message when:
+
+* the buffered audio reaches ``window_ms`` ("window"),
+* the oldest buffered chunk has waited ``max_delay_ms`` ("deadline"),
+* the user stops speaking ("speech_end"), or
+* the session shuts down ("close").
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FLUSH_REASONS = ("window", "deadline", "speech_end", "close")
+
+
+class AudioCoalescer:
+    def __init__(
+        self,
+        send: Callable[[bytes], Awaitable[None]],
+        window_ms: float = 100.0,
+        max_delay_ms: float = 200.0,
+        sample_rate: int = 16000,
+        sample_width: int = 2,
+    ):
+        self._send = send
+        self.window_ms = window_ms
+        self.max_delay_ms = max(max_delay_ms, window_ms)
+        self._bytes_per_ms = sample_rate * sample_width / 1000.0
+        self._window_bytes = int(window_ms * self._bytes_per_ms)
+
+        self._chunks: List[bytes] = []
+        self._buffered = 0
+        self._first_at = 0.0
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+
+        # Counters (see stats())
+        self.chunks_in = 0
+        self.bytes_in = 0
+        self.messages_out = 0
+        self.flushes: Dict[str, int] = {r: 0 for r in FLUSH_REASONS}
+        self.max_wait_ms = 0.0
+        self._wait_total_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0
+
+    async def add(self, pcm: bytes):
+        """Queue one PCM chunk; flushes when the window is full."""
+        if self._closed:
+            return
+        self.chunks_in += 1
+        self.bytes_in += len(pcm)
+        if not self.enabled:
+            self.messages_out += 1
+            await self._send(pcm)
+            return
+
+        if not self._chunks:
+            self._first_at = time.monotonic()
+            self._arm_deadline()
+        self._chunks.append(bytes(pcm))
+        self._buffered += len(pcm)
+
+        if self._buffered >= self._window_bytes:
+            await self.flush("window")
+
+    async def flush(self, reason: str = "window"):
+        """Send everything buffered as one message."""
+        if not self._chunks:
+            return
+        chunks = self._chunks
+        self._chunks = []
+        self._buffered = 0
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+
+        waited_ms = (time.monotonic() - self._first_at) * 1000.0
+        self._wait_total_ms += waited_ms
+        if waited_ms > self.max_wait_ms:
+            self.max_wait_ms = waited_ms
+        self.flushes[reason] = self.flushes.get(reason, 0) + 1
+        self.messages_out += 1
+
+        await self._send(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+
+    async def close(self):
+        """Flush what is left and stop accepting audio."""
+        try:
+            await self.flush("close")
+        finally:
+            self._closed = True
+            if self._deadline is not None:
+                self._deadline.cancel()
+                self._deadline = None
+
+    def _arm_deadline(self):
+        loop = asyncio.get_running_loop()
+        self._deadline = loop.call_later(self.max_delay_ms / 1000.0, self._on_deadline)
+
+    def _on_deadline(self):
+        self._deadline = None
+        task = asyncio.ensure_future(self.flush("deadline"))
+        task.add_done_callback(_log_task_error)
+
+    def stats(self) -> Dict[str, object]:
+        """Per-session counters for tuning the window."""
+        flushed = sum(self.flushes.values())
+        return {
+            "window_ms": self.window_ms,
+            "max_delay_ms": self.max_delay_ms,
+            "chunks_in": self.chunks_in,
+            "bytes_in": self.bytes_in,
+            "messages_out": self.messages_out,
+            "chunks_per_message": round(self.chunks_in / self.messages_out, 2) if self.messages_out else 0.0,
+            "flushes": dict(self.flushes),
+            "avg_wait_ms": round(self._wait_total_ms / flushed, 1) if flushed else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+            "buffered_bytes": self._buffered,
+        }
+
+
+def _log_task_error(task: "asyncio.Future"):
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning(f"Audio coalescer deadline flush failed: {exc}")
@@ -0,0 +1,141 @@
+"""Downstream audio encodings for model speech sent to the browser.
+
+Gemini speaks 24 kHz PCM16 (48 KB/s). The client can ask for a smaller
+encoding in the initial config message
+(``{"type": "config", "audioEncoding": "mulaw", ...}``); the server
+acknowledges with ``{"type": "audio_encoding", "data": ..., "sampleRate":
+24000, "frameMs": ...}``. Supported encodings:
+
+* ``pcm16``: unchanged (default, and the fallback for anything unknown);
+* ``mulaw``: G.711 μ-law, one byte per sample (half the bytes), encoded
+  with a 64K-entry lookup table so a chunk is a single NumPy gather and the
+  browser decodes it with a 256-entry table, no native codec needed.
+
+IMA ADPCM would halve the size again, but its step adaptation is
+sample-by-sample sequential and cannot be vectorised in NumPy, so it is
+not offered.
+
+``AudioEncoder`` also re-frames the stream: Gemini's chunks vary in size,
+so audio is cut into packets of exactly ``frame_ms`` before encoding and
+the tail is flushed at the end of each turn.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+ENCODING_PCM16 = "pcm16"
+ENCODING_MULAW = "mulaw"
+SUPPORTED_ENCODINGS = (ENCODING_PCM16, ENCODING_MULAW)
+
+SAMPLE_RATE = 24000
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 32635
+
+
+def _build_mulaw_table() -> np.ndarray:
+    # Indexed by the sample's bit pattern read as uint16
+    samples = np.arange(65536, dtype=np.uint32).astype(np.uint16).view(np.int16).astype(np.int32)
+    sign = (samples < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(samples), _MULAW_CLIP) + _MULAW_BIAS
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def _build_mulaw_decode_table() -> np.ndarray:
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    mantissa = u & 0x0F
+    magnitude = (((mantissa << 3) + _MULAW_BIAS) << exponent) - _MULAW_BIAS
+    return np.where(u & 0x80, -magnitude, magnitude).astype("<i2")
+
+
+_MULAW_ENCODE = _build_mulaw_table()
+_MULAW_DECODE = _build_mulaw_decode_table()
+
+
+def mulaw_encode(pcm: bytes) -> bytes:
+    """Little-endian PCM16 to G.711 μ-law, one byte per sample."""
+    return _MULAW_ENCODE[np.frombuffer(pcm, dtype="<u2")].tobytes()
+
+
+def mulaw_decode(data: bytes) -> bytes:
+    """G.711 μ-law back to little-endian PCM16."""
+    return _MULAW_DECODE[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+def negotiate_audio_encoding(config_message: dict) -> str:
+    """Pick the downstream audio encoding requested in the initial config message.
+
+    Like ``negotiate_protocol``, the field is accepted at the top level or
+    inside the nested ``config`` object; anything unknown falls back to PCM16.
+    """
+    requested = config_message.get("audioEncoding")
+    if requested is None:
+        nested = config_message.get("config")
+        if isinstance(nested, dict):
+            requested = nested.get("audioEncoding")
+    if requested in SUPPORTED_ENCODINGS:
+        return requested  # type: ignore[return-value]
+    return ENCODING_PCM16
+
+
+class AudioEncoder:
+    def __init__(self, encoding: str, frame_ms: float = 40.0, sample_rate: int = SAMPLE_RATE):
+        self.encoding = encoding
+        self.frame_ms = frame_ms
+        self.frame_bytes = max(1, int(sample_rate * frame_ms / 1000)) * 2
+        self._buf = bytearray()
+
+        self.frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def encode(self, pcm: bytes) -> List[bytes]:
+        """Buffer ``pcm`` and return every complete packet, encoded."""
+        self.bytes_in += len(pcm)
+        self._buf += pcm
+        n = len(self._buf) - len(self._buf) % self.frame_bytes
+        if n == 0:
+            return []
+        whole = bytes(self._buf[:n])
+        del self._buf[:n]
+        return self._packets(whole, self.frame_bytes)
+
+    def flush(self) -> List[bytes]:
+        """Encode whatever is buffered (end of turn), as one short packet."""
+        n = len(self._buf) - len(self._buf) % 2  # an odd trailing byte is not a sample
+        tail = bytes(self._buf[:n])
+        self._buf.clear()
+        if n == 0:
+            return []
+        return self._packets(tail, n)
+
+    def reset(self) -> int:
+        """Discard buffered audio (barge-in); returns the bytes dropped."""
+        dropped = len(self._buf)
+        self._buf.clear()
+        return dropped
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "encoding": self.encoding,
+            "frame_ms": self.frame_ms,
+            "frames": self.frames,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+    def _packets(self, pcm: bytes, frame_bytes: int) -> List[bytes]:
+        if self.encoding == ENCODING_MULAW:
+            data = mulaw_encode(pcm)
+            step = frame_bytes // 2
+        else:
+            data = pcm
+            step = frame_bytes
+        packets = [data[i:i + step] for i in range(0, len(data), step)]
+        self.frames += len(packets)
+        self.bytes_out += len(data)
+        return packets
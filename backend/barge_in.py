@@ -0,0 +1,144 @@
+"""Per-session model turn tracking and barge-in.
+
+``TurnTracker`` follows what the model is doing for one session: whether a
+turn is in progress, how long the browser will keep playing the audio
+already sent to it, and whether the user talked over the current turn.
+
+* ``speech_started`` (VAD or client ``user_activity``): if the model is
+  talking, or the browser is still playing its audio, the queued model
+  audio is dropped, the audio encoder is reset and an ``interrupted``
+  control message is queued for the browser ("barge-in").
+* ``model_response``: applies a decoded Gemini message. While interrupted,
+  the audio parts still arriving for the cut-off turn are dropped until
+  ``turnComplete`` or Gemini's own ``interrupted``; Gemini's ``interrupted``
+  flushes too unless a barge-in already did.
+* ``reconnected``: a replacement Gemini connection never finishes the old
+  turn, so the interrupted state is cleared.
+
+All timestamps are ``time.monotonic()``.
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import metrics
+from audio_codec import AudioEncoder
+from gemini_decoder import KIND_AUDIO, Raw, ServerMessage
+from media_queue import MediaQueue
+
+logger = logging.getLogger(__name__)
+
+# 24 kHz PCM16 from Gemini: 48000 bytes per second of playback
+PLAYBACK_BYTES_PER_SECOND = 48000
+
+
+class TurnTracker:
+    def __init__(
+        self,
+        downstream: MediaQueue,
+        send_interrupted: Callable[[], Awaitable[Any]],
+        encoder: Optional[AudioEncoder] = None,
+        enabled: bool = True,
+    ):
+        self.downstream = downstream
+        self.send_interrupted = send_interrupted
+        self.encoder = encoder
+        self.enabled = enabled  # False: user speech never cuts the model off
+
+        self.speech_ended_at: Optional[float] = None  # user speech end, until the first model audio
+        self.turn_started_at: Optional[float] = None  # first model output of the current turn
+        self.playback_until = 0.0  # when the browser finishes playing queued model audio
+        self.interrupted = False  # drop model audio until the interrupted turn ends
+
+        self.turns = 0
+        self.barge_ins = 0
+        self.dropped_queued = 0
+        self.dropped_incoming = 0
+
+    def talking(self) -> bool:
+        """The model is generating a turn the user hasn't cut off."""
+        return self.turn_started_at is not None and not self.interrupted
+
+    def playing(self) -> bool:
+        return time.monotonic() < self.playback_until
+
+    async def speech_started(self, source: str) -> bool:
+        """User speech onset: cut off the model if it is still talking. True if it was."""
+        if not self.enabled:
+            return False
+        talking = self.talking()
+        if not talking and not self.playing():
+            return False
+        if talking:
+            # The rest of this turn is still on its way from Gemini
+            self.interrupted = True
+            self.turn_started_at = None
+        await self._flush(source)
+        return True
+
+    def speech_ended(self, keep_first: bool = False):
+        if keep_first and self.speech_ended_at is not None:
+            return
+        self.speech_ended_at = time.monotonic()
+
+    async def model_response(self, response: ServerMessage):
+        """Apply a decoded Gemini message; drops ``response.parts`` audio of an interrupted turn."""
+        if response.interrupted:
+            # Gemini heard the user too; flush here unless a barge-in already did
+            if not self.interrupted and (self.turn_started_at is not None or self.playing()):
+                await self._flush("gemini")
+            self.interrupted = False
+            self.turn_started_at = None
+        elif self.interrupted:
+            # Rest of a turn the user talked over: drop its audio until the turn ends
+            stale = len(response.parts)
+            response.parts = [(k, d) for k, d in response.parts if k != KIND_AUDIO]
+            dropped = stale - len(response.parts)
+            self.dropped_incoming += dropped
+            metrics.barge_in_dropped_audio.inc("incoming", value=dropped)
+        if response.parts and not self.interrupted:
+            now = time.monotonic()
+            if self.turn_started_at is None:
+                self.turn_started_at = now
+            if self.speech_ended_at is not None and any(k == KIND_AUDIO for k, _ in response.parts):
+                metrics.speech_to_audio_seconds.observe(now - self.speech_ended_at)
+                self.speech_ended_at = None
+
+    def audio_sent(self, data: Raw):
+        """Account for a base64 audio part forwarded to the browser."""
+        seconds = len(data) * 3 / 4 / PLAYBACK_BYTES_PER_SECOND
+        self.playback_until = max(self.playback_until, time.monotonic()) + seconds
+
+    def turn_complete(self):
+        self.interrupted = False
+        self.turns += 1
+        if self.turn_started_at is not None:
+            metrics.turn_seconds.observe(time.monotonic() - self.turn_started_at)
+            self.turn_started_at = None
+
+    def reconnected(self):
+        """A new Gemini connection: the old turn will never complete."""
+        self.interrupted = False
+        self.turn_started_at = None
+
+    async def _flush(self, source: str):
+        self.playback_until = 0.0
+        self.barge_ins += 1
+        dropped = self.downstream.drop_audio()
+        self.dropped_queued += dropped
+        if self.encoder is not None:
+            self.encoder.reset()
+        metrics.barge_ins.inc(source)
+        metrics.barge_in_dropped_audio.inc("queued", value=dropped)
+        logger.debug(f"Barge-in ({source}): dropped {dropped} queued audio chunks")
+        await self.downstream.put_control(self.send_interrupted)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "turns": self.turns,
+            "barge_ins": self.barge_ins,
+            "interrupted": self.interrupted,
+            "dropped_queued": self.dropped_queued,
+            "dropped_incoming": self.dropped_incoming,
+        }
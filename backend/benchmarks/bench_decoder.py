@@ -0,0 +1,70 @@
+"""Gemini server-message decoding: legacy path vs gemini_decoder.
+
+Usage: python benchmarks/bench_decoder.py [iterations]
+
+"legacy" is what receive_from_gemini used to do per message: json.loads,
+walk serverContent/modelTurn/parts through KeyError, then json.dumps the
+audio part the way websocket.send_json does. "decoder" is
+decode_server_message + audio_json_frame. Both run on a typical 40 ms
+24 kHz audio chunk, as a text frame and as a binary frame.
+"""
+
+import base64
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from gemini_decoder import audio_json_frame, decode_server_message, orjson  # noqa: E402
+
+PCM = os.urandom(24000 * 2 * 40 // 1000)
+MESSAGE = json.dumps({
+    "serverContent": {
+        "modelTurn": {
+            "parts": [{"inlineData": {"mimeType": "audio/pcm;rate=24000", "data": base64.b64encode(PCM).decode()}}]
+        }
+    }
+})
+MESSAGE_BYTES = MESSAGE.encode()
+
+
+def legacy(msg):
+    response = json.loads(msg)
+    out = []
+    try:
+        for p in response["serverContent"]["modelTurn"]["parts"]:
+            if "inlineData" in p:
+                out.append(json.dumps({"type": "audio", "data": p["inlineData"]["data"]}, separators=(",", ":")))
+    except KeyError:
+        pass
+    try:
+        if response["serverContent"]["turnComplete"]:
+            out.append("turn_complete")
+    except KeyError:
+        pass
+    return out
+
+
+def decoder(msg):
+    response = decode_server_message(msg)
+    return [audio_json_frame(data) for _kind, data in response.parts]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    assert legacy(MESSAGE) == decoder(MESSAGE) == decoder(MESSAGE_BYTES)
+    print(f"message size {len(MESSAGE)} bytes, orjson={'yes' if orjson else 'no'}")
+    for name, fn, msg in [
+        ("legacy (str)", legacy, MESSAGE),
+        ("decoder (str)", decoder, MESSAGE),
+        ("legacy (bytes)", legacy, MESSAGE_BYTES),
+        ("decoder (bytes)", decoder, MESSAGE_BYTES),
+    ]:
+        t = timeit.timeit(lambda: fn(msg), number=n)
+        print(f"{name:>16}: {t / n * 1e6:8.2f} us/msg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Frame transcoding throughput: single core and through ImageTranscoder.
+
+Usage: python benchmarks/bench_images.py [frames] [workers]
+
+Encodes a synthetic screen-share frame (text-like stripes and blocks) at
+3840x2160 and 1920x1080, quality 90, then reports frames/s for
+image_transcoder.transcode on one core, frames/s per worker through the
+process pool, and bytes in/out at the default 1024 px / q70 budget.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from image_transcoder import ImageTranscoder, transcode  # noqa: E402
+
+MAX_EDGE = 1024
+QUALITY = 70
+
+
+def screen_frame(width: int, height: int) -> bytes:
+    img = Image.new("RGB", (width, height), (245, 245, 245))
+    draw = ImageDraw.Draw(img)
+    for y in range(0, height, 24):
+        for x in range(0, width, 300):
+            draw.rectangle([x + 10, y + 6, x + 10 + (x * 7 + y) % 260, y + 16], fill=((x // 3) % 255, 60, (y // 5) % 255))
+    draw.rectangle([width // 4, height // 4, width // 2, height // 2], fill=(30, 90, 200))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+async def pooled(jpeg: bytes, frames: int, workers: int) -> float:
+    transcoder = ImageTranscoder(MAX_EDGE, QUALITY, workers, max_inflight=frames)
+    transcoder.start()
+    try:
+        await transcoder.submit(jpeg)  # spin up the worker processes
+        start = time.perf_counter()
+        await asyncio.gather(*(transcoder.submit(jpeg) for _ in range(frames)))
+        return time.perf_counter() - start
+    finally:
+        await transcoder.stop()
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    for width, height in [(3840, 2160), (1920, 1080)]:
+        jpeg = screen_frame(width, height)
+        out = transcode(jpeg, MAX_EDGE, QUALITY)
+        start = time.perf_counter()
+        for _ in range(frames):
+            transcode(jpeg, MAX_EDGE, QUALITY)
+        single = time.perf_counter() - start
+        pool = asyncio.run(pooled(jpeg, frames, workers))
+        print(f"{width}x{height}: {len(jpeg) / 1024:7.1f} KB -> {len(out) / 1024:6.1f} KB  "
+              f"1 core {frames / single:6.1f} frames/s  "
+              f"pool({workers}) {frames / pool:6.1f} frames/s ({frames / pool / workers:.1f}/worker)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Bytes per idle session and state access cost: state dicts vs Session.
+
+Usage: python benchmarks/bench_sessions.py [sessions]
+
+"dicts" rebuilds what websocket_endpoint used to keep per client: the
+``st`` state dict, the ``session`` dict handed to the registry and the
+closure cells of the per-turn variables. "slots" is one
+``session_state.Session``. "idle" adds the per-session helpers every
+connection creates before any media flows (send queues, turn tracker,
+mic batcher, frame filter, chat digest), for scale. Sizes come from tracemalloc, so
+they include every nested object; access is one read + one write of a
+timestamp, the pattern of the idle / turn bookkeeping.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from audio_coalescer import AudioCoalescer  # noqa: E402
+from barge_in import TurnTracker  # noqa: E402
+from chat_digest import ChatDigest  # noqa: E402
+from frame_filter import FrameFilter  # noqa: E402
+from media_queue import MediaQueue  # noqa: E402
+from session_state import Session  # noqa: E402
+from timer_wheel import TimerWheel  # noqa: E402
+
+
+def make_cell(value):
+    return (lambda: value).__closure__[0]  # type: ignore[index]
+
+
+def legacy_session(client_id: str):
+    st = {
+        "last_activity": time.time(),
+        "allow_yt_reply": False,
+        "mode": "audio",
+        "last_image": 0.0,
+        "last_yt_chat": 0.0,
+        "last_proactive": 0.0,
+    }
+    session = {"gemini": None, "yt": None, "state": st}
+    # nonlocal cells: gemini, link, idle_timer, proactive_timer, chat_digest,
+    # drain_tasks, image_task, speech_ended_at, turn_started_at,
+    # interrupted, playback_until, image_sent_at
+    cells = [make_cell(v) for v in (None, None, None, None, None, [], None, None, None, False, 0.0, 0.0)]
+    return client_id, session, cells
+
+
+def slots_session(client_id: str):
+    return Session(client_id)
+
+
+async def _noop(_data=None):
+    pass
+
+
+def idle_session(client_id: str, timers: TimerWheel):
+    session = Session(client_id)
+    session.digest = ChatDigest(lambda text, lines: None, lambda: False, timers)
+    downstream = MediaQueue("downstream")
+    session.turn = TurnTracker(downstream, _noop)
+    return (
+        session,
+        MediaQueue("upstream"),
+        downstream,
+        AudioCoalescer(_noop),
+        FrameFilter(),
+    )
+
+
+def bytes_per_session(factory, count: int) -> float:
+    ids = [f"client-{i:06d}" for i in range(count)]  # not counted
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [factory(client_id) for client_id in ids]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del keep
+    return size / count
+
+
+def access_ns(stmt: str, setup_globals: dict, number: int = 1_000_000) -> float:
+    return min(timeit.repeat(stmt, globals=setup_globals, number=number, repeat=5)) / number * 1e9
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    timers = TimerWheel(tick=0.25)
+
+    dicts = bytes_per_session(legacy_session, count)
+    slots = bytes_per_session(slots_session, count)
+    idle = bytes_per_session(lambda client_id: idle_session(client_id, timers), count)
+    print(f"{'state':>6} {'bytes/session':>14}   ({count} sessions)")
+    print(f"{'dicts':>6} {dicts:>14.0f}")
+    print(f"{'slots':>6} {slots:>14.0f}")
+    print(f"{'idle':>6} {idle:>14.0f}   (slots + queues, turn tracker, mic batcher, frame filter, chat digest)")
+
+    _, legacy, _ = legacy_session("x")
+    st = legacy["state"]
+    session = Session("x")
+    env = {"st": st, "session": session, "time": time}
+    d = access_ns('st["last_image"] = st["last_image"] + 1.0', env)
+    s = access_ns("session.last_image = session.last_image + 1.0", env)
+    print(f"\nread+write a timestamp: dict {d:.1f} ns, slots {s:.1f} ns")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Wakeups per second: per-session polling monitors vs the shared timer wheel.
+
+Usage: python benchmarks/bench_timers.py [seconds] [session counts...]
+
+"polling" reproduces the old idle_monitor (1 s) + proactive_monitor (2 s)
+loops, one pair per session. "wheel" gives every session an idle deadline
+and a proactive cooldown on one TimerWheel and re-arms the idle deadline on
+simulated user activity, like websocket_endpoint does.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from timer_wheel import TimerWheel  # noqa: E402
+
+
+async def bench_polling(sessions: int, duration: float) -> float:
+    wakeups = 0
+
+    async def monitor(period: float):
+        nonlocal wakeups
+        while True:
+            await asyncio.sleep(period)
+            wakeups += 1
+
+    tasks = [asyncio.create_task(monitor(p)) for _ in range(sessions) for p in (1.0, 2.0)]
+    await asyncio.sleep(duration)
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return wakeups / duration
+
+
+async def bench_wheel(sessions: int, duration: float) -> float:
+    wheel = TimerWheel(tick=0.25)
+    idle = [None] * sessions
+
+    def on_idle(i: int):
+        idle[i] = None
+        wheel.schedule(30.0, lambda: None)  # proactive cooldown
+
+    def activity(i: int):
+        if idle[i] is not None:
+            idle[i].cancel()
+        idle[i] = wheel.schedule(10.0, on_idle, i)
+
+    for i in range(sessions):
+        activity(i)
+
+    # A few percent of sessions talk every second
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for i in random.sample(range(sessions), max(1, sessions // 30)):
+            activity(i)
+        await asyncio.sleep(1.0)
+    return wheel.wakeups / duration
+
+
+async def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    counts = [int(a) for a in sys.argv[2:]] or [10, 100, 1000, 5000]
+    print(f"{'sessions':>8} {'polling/s':>10} {'wheel/s':>8}")
+    for n in counts:
+        polling = await bench_polling(n, duration)
+        wheel = await bench_wheel(n, duration)
+        print(f"{n:>8} {polling:>10.1f} {wheel:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+"""Batch, dedup and rate-limit YouTube chat before it reaches the model.
+
+Forwarding every chat line as its own Gemini turn floods the model on busy
+streams, and spam or copy-pasted lines each cost a full turn. ``ChatDigest``
+sits between the chat hub callback and ``send_text``:
+
+* identical or near-identical lines (same text after case folding,
+  punctuation/emoji stripping and squashing repeated characters) seen within
+  ``dedup_window`` seconds are merged into the pending line, or dropped if
+  it was already sent; the seen-set is an LRU capped at ``dedup_size``;
+* each author gets a token bucket of ``author_per_minute`` lines;
+* lines collected over ``window`` seconds are sent as one digest turn,
+  keeping the newest ``max_lines``;
+* at most ``turns_per_minute`` digests are sent, and a digest over budget
+  waits (still collecting lines) until the budget allows it.
+
+A digest is only sent while ``allow()`` is true (the session is idle);
+lines pending when it turns false are discarded, as before. ``send`` gets
+the formatted turn and the chat texts it was built from.
+"""
+
+import collections
+import re
+import time
+import unicodedata
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from timer_wheel import Timer, TimerWheel
+
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def normalize(text: str) -> str:
+    """Dedup key: case-folded letters/digits/marks with repeated characters squashed."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    kept = "".join(ch if unicodedata.category(ch)[0] in "LNM" else " " for ch in text)
+    return _REPEATS.sub(r"\1", " ".join(kept.split()))
+
+
+class _Line:
+    __slots__ = ("user", "text", "count")
+
+    def __init__(self, user: str, text: str):
+        self.user = user
+        self.text = text
+        self.count = 1
+
+
+class ChatDigest:
+    def __init__(
+        self,
+        send: Callable[[str, List[str]], Any],
+        allow: Callable[[], bool],
+        timers: TimerWheel,
+        window: float = 3.0,
+        max_lines: int = 20,
+        turns_per_minute: int = 6,
+        author_per_minute: float = 6.0,
+        dedup_window: float = 60.0,
+        dedup_size: int = 512,
+    ):
+        self._send = send
+        self._allow = allow
+        self._timers = timers
+        self.window = window
+        self.max_lines = max_lines
+        self.turns_per_minute = turns_per_minute
+        self.author_per_minute = author_per_minute
+        self.dedup_window = dedup_window
+        self.dedup_size = dedup_size
+
+        self._pending: "collections.OrderedDict[str, _Line]" = collections.OrderedDict()
+        self._seen: "collections.OrderedDict[str, float]" = collections.OrderedDict()
+        self._authors: "collections.OrderedDict[str, List[float]]" = collections.OrderedDict()  # user -> [tokens, updated]
+        self._turns: Deque[float] = collections.deque()
+        self._timer: Optional[Timer] = None
+
+        self.lines_in = 0
+        self.merged = 0
+        self.dropped_duplicate = 0
+        self.dropped_rate = 0
+        self.dropped_overflow = 0
+        self.dropped_inactive = 0
+        self.deferred = 0
+        self.turns = 0
+        self.lines_sent = 0
+
+    def add(self, user: str, text: str):
+        self.lines_in += 1
+        now = time.monotonic()
+        key = normalize(text) or text
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.count += 1
+            self.merged += 1
+            return
+        seen_at = self._seen.get(key)
+        if seen_at is not None and now - seen_at < self.dedup_window:
+            self.dropped_duplicate += 1
+            return
+        if not self._take_author_token(user, now):
+            self.dropped_rate += 1
+            return
+
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+
+        self._pending[key] = _Line(user, text)
+        while len(self._pending) > self.max_lines:
+            self._pending.popitem(last=False)
+            self.dropped_overflow += 1
+        if self._timer is None:
+            self._timer = self._timers.schedule(self.window, self._flush)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pending": len(self._pending),
+            "lines_in": self.lines_in,
+            "lines_sent": self.lines_sent,
+            "turns": self.turns,
+            "merged": self.merged,
+            "dropped_duplicate": self.dropped_duplicate,
+            "dropped_rate": self.dropped_rate,
+            "dropped_overflow": self.dropped_overflow,
+            "dropped_inactive": self.dropped_inactive,
+            "deferred": self.deferred,
+        }
+
+    def _take_author_token(self, user: str, now: float) -> bool:
+        if self.author_per_minute <= 0:
+            return True
+        bucket = self._authors.get(user)
+        if bucket is None:
+            bucket = [self.author_per_minute, now]
+            self._authors[user] = bucket
+            while len(self._authors) > self.dedup_size:
+                self._authors.popitem(last=False)
+        else:
+            self._authors.move_to_end(user)
+            bucket[0] = min(self.author_per_minute, bucket[0] + (now - bucket[1]) * self.author_per_minute / 60.0)
+            bucket[1] = now
+        if bucket[0] < 1.0:
+            return False
+        bucket[0] -= 1.0
+        return True
+
+    def _flush(self):
+        self._timer = None
+        if not self._pending:
+            return
+        if not self._allow():
+            self.dropped_inactive += len(self._pending)
+            self._pending.clear()
+            return
+        now = time.monotonic()
+        while self._turns and now - self._turns[0] >= 60.0:
+            self._turns.popleft()
+        if self.turns_per_minute > 0 and len(self._turns) >= self.turns_per_minute:
+            self.deferred += 1
+            self._timer = self._timers.schedule(self._turns[0] + 60.0 - now, self._flush)
+            return
+
+        lines = list(self._pending.values())
+        self._pending.clear()
+        self._turns.append(now)
+        self.turns += 1
+        self.lines_sent += len(lines)
+        self._send(_format(lines), [line.text for line in lines])
+
+
+def _format(lines: List[_Line]) -> str:
+    def entry(line: _Line) -> str:
+        repeat = f" (x{line.count})" if line.count > 1 else ""
+        return f"{line.user}: {line.text}{repeat}"
+
+    if len(lines) == 1:
+        return f"[YouTube] {entry(lines[0])}"
+    body = "\n".join(f"- {entry(line)}" for line in lines)
+    return f"[YouTube] {len(lines)} new chat messages:\n{body}"
@@ -0,0 +1,142 @@
+"""Cheap classification of Gemini Live server messages.
+
+``receive_from_gemini`` runs once per model audio chunk per session. Most
+of those messages are a single ``inlineData`` audio part, so
+``decode_server_message`` recognises that shape with a few substring
+searches and slices the base64 payload straight out of the raw frame,
+without parsing JSON. Everything else (text parts, ``turnComplete``,
+``interrupted``, ``setupComplete``, ...) goes through a full parse, using ``orjson`` when it
+is installed.
+
+``audio_json_frame`` builds the browser's ``{"type": "audio", ...}`` text
+frame around that payload, so audio is relayed without being decoded and
+re-encoded.
+"""
+
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    _loads = json.loads
+
+KIND_AUDIO = "audio"
+KIND_TEXT = "text"
+KIND_TURN_COMPLETE = "turn_complete"
+KIND_INTERRUPTED = "interrupted"
+KIND_SETUP_COMPLETE = "setup_complete"
+KIND_OTHER = "other"
+# Not a message the decoder could read (bad JSON, unexpected shape); counted, then skipped
+KIND_MALFORMED = "malformed"
+
+Raw = Union[str, bytes]
+
+
+class ServerMessage:
+    __slots__ = ("kind", "parts", "turn_complete", "interrupted", "fast")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        # (KIND_AUDIO, base64 str/bytes as sliced from the frame) or (KIND_TEXT, text), in order
+        self.parts: List[Tuple[str, Raw]] = []
+        self.turn_complete = False
+        # Gemini stopped generating because it heard the user
+        self.interrupted = False
+        # True when decoded without a JSON parse
+        self.fast = False
+
+
+class _Patterns:
+    def __init__(self, enc):
+        self.inline = enc('"inlineData"')
+        self.data = enc('"data"')
+        self.text = enc('"text"')
+        self.turn_complete = enc('"turnComplete"')
+        self.interrupted = enc('"interrupted"')
+        self.quote = enc('"')
+        self.colon = enc(':')
+        self.backslash = enc('\\')
+
+
+_STR = _Patterns(lambda s: s)
+_BYTES = _Patterns(lambda s: s.encode("ascii"))
+
+
+def _fast_audio(msg: Raw) -> Optional[Raw]:
+    """Return the base64 payload if ``msg`` is a lone audio part, else None."""
+    p = _BYTES if isinstance(msg, (bytes, bytearray)) else _STR
+    start = msg.find(p.inline)  # type: ignore[arg-type]
+    if start < 0 or msg.find(p.inline, start + 1) >= 0:  # type: ignore[arg-type]
+        return None
+    if p.text in msg or p.turn_complete in msg or p.interrupted in msg:  # type: ignore[operator]
+        return None
+    key = msg.find(p.data, start)  # type: ignore[arg-type]
+    if key < 0:
+        return None
+    colon = msg.find(p.colon, key + len(p.data))  # type: ignore[arg-type]
+    open_q = msg.find(p.quote, colon + 1)  # type: ignore[arg-type]
+    if colon < 0 or open_q < 0 or msg[colon + 1:open_q].strip():
+        return None
+    close_q = msg.find(p.quote, open_q + 1)  # type: ignore[arg-type]
+    if close_q < 0:
+        return None
+    data = msg[open_q + 1:close_q]
+    if p.backslash in data:  # type: ignore[operator]
+        return None  # escaped payload: let the JSON parser deal with it
+    return data
+
+
+def decode_server_message(msg: Raw) -> ServerMessage:
+    """Classify one raw Gemini message (text or binary frame)."""
+    data = _fast_audio(msg)
+    if data is not None:
+        out = ServerMessage(KIND_AUDIO)
+        out.parts.append((KIND_AUDIO, data))
+        out.fast = True
+        return out
+    return _decode_parsed(_loads(msg))
+
+
+def _decode_parsed(response: Any) -> ServerMessage:
+    if not isinstance(response, dict):
+        return ServerMessage(KIND_OTHER)
+    if "setupComplete" in response:
+        return ServerMessage(KIND_SETUP_COMPLETE)
+    content = response.get("serverContent")
+    if not isinstance(content, dict):
+        return ServerMessage(KIND_OTHER)
+
+    out = ServerMessage(KIND_OTHER)
+    turn = content.get("modelTurn")
+    if isinstance(turn, dict):
+        for part in turn.get("parts") or ():
+            if "inlineData" in part:
+                out.parts.append((KIND_AUDIO, part["inlineData"]["data"]))
+            elif "text" in part:
+                out.parts.append((KIND_TEXT, part["text"]))
+    out.turn_complete = bool(content.get("turnComplete"))
+    out.interrupted = bool(content.get("interrupted"))
+    if out.parts:
+        out.kind = out.parts[0][0]
+    elif out.turn_complete:
+        out.kind = KIND_TURN_COMPLETE
+    elif out.interrupted:
+        out.kind = KIND_INTERRUPTED
+    return out
+
+
+def audio_json_frame(b64: Raw, encoding: Optional[str] = None) -> str:
+    """Same text as Starlette's ``send_json({"type": "audio", "data": b64})``, minus the encoder.
+
+    ``encoding`` (a plain identifier such as ``"mulaw"``) is added as an
+    ``"encoding"`` field when the payload is not PCM16.
+    """
+    if isinstance(b64, (bytes, bytearray)):
+        b64 = b64.decode("ascii")
+    if encoding is not None:
+        return '{"type":"audio","data":"' + b64 + '","encoding":"' + encoding + '"}'
+    return '{"type":"audio","data":"' + b64 + '"}'
@@ -0,0 +1,166 @@
+"""Per-session Gemini link management with optional hot standby.
+
+``GeminiLink`` owns the session's active Gemini connection and replaces it
+when the server closes it. By default a replacement is leased from the
+pool, as before. With ``standby=True`` the link also keeps a second
+connection already through ``setup`` and switches to it immediately; mic
+audio sent while the switch is in progress, plus the last ``replay_ms`` of
+audio before it, is kept in a ring buffer and replayed to the new
+connection so the user's words are not lost. A fresh standby is leased in
+the background after every switch.
+
+``Backoff`` spaces out repeated failed reconnects exponentially instead of
+retrying every second.
+"""
+
+import asyncio
+import collections
+import logging
+import random
+from typing import Any, Deque, Dict, Optional
+
+from gemini_pool import GeminiPool, is_open
+
+logger = logging.getLogger(__name__)
+
+PCM_BYTES_PER_MS = 16000 * 2 // 1000
+
+
+class Backoff:
+    def __init__(self, initial: float = 0.5, maximum: float = 15.0, factor: float = 2.0, jitter: float = 0.2):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.attempts = 0
+
+    def next(self) -> float:
+        """Delay before the next retry."""
+        delay = min(self.maximum, self.initial * (self.factor ** self.attempts))
+        self.attempts += 1
+        return delay * (1.0 + random.uniform(-self.jitter, self.jitter))
+
+    def reset(self):
+        self.attempts = 0
+
+
+class GeminiLink:
+    def __init__(self, pool: GeminiPool, config: dict, standby: bool = False, replay_ms: float = 500.0):
+        self._pool = pool
+        self.config = config
+        self.standby_enabled = standby
+        self.active: Any = None
+        self._standby: Any = None
+        self._standby_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._switching = False
+
+        # Recent mic audio, replayed to the new connection after a switch
+        self._replay_bytes = int(replay_ms * PCM_BYTES_PER_MS) if standby else 0
+        self._ring: Deque[bytes] = collections.deque()
+        self._ring_size = 0
+
+        self.switches = 0
+        self.standby_hits = 0
+        self.replayed_bytes = 0
+
+    async def start(self) -> Any:
+        self.active = await self._pool.acquire(self.config)
+        self._refill_standby()
+        return self.active
+
+    async def send_audio(self, pcm: bytes):
+        if self._replay_bytes:
+            self._ring.append(pcm)
+            self._ring_size += len(pcm)
+            while self._ring_size - len(self._ring[0]) >= self._replay_bytes:
+                self._ring_size -= len(self._ring.popleft())
+            if self._switching:
+                return  # replayed once the new link is up
+        await self.active.send_audio_bytes(pcm)
+
+    async def switch(self, failed: Any) -> Any:
+        """Replace ``failed`` (the connection the caller saw close) and return the new one."""
+        async with self._lock:
+            if self.active is not failed:
+                return self.active  # someone else already switched
+            self._switching = True
+            try:
+                fresh = None
+                if self._standby is not None and is_open(self._standby.ws):
+                    fresh = self._standby
+                    self.standby_hits += 1
+                elif self._standby is not None:
+                    await _close(self._standby)
+                self._standby = None
+                if fresh is None:
+                    fresh = await self._pool.acquire(self.config)
+                self.active = fresh
+                self.switches += 1
+                await _close(failed)
+                await self._replay()
+            finally:
+                self._switching = False
+            self._refill_standby()
+            return self.active
+
+    async def close(self):
+        if self._standby_task is not None:
+            self._standby_task.cancel()
+        for conn in (self.active, self._standby):
+            if conn is not None:
+                await _close(conn)
+        self.active = None
+        self._standby = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "standby": self.standby_enabled,
+            "standby_ready": self._standby is not None and is_open(self._standby.ws),
+            "switches": self.switches,
+            "standby_hits": self.standby_hits,
+            "replayed_bytes": self.replayed_bytes,
+        }
+
+    async def _replay(self):
+        # Mic audio keeps landing in the ring while a replay send is in
+        # flight (we are still switching): drain until nothing is left
+        while self._ring:
+            audio = b"".join(self._ring)
+            self._ring.clear()
+            self._ring_size = 0
+            try:
+                await self.active.send_audio_bytes(audio)
+                self.replayed_bytes += len(audio)
+            except Exception as e:
+                logger.warning(f"Gemini audio replay after failover failed: {e}")
+                return
+
+    def _refill_standby(self):
+        if not self.standby_enabled or self._standby is not None:
+            return
+        if self._standby_task is not None and not self._standby_task.done():
+            return
+        self._standby_task = asyncio.create_task(self._lease_standby())
+
+    async def _lease_standby(self):
+        backoff = Backoff()
+        while self.active is not None:
+            try:
+                conn = await self._pool.acquire(self.config)
+                if self.active is None:
+                    await _close(conn)  # session ended while we were dialing
+                else:
+                    self._standby = conn
+                return
+            except Exception as e:
+                delay = backoff.next()
+                logger.warning(f"Gemini standby lease failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+
+async def _close(conn: Any):
+    try:
+        await conn.close()
+    except Exception:
+        pass
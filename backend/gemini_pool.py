@@ -0,0 +1,209 @@
+"""Pool of pre-dialed Gemini sessions.
+
+Opening a Gemini Live session costs a TLS + WebSocket dial and a blocking
+``setup`` round-trip. ``GeminiPool`` keeps a few connections per
+(model, voice, systemPrompt) key already past ``setup`` so a new browser
+session, or a reconnect, can start streaming immediately.
+
+Pooled connections are single-use: once leased they carry conversation
+state and are closed by their session, never returned. The pool only
+keeps warming keys that were leased recently (``key_ttl``), evicts idle
+connections older than ``max_idle`` (the server may drop them) and pings
+the rest on every maintenance pass.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str, str]
+
+
+def is_open(ws: Any) -> bool:
+    """Best-effort 'is this websocket usable' check across websockets versions."""
+    if ws is None:
+        return False
+    state = getattr(ws, "state", None)
+    if state is not None:
+        return getattr(state, "name", "") == "OPEN"
+    return bool(getattr(ws, "open", False))
+
+
+class _Idle:
+    __slots__ = ("conn", "created_at")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+
+
+class GeminiPool:
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        model: str,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_idle: float = 60.0,
+        key_ttl: float = 600.0,
+        check_interval: float = 10.0,
+        ping_timeout: float = 5.0,
+    ):
+        # factory() returns an unconnected GeminiConnection-like object for ``model``
+        self._factory = factory
+        self.model = model
+        self.min_size = max(0, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.max_idle = max_idle
+        self.key_ttl = key_ttl
+        self.check_interval = check_interval
+        self.ping_timeout = ping_timeout
+
+        self._idle: Dict[PoolKey, List[_Idle]] = {}
+        self._configs: Dict[PoolKey, dict] = {}
+        self._last_used: Dict[PoolKey, float] = {}
+        self._dialing: Dict[PoolKey, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.dial_failures = 0
+
+    @staticmethod
+    def key_for(model: str, config: dict) -> PoolKey:
+        return (model, str(config.get("voice", "")), str(config.get("systemPrompt", "")))
+
+    async def start(self):
+        if self._task is None and self.min_size > 0:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for entries in self._idle.values():
+            for entry in entries:
+                await self._close(entry.conn)
+        self._idle.clear()
+
+    async def acquire(self, config: dict) -> Any:
+        """Lease a connection already past setup, dialing a fresh one on a miss."""
+        key = self.key_for(self.model, config)
+        self._configs[key] = config
+        self._last_used[key] = time.monotonic()
+
+        entries = self._idle.get(key, [])
+        while entries:
+            entry = entries.pop()
+            if is_open(entry.conn.ws) and time.monotonic() - entry.created_at < self.max_idle:
+                self.hits += 1
+                self._schedule_refill(key)
+                return entry.conn
+            self.evicted += 1
+            await self._close(entry.conn)
+
+        self.misses += 1
+        conn = self._factory()
+        conn.set_config(config)
+        await conn.connect()
+        self._schedule_refill(key)
+        return conn
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "keys": len(self._idle),
+            "idle": sum(len(v) for v in self._idle.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "dial_failures": self.dial_failures,
+        }
+
+    def _schedule_refill(self, key: PoolKey):
+        if self.min_size <= 0:
+            return
+        missing = self.min_size - len(self._idle.get(key, [])) - self._dialing.get(key, 0)
+        for _ in range(max(0, missing)):
+            self._dialing[key] = self._dialing.get(key, 0) + 1
+            asyncio.create_task(self._dial(key))
+
+    async def _dial(self, key: PoolKey):
+        try:
+            conn = self._factory()
+            conn.set_config(self._configs[key])
+            await conn.connect()
+        except Exception as e:
+            self.dial_failures += 1
+            logger.warning(f"Gemini pool pre-dial failed: {e}")
+            return
+        finally:
+            self._dialing[key] = self._dialing.get(key, 1) - 1
+        entries = self._idle.setdefault(key, [])
+        if len(entries) >= self.max_size:
+            await self._close(conn)
+            return
+        entries.append(_Idle(conn))
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self._check()
+            except Exception as e:
+                logger.error(f"Gemini pool maintenance error: {e}")
+
+    async def _check(self):
+        now = time.monotonic()
+        for key in list(self._idle.keys()):
+            # Take the entries out while pinging: acquire() can't lease one
+            # that is being checked, and dials that land meanwhile are kept
+            entries = self._idle.pop(key, [])
+            keep: List[_Idle] = []
+            for entry in entries:
+                if now - entry.created_at >= self.max_idle or not await self._healthy(entry.conn):
+                    self.evicted += 1
+                    await self._close(entry.conn)
+                else:
+                    keep.append(entry)
+
+            if now - self._last_used.get(key, 0.0) > self.key_ttl:
+                # Nobody used this persona recently: stop warming it
+                for entry in keep + self._idle.pop(key, []):
+                    await self._close(entry.conn)
+                self._configs.pop(key, None)
+                self._last_used.pop(key, None)
+                continue
+
+            # Merge the survivors back under what was dialed meanwhile;
+            # acquire() pops from the end, so the newest are leased first
+            live = self._idle.setdefault(key, [])
+            room = max(0, self.max_size - len(live))
+            for entry in keep[:len(keep) - room]:
+                await self._close(entry.conn)
+            live[:0] = keep[len(keep) - room:]
+            self._schedule_refill(key)
+
+    async def _healthy(self, conn: Any) -> bool:
+        if not is_open(conn.ws):
+            return False
+        try:
+            pong = await conn.ws.ping()
+            await asyncio.wait_for(pong, timeout=self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _close(conn: Any):
+        try:
+            await conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,186 @@
+"""Downscale and re-encode camera/screen frames off the event loop.
+
+Browsers send frames at whatever resolution and JPEG quality they picked;
+a 4K screen share is hundreds of KB per frame. ``ImageTranscoder`` decodes
+each frame, shrinks it so the longer edge is at most ``max_edge`` pixels and
+re-encodes it at ``quality``, in a process pool so the CPU work never runs on
+the event loop. Frames that arrive while ``max_inflight`` transcodes are
+already running are dropped rather than queued: a newer frame follows soon.
+
+Pillow's JPEG draft mode lets the decoder scale by 1/2, 1/4 or 1/8 while
+decoding, so large frames are cheap to shrink. A frame that is already
+within budget and would not get smaller is forwarded unchanged. With
+``max_edge <= 0`` frames are not resized.
+
+Given a ``FrameFilter``, the worker also computes the frame's signature
+and drops it there when it matches the last forwarded frame, so duplicate
+detection costs the event loop nothing and duplicates are never fully
+decoded. Without Pillow frames pass through untouched and the filter
+falls back to its byte hash on the loop.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+from frame_filter import FrameFilter, is_duplicate, signature
+
+logger = logging.getLogger(__name__)
+
+
+def transcode(jpeg: bytes, max_edge: int, quality: int) -> bytes:
+    """Fit ``jpeg`` within ``max_edge`` pixels and re-encode it; runs in a worker process."""
+    img = Image.open(io.BytesIO(jpeg))
+    width, height = img.size
+    scale = max_edge / max(width, height)
+    if scale < 1.0:
+        target = (max(1, int(width * scale)), max(1, int(height * scale)))
+        img.draft("RGB", target)
+        img = img.convert("RGB")
+        img.thumbnail(target, Image.BILINEAR)
+    else:
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality, optimize=False)
+    data = out.getvalue()
+    if scale >= 1.0 and len(data) >= len(jpeg):
+        return jpeg  # already within budget
+    return data
+
+
+def process(
+    jpeg: bytes, max_edge: int, quality: int, reference: Optional[bytes], threshold: int, tile_delta: int
+) -> Tuple[Optional[bytes], Optional[bytes], bool]:
+    """(signature, frame to forward or None if it duplicates ``reference``, transcode failed); runs in a worker process."""
+    sig = signature(jpeg) if threshold >= 0 else None
+    if sig is not None and is_duplicate(sig, reference, threshold, tile_delta):
+        return sig, None, False
+    if max_edge <= 0:
+        return sig, jpeg, False
+    try:
+        return sig, transcode(jpeg, max_edge, quality), False
+    except Exception:
+        # Forward the original, but keep the signature as the dedup reference
+        return sig, jpeg, True
+
+
+def _watch_parent(parent: int):
+    # Workers must not outlive a server that was killed outright
+    while os.getppid() == parent:
+        time.sleep(1.0)
+    os._exit(0)
+
+
+def _init_worker(parent: int):
+    # Ctrl+C reaches the whole process group: leave it to the server, which
+    # shuts the pool down cleanly (a worker killed by it leaks its semaphores)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    threading.Thread(target=_watch_parent, args=(parent,), daemon=True).start()
+
+
+class ImageTranscoder:
+    def __init__(self, max_edge: int = 1024, quality: int = 70, workers: int = 2, max_inflight: int = 0, dedup: bool = True):
+        self.max_edge = max_edge
+        self.dedup = dedup  # sessions pass a FrameFilter to submit()
+        self.quality = quality
+        self.workers = max(1, workers)
+        self.max_inflight = max_inflight or self.workers * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.inflight = 0
+
+        self.frames_in = 0
+        self.transcoded = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether frames go through the pool (to be resized, deduplicated or both)."""
+        return Image is not None and (self.max_edge > 0 or self.dedup)
+
+    def start(self):
+        if self.enabled and self._pool is None:
+            # Spawned, not forked: workers don't inherit the server's sockets or signal handlers
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.getpid(),),
+            )
+
+    async def stop(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            # Joining the workers can take a while; don't hold the loop for it
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def submit(self, jpeg: bytes, frame_filter: Optional[FrameFilter] = None) -> Optional[bytes]:
+        """Transcoded frame, the original if disabled or on error, or None if dropped or a duplicate."""
+        self.frames_in += 1
+        self.bytes_in += len(jpeg)
+        if not self.enabled or self._pool is None:
+            if frame_filter is not None and not frame_filter.should_send(jpeg):
+                self.duplicates += 1
+                return None
+            self.bytes_out += len(jpeg)
+            return jpeg
+        if self.inflight >= self.max_inflight:
+            self.dropped += 1
+            return None
+        dedup = frame_filter is not None and frame_filter.enabled
+        reference = frame_filter.reference() if dedup else None  # type: ignore[union-attr]
+        threshold = frame_filter.threshold if dedup else -1  # type: ignore[union-attr]
+        tile_delta = frame_filter.tile_delta if dedup else 0  # type: ignore[union-attr]
+        self.inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            sig, data, failed = await loop.run_in_executor(
+                self._pool, process, jpeg, self.max_edge, self.quality, reference, threshold, tile_delta
+            )
+            if failed:
+                self.failed += 1
+            elif data is not None and self.max_edge > 0:
+                self.transcoded += 1
+        except Exception as e:
+            logger.debug(f"Frame transcode failed, forwarding original: {e}")
+            self.failed += 1
+            sig, data = None, jpeg
+        finally:
+            self.inflight -= 1
+        if frame_filter is not None:
+            frame_filter.record(sig, data is not None)
+        if data is None:
+            self.duplicates += 1
+            return None
+        self.bytes_out += len(data)
+        return data
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "max_edge": self.max_edge,
+            "quality": self.quality,
+            "inflight": self.inflight,
+            "frames_in": self.frames_in,
+            "transcoded": self.transcoded,
+            "dropped": self.dropped,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
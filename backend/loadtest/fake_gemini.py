@@ -0,0 +1,162 @@
+"""Local stand-in for the Gemini Live BidiGenerateContent WebSocket.
+
+Speaks just enough of the protocol for the backend: answers ``setup`` with
+``setupComplete``, accepts ``realtime_input`` and ``client_content``, and
+answers with a model turn (synthetic 24 kHz PCM16 audio parts followed by
+``turnComplete``) after every ``client_content`` and after every
+``turn_every_s`` seconds of received mic audio.
+
+Faults: ``unsafe_rate`` closes the socket with 1007 "Unsafe prompt" on a
+fraction of ``client_content`` messages (like the real safety filter), and
+``drop_rate`` closes with 1011 on a fraction of turns.
+
+Run standalone: python -m loadtest.fake_gemini --port 9100
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+from dataclasses import dataclass
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_BYTES_PER_S = 16000 * 2
+DOWNSTREAM_BYTES_PER_S = 24000 * 2
+
+
+@dataclass
+class FakeGeminiConfig:
+    first_audio_ms: float = 300.0   # think time before the first audio part
+    chunk_ms: float = 40.0          # audio per part
+    chunk_interval_ms: float = 20.0  # pacing between parts (faster than realtime, like Gemini)
+    turn_chunks: int = 25           # parts per turn (25 x 40 ms = 1 s of speech)
+    turn_every_s: float = 3.0       # mic audio per spontaneous turn
+    unsafe_rate: float = 0.0
+    drop_rate: float = 0.0
+    seed: int = 0
+
+
+class FakeGemini:
+    def __init__(self, config: FakeGeminiConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        chunk_bytes = int(DOWNSTREAM_BYTES_PER_S * config.chunk_ms / 1000) & ~1
+        # One pre-encoded part, reused: the backend only relays it
+        payload = base64.b64encode(os.urandom(chunk_bytes)).decode("ascii")
+        self._audio_msg = json.dumps({
+            "serverContent": {
+                "modelTurn": {"parts": [{"inlineData": {"mimeType": "audio/pcm;rate=24000", "data": payload}}]}
+            }
+        })
+        self._turn_complete = json.dumps({"serverContent": {"turnComplete": True}})
+
+        self.sessions = 0
+        self.turns = 0
+        self.unsafe_closes = 0
+        self.drops = 0
+
+    async def handler(self, ws, path=None):
+        self.sessions += 1
+        try:
+            setup = json.loads(await ws.recv())
+            if "setup" not in setup:
+                await ws.close(1002, "expected setup")
+                return
+            await ws.send(json.dumps({"setupComplete": {}}))
+
+            lock = asyncio.Lock()
+            audio_bytes = 0
+            turn_bytes = self.config.turn_every_s * UPSTREAM_BYTES_PER_S
+            async for raw in ws:
+                msg = json.loads(raw)
+                if "realtime_input" in msg:
+                    for chunk in msg["realtime_input"].get("media_chunks", []):
+                        if chunk.get("mime_type") == "audio/pcm":
+                            audio_bytes += len(chunk["data"]) * 3 // 4
+                    if audio_bytes >= turn_bytes:
+                        audio_bytes = 0
+                        asyncio.create_task(self._turn(ws, lock))
+                elif "client_content" in msg:
+                    if self.rng.random() < self.config.unsafe_rate:
+                        self.unsafe_closes += 1
+                        await ws.close(1007, "Unsafe prompt")
+                        return
+                    asyncio.create_task(self._turn(ws, lock))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _turn(self, ws, lock: asyncio.Lock):
+        async with lock:
+            try:
+                await asyncio.sleep(self.config.first_audio_ms / 1000.0)
+                if self.rng.random() < self.config.drop_rate:
+                    self.drops += 1
+                    await ws.close(1011, "Internal error")
+                    return
+                for _ in range(self.config.turn_chunks):
+                    await ws.send(self._audio_msg)
+                    await asyncio.sleep(self.config.chunk_interval_ms / 1000.0)
+                await ws.send(self._turn_complete)
+                self.turns += 1
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+    def stats(self) -> dict:
+        return {"sessions": self.sessions, "turns": self.turns, "unsafe_closes": self.unsafe_closes, "drops": self.drops}
+
+
+async def serve(host: str, port: int, config: FakeGeminiConfig):
+    fake = FakeGemini(config)
+    server = await websockets.serve(fake.handler, host, port, max_size=None)
+    return fake, server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    d = FakeGeminiConfig()
+    parser.add_argument("--first-audio-ms", type=float, default=d.first_audio_ms)
+    parser.add_argument("--chunk-ms", type=float, default=d.chunk_ms)
+    parser.add_argument("--chunk-interval-ms", type=float, default=d.chunk_interval_ms)
+    parser.add_argument("--turn-chunks", type=int, default=d.turn_chunks)
+    parser.add_argument("--turn-every-s", type=float, default=d.turn_every_s)
+    parser.add_argument("--unsafe-rate", type=float, default=d.unsafe_rate)
+    parser.add_argument("--drop-rate", type=float, default=d.drop_rate)
+    parser.add_argument("--gemini-seed", type=int, default=d.seed, help="seed for fault injection")
+
+
+def config_from_args(args) -> FakeGeminiConfig:
+    return FakeGeminiConfig(
+        first_audio_ms=args.first_audio_ms,
+        chunk_ms=args.chunk_ms,
+        chunk_interval_ms=args.chunk_interval_ms,
+        turn_chunks=args.turn_chunks,
+        turn_every_s=args.turn_every_s,
+        unsafe_rate=args.unsafe_rate,
+        drop_rate=args.drop_rate,
+        seed=args.gemini_seed,
+    )
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    fake, server = await serve(args.host, args.port, config_from_args(args))
+    print(f"Fake Gemini listening on ws://{args.host}:{args.port}")
+    try:
+        await asyncio.Future()
+    finally:
+        server.close()
+        print(fake.stats())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
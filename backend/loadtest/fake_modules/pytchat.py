@@ -0,0 +1,82 @@
+"""Fake ``pytchat`` for load tests.
+
+Put ``loadtest/fake_modules`` first on ``PYTHONPATH`` and the backend's
+``import pytchat`` picks this up instead of the real package. ``create``
+(synchronous) and ``LiveChatAsync`` return chats that produce synthetic
+live-chat lines at ``FAKE_YT_RATE`` messages per second (default 5), with
+a ``FAKE_YT_DUP_RATE`` fraction of repeated lines, and never touch the
+network.
+"""
+
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+
+RATE = float(os.environ.get("FAKE_YT_RATE", "5"))
+DUP_RATE = float(os.environ.get("FAKE_YT_DUP_RATE", "0.2"))
+
+_WORDS = ["hello", "eva", "nice", "stream", "lol", "gg", "what", "is", "this", "game", "สวัสดี", "555"]
+
+created = 0
+
+
+class _Chat:
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self._alive = True
+        self._last = time.monotonic()
+        self._rng = random.Random(video_id)
+        self._prev = None
+
+    def is_alive(self) -> bool:
+        return self._alive
+
+    def get(self):
+        return SimpleNamespace(sync_items=lambda items=self._take(): items)
+
+    def _take(self):
+        now = time.monotonic()
+        due = int((now - self._last) * RATE)
+        items = []
+        if due:
+            self._last = now
+            for _ in range(due):
+                if self._prev is not None and self._rng.random() < DUP_RATE:
+                    items.append(self._prev)
+                    continue
+                author = SimpleNamespace(name=f"viewer{self._rng.randrange(50)}")
+                text = " ".join(self._rng.choice(_WORDS) for _ in range(self._rng.randint(1, 8)))
+                self._prev = SimpleNamespace(author=author, message=text)
+                items.append(self._prev)
+        return items
+
+    def terminate(self):
+        self._alive = False
+
+
+class LiveChatAsync(_Chat):
+    def __init__(self, video_id: str, interruptable: bool = True, **_kwargs):
+        global created
+        created += 1
+        super().__init__(video_id)
+
+    async def get(self):
+        # Like the real one: wait until the next batch is in
+        while self._alive:
+            items = self._take()
+            if items:
+                return SimpleNamespace(items=items)
+            await asyncio.sleep(1.0 / RATE if RATE > 0 else 1.0)
+        return []
+
+
+class DefaultProcessor:
+    pass
+
+
+def create(video_id: str, interruptable: bool = True, **_kwargs):
+    global created
+    created += 1
+    return _Chat(video_id)
@@ -0,0 +1,275 @@
+"""Replay a session capture through the backend against a Gemini stand-in.
+
+Takes a capture written with ``CAPTURE_DIR`` (see session_capture.py) and
+starts the backend in a subprocess, as ``loadtest.run`` does, pointed at a
+local Gemini stand-in. Both sides then follow the capture's clock:
+
+* the client replays every captured client message (config, text/binary
+  frames) at its recorded offset from connect;
+* the stand-in answers ``setup`` and replays every captured Gemini message
+  at its recorded offset from the same origin.
+
+``--speed`` divides every offset (1 = real time, 10 = ten times faster)
+and ``--copies`` replays the same capture on that many sessions at once.
+Inputs are identical on every run, so reports are comparable before and
+after a change:
+
+* relay latency: time from the stand-in sending the first audio of a model
+  turn to the client receiving it,
+* ping RTT (captured pings are re-stamped),
+* backend CPU.
+
+The pool is not pre-warmed during a replay (``GEMINI_POOL_MIN=0``) so each
+stand-in connection belongs to the session that dialed it. Each copy's
+config gets its index appended to ``systemPrompt``, and the stand-in reads
+it back from ``setup`` to know which copy's clock to follow. Run from the
+``backend`` directory:
+
+    python -m loadtest.replay captures/abc-20250101-120000-1234.evacap --speed 4
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import websockets
+
+from gemini_decoder import KIND_AUDIO as PART_AUDIO, decode_server_message
+from loadtest import swarm
+from loadtest.run import _free_port, _proc_cpu_seconds, _stop_backend, _wait_for_backend, start_backend
+from session_capture import SOURCE_CLIENT_BINARY, SOURCE_GEMINI, CaptureRecord, read_capture
+from wire_protocol import KIND_AUDIO, decode_frame
+
+# Appended to each copy's systemPrompt, read back from the stand-in's setup
+COPY_TAG = " [replay copy {}]"
+_COPY_TAG_RE = re.compile(r" \[replay copy (\d+)\]$")
+
+
+@dataclass
+class CopyResult:
+    gemini_turns: List[float] = field(default_factory=list)   # stand-in send time of each turn's first audio
+    client_turns: List[float] = field(default_factory=list)   # client receive time of each turn's first audio
+    ping_rtt_ms: List[float] = field(default_factory=list)
+    sent: int = 0
+    upstream: int = 0
+    error: Optional[str] = None
+
+
+class ReplayGemini:
+    def __init__(self, records: List[CaptureRecord], speed: float):
+        self.records = records
+        self.speed = speed
+        # (origin, result) of each copy by index; one stand-in connection each
+        self._copies: Dict[int, "asyncio.Future[Tuple[float, CopyResult]]"] = {}
+        self.connections = 0
+
+    def _copy(self, index: int) -> "asyncio.Future[Tuple[float, CopyResult]]":
+        if index not in self._copies:
+            self._copies[index] = asyncio.get_running_loop().create_future()
+        return self._copies[index]
+
+    def attach(self, index: int, origin: float, result: CopyResult):
+        self._copy(index).set_result((origin, result))
+
+    async def handler(self, ws, path=None):
+        self.connections += 1
+        try:
+            setup = json.loads(await ws.recv())
+            if "setup" not in setup:
+                await ws.close(1002, "expected setup")
+                return
+            index = _copy_index(setup)
+            if index is None:
+                await ws.close(1002, "setup without a replay copy tag")
+                return
+            await ws.send(json.dumps({"setupComplete": {}}))
+            origin, result = await self._copy(index)
+
+            async def drain():
+                async for _raw in ws:
+                    result.upstream += 1
+
+            drain_task = asyncio.create_task(drain())
+            try:
+                in_turn = False
+                for record in self.records:
+                    delay = origin + record.t / self.speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    response = decode_server_message(record.payload)
+                    if not in_turn and any(k == PART_AUDIO for k, _ in response.parts):
+                        in_turn = True
+                        result.gemini_turns.append(time.perf_counter())
+                    await ws.send(record.payload.decode("utf-8"))
+                    if response.turn_complete or response.interrupted:
+                        in_turn = False
+                await drain_task
+            finally:
+                drain_task.cancel()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+
+async def replay_client(url: str, index: int, records: List[CaptureRecord], duration: float,
+                        speed: float, gemini: ReplayGemini) -> CopyResult:
+    result = CopyResult()
+    try:
+        async with websockets.connect(f"{url}/ws/replay-{index}", max_size=None) as ws:
+            origin = time.perf_counter()
+            gemini.attach(index, origin, result)
+
+            async def receiver():
+                in_turn = False
+                async for msg in ws:
+                    is_audio = False
+                    if isinstance(msg, bytes):
+                        kind, _flags, _payload = decode_frame(msg)
+                        is_audio = kind == KIND_AUDIO
+                    else:
+                        data = json.loads(msg)
+                        t = data.get("type")
+                        if t == "pong" and isinstance(data.get("ts"), float):
+                            result.ping_rtt_ms.append((time.perf_counter() - data["ts"]) * 1000.0)
+                        elif t in ("turn_complete", "interrupted"):
+                            in_turn = False
+                        is_audio = t == "audio"
+                    if is_audio and not in_turn:
+                        in_turn = True
+                        result.client_turns.append(time.perf_counter())
+
+            recv_task = asyncio.create_task(receiver())
+            try:
+                for record in records:
+                    delay = origin + record.t / speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if record.source == SOURCE_CLIENT_BINARY:
+                        await ws.send(record.payload)
+                    else:
+                        await ws.send(_tag_config(_restamp_ping(record.payload.decode("utf-8")), index))
+                    result.sent += 1
+                # Let the rest of the captured model output arrive
+                await asyncio.sleep(max(0.0, origin + duration / speed + 1.0 - time.perf_counter()))
+            finally:
+                recv_task.cancel()
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _tag_config(text: str, index: int) -> str:
+    if '"config"' not in text:
+        return text
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+    if data.get("type") != "config":
+        return text
+    config = data.setdefault("config", {})
+    config["systemPrompt"] = str(config.get("systemPrompt", "")) + COPY_TAG.format(index)
+    return json.dumps(data)
+
+
+def _copy_index(setup: dict) -> Optional[int]:
+    try:
+        prompt = setup["setup"]["system_instruction"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        return None
+    match = _COPY_TAG_RE.search(str(prompt))
+    return int(match.group(1)) if match else None
+
+
+def _restamp_ping(text: str) -> str:
+    if '"ping"' not in text:
+        return text
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+    if data.get("type") == "ping":
+        data["ts"] = time.perf_counter()
+        return json.dumps(data)
+    return text
+
+
+async def run(args) -> dict:
+    records = list(read_capture(args.capture))
+    client_records = [r for r in records if r.source != SOURCE_GEMINI]
+    gemini_records = [r for r in records if r.source == SOURCE_GEMINI]
+    if not client_records:
+        raise SystemExit(f"{args.capture} has no client messages")
+    duration = records[-1].t
+
+    gemini = ReplayGemini(gemini_records, args.speed)
+    gemini_port = _free_port()
+    backend_port = _free_port()
+    server = await websockets.serve(gemini.handler, "127.0.0.1", gemini_port, max_size=None)
+    proc = start_backend(backend_port, f"ws://127.0.0.1:{gemini_port}",
+                         {"GEMINI_POOL_MIN": "0", "GEMINI_FAILOVER": "false", "CAPTURE_DIR": ""})
+    try:
+        await _wait_for_backend(backend_port, proc)
+        cpu_start = _proc_cpu_seconds(proc.pid)
+        wall_start = time.monotonic()
+        results = await asyncio.gather(*(
+            replay_client(f"ws://127.0.0.1:{backend_port}", i, client_records, duration, args.speed, gemini)
+            for i in range(args.copies)
+        ))
+        cpu = _proc_cpu_seconds(proc.pid) - cpu_start
+        wall = time.monotonic() - wall_start
+    finally:
+        await _stop_backend(proc)
+        server.close()
+
+    relay = [(c - g) * 1000.0 for r in results for g, c in zip(r.gemini_turns, r.client_turns)]
+    rtts = [v for r in results for v in r.ping_rtt_ms]
+    errors = [r.error for r in results if r.error]
+    return {
+        "capture": args.capture,
+        "speed": args.speed,
+        "copies": args.copies,
+        "capture_seconds": round(duration, 3),
+        "client_messages": len(client_records),
+        "gemini_messages": len(gemini_records),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "turns": {"gemini": sum(len(r.gemini_turns) for r in results), "client": sum(len(r.client_turns) for r in results)},
+        "upstream_received": sum(r.upstream for r in results),
+        "relay_ms": {"p50": swarm.percentile(relay, 50), "p99": swarm.percentile(relay, 99), "n": len(relay)},
+        "ping_rtt_ms": {"p50": swarm.percentile(rtts, 50), "p99": swarm.percentile(rtts, 99), "n": len(rtts)},
+        "backend_cpu_percent": round(100.0 * cpu / wall, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a session capture through the backend")
+    parser.add_argument("capture", help="capture file written with CAPTURE_DIR")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed (1 = real time)")
+    parser.add_argument("--copies", type=int, default=1, help="concurrent sessions replaying the capture")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"capture    {report['capture_seconds']} s, {report['client_messages']} client / "
+          f"{report['gemini_messages']} Gemini messages, x{args.copies} at {args.speed}x")
+    if report["first_error"]:
+        print(f"           {report['errors']} errors, first: {report['first_error']}")
+    print(f"turns      {report['turns']['client']}/{report['turns']['gemini']} reached the client")
+    print(f"relay      p50 {_ms(report['relay_ms']['p50'])}  p99 {_ms(report['relay_ms']['p99'])}")
+    print(f"ping RTT   p50 {_ms(report['ping_rtt_ms']['p50'])}  p99 {_ms(report['ping_rtt_ms']['p99'])}")
+    print(f"backend    CPU {report['backend_cpu_percent']}%")
+
+
+def _ms(value) -> str:
+    return "n/a" if value is None else f"{value:.1f} ms"
+
+
+if __name__ == "__main__":
+    main()
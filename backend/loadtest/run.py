@@ -0,0 +1,269 @@
+"""End-to-end load test: fake Gemini + backend + client swarm.
+
+Starts the fake Gemini server in this process, launches the backend with
+uvicorn in a subprocess pointed at it (``GEMINI_WS_URL``) with the fake
+pytchat first on ``PYTHONPATH``, runs the client swarm and reports:
+
+* sessions requested / connected / served (received model audio),
+* p50/p99 ping RTT and speech-end-to-first-audio latency,
+* backend CPU (% of one core) and RSS, total and per session.
+
+CPU and memory are read from /proc, so this runs on Linux. Run from the
+``backend`` directory:
+
+    python -m loadtest.run --sessions 200 --duration 60 --protocol binary
+
+Pass ``--json`` to get a machine-readable report for regression checks.
+
+A fixed ``--sessions`` count only says whether that many sessions were
+served. ``--ramp-to N`` finds the capacity instead: against one backend,
+it runs ``--sessions`` clients, then ``--ramp-step`` more each step, up to
+N, until a step breaks the SLO (more than ``--slo-failures`` of the
+sessions erroring or never getting model audio, or ping RTT p99 over
+``--slo-ping-p99-ms``, or response p99 over ``--slo-response-p99-ms``).
+The report gives the last session count that met the SLO:
+
+    python -m loadtest.run --sessions 50 --ramp-to 1000 --ramp-step 50 --duration 30
+"""
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from loadtest import fake_gemini, swarm
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_MODULES = os.path.join(BACKEND_DIR, "loadtest", "fake_modules")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime, stime are fields 14 and 15 (1-based), i.e. 11 and 12 after the comm field
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _proc_rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def _wait_for_backend(port: int, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"backend exited with code {proc.returncode}")
+        try:
+            _reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("backend did not start in time")
+
+
+async def _stop_backend(proc: subprocess.Popen, timeout: float = 10.0):
+    # Wait without blocking the loop: the fake Gemini in this process has to
+    # answer the close handshakes of the backend's pooled connections
+    proc.terminate()
+    deadline = time.monotonic() + timeout
+    while proc.poll() is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+
+
+def start_backend(port: int, gemini_url: str, extra_env: Optional[dict] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "loadtest"),
+        "GEMINI_WS_URL": gemini_url,
+        "PYTHONPATH": os.pathsep.join(p for p in (FAKE_MODULES, BACKEND_DIR, env.get("PYTHONPATH")) if p),
+    })
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "TestV1:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+@contextlib.asynccontextmanager
+async def backend_under_test(args) -> AsyncIterator[Tuple[fake_gemini.FakeGemini, subprocess.Popen, str]]:
+    """Fake Gemini in this process plus a backend subprocess pointed at it."""
+    gemini_port = _free_port()
+    backend_port = _free_port()
+    fake, server = await fake_gemini.serve("127.0.0.1", gemini_port, fake_gemini.config_from_args(args))
+    proc = start_backend(backend_port, f"ws://127.0.0.1:{gemini_port}")
+    try:
+        await _wait_for_backend(backend_port, proc)
+        yield fake, proc, f"ws://127.0.0.1:{backend_port}"
+    finally:
+        await _stop_backend(proc)
+        server.close()
+
+
+async def measure(proc: subprocess.Popen, cfg: swarm.SwarmConfig) -> dict:
+    """Run one swarm against the backend; the swarm summary plus backend CPU and RSS."""
+    rss_idle = _proc_rss_bytes(proc.pid)
+    cpu_start = _proc_cpu_seconds(proc.pid)
+    wall_start = time.monotonic()
+
+    swarm_task = asyncio.create_task(swarm.run_swarm(cfg))
+    # Sample peak RSS while the swarm runs
+    rss_peak = rss_idle
+    while not swarm_task.done():
+        rss_peak = max(rss_peak, _proc_rss_bytes(proc.pid))
+        await asyncio.sleep(0.5)
+    results = swarm_task.result()
+
+    cpu = _proc_cpu_seconds(proc.pid) - cpu_start
+    wall = time.monotonic() - wall_start
+    report = swarm.summarize(results)
+    served = max(1, report["served"])
+    report["backend"] = {
+        "cpu_percent": round(100.0 * cpu / wall, 1),
+        "cpu_percent_per_session": round(100.0 * cpu / wall / served, 3),
+        "rss_idle_mb": round(rss_idle / 2**20, 1),
+        "rss_peak_mb": round(rss_peak / 2**20, 1),
+        "rss_per_session_kb": round((rss_peak - rss_idle) / served / 1024, 1),
+    }
+    return report
+
+
+async def run(args) -> Tuple[dict, dict]:
+    async with backend_under_test(args) as (fake, proc, url):
+        report = await measure(proc, swarm.config_from_args(args, url))
+    return report, fake.stats()
+
+
+def slo_breach(report: dict, args) -> Optional[str]:
+    """Why a swarm report misses the SLO, or None if it meets it."""
+    sessions = report["sessions"]
+    failed = sessions - report["served"]
+    if failed > args.slo_failures * sessions:
+        return f"{failed}/{sessions} sessions failed or got no model audio"
+    for name, limit in (("ping_rtt_ms", args.slo_ping_p99_ms), ("response_ms", args.slo_response_p99_ms)):
+        p99 = report[name]["p99"]
+        if limit > 0 and p99 is not None and p99 > limit:
+            return f"{name} p99 {p99:.0f} ms > {limit:.0f} ms"
+    return None
+
+
+async def ramp(args) -> Tuple[dict, dict]:
+    """Raise the session count step by step until the SLO breaks; report the last count that held."""
+    steps: List[dict] = []
+    capacity: Optional[dict] = None
+    breach: Optional[str] = None
+    async with backend_under_test(args) as (fake, proc, url):
+        base = swarm.config_from_args(args, url)
+        sessions = args.sessions
+        while sessions <= args.ramp_to:
+            report = await measure(proc, dataclasses.replace(base, sessions=sessions))
+            breach = slo_breach(report, args)
+            report["slo_breach"] = breach
+            steps.append(report)
+            if not args.json:
+                print(_step_line(report), flush=True)
+            if breach is not None:
+                break
+            capacity = report
+            sessions += args.ramp_step
+            # Let the previous step's sessions close before the next one starts
+            await asyncio.sleep(args.ramp_pause)
+    summary = {
+        "capacity_sessions": capacity["sessions"] if capacity is not None else 0,
+        # No breach up to --ramp-to: the capacity is at least that, not exactly that
+        "slo_broken": breach is not None,
+        "breach": breach,
+        "at_capacity": capacity,
+        "steps": steps,
+    }
+    return summary, fake.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the backend against a local Gemini stand-in")
+    swarm.add_arguments(parser)
+    fake_gemini.add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON only")
+    parser.add_argument("--ramp-to", type=int, default=0,
+                        help="ramp from --sessions up to this many sessions until the SLO breaks (0 = off)")
+    parser.add_argument("--ramp-step", type=int, default=0, help="sessions added per ramp step (default: --sessions)")
+    parser.add_argument("--ramp-pause", type=float, default=2.0, help="seconds between ramp steps")
+    parser.add_argument("--slo-failures", type=float, default=0.01,
+                        help="max fraction of sessions that error or get no model audio")
+    parser.add_argument("--slo-ping-p99-ms", type=float, default=250.0, help="max ping RTT p99 (0 = no limit)")
+    parser.add_argument("--slo-response-p99-ms", type=float, default=0.0,
+                        help="max speech-end-to-first-audio p99, think time included (0 = no limit)")
+    args = parser.parse_args()
+    args.ramp_step = args.ramp_step or args.sessions
+
+    if args.ramp_to > 0:
+        summary, fake_stats = asyncio.run(ramp(args))
+        summary["fake_gemini"] = fake_stats
+        if args.json:
+            print(json.dumps(summary))
+            return
+        if summary["slo_broken"]:
+            print(f"capacity   {summary['capacity_sessions']} sessions within SLO; "
+                  f"next step broke it: {summary['breach']}")
+        else:
+            print(f"capacity   at least {summary['capacity_sessions']} sessions "
+                  f"(SLO held up to --ramp-to {args.ramp_to})")
+        print(f"gemini     {fake_stats}")
+        return
+
+    report, fake_stats = asyncio.run(run(args))
+    report["fake_gemini"] = fake_stats
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    b = report["backend"]
+    print(f"sessions   {report['served']}/{report['sessions']} served "
+          f"({report['connected']} connected, {report['errors']} errors)")
+    if report["first_error"]:
+        print(f"           first error: {report['first_error']}")
+    print(f"ping RTT   p50 {_ms(report['ping_rtt_ms']['p50'])}  p99 {_ms(report['ping_rtt_ms']['p99'])}")
+    print(f"response   p50 {_ms(report['response_ms']['p50'])}  p99 {_ms(report['response_ms']['p99'])}"
+          f"  (includes {args.first_audio_ms:.0f} ms fake think time)")
+    print(f"backend    CPU {b['cpu_percent']}% ({b['cpu_percent_per_session']}%/session)  "
+          f"RSS {b['rss_idle_mb']} -> {b['rss_peak_mb']} MB ({b['rss_per_session_kb']} KB/session)")
+    print(f"gemini     {fake_stats}")
+
+
+def _step_line(report: dict) -> str:
+    b = report["backend"]
+    verdict = "ok" if report["slo_breach"] is None else f"SLO broken: {report['slo_breach']}"
+    return (f"ramp {report['sessions']:>5}  served {report['served']:>5}  errors {report['errors']:>4}  "
+            f"ping p99 {_ms(report['ping_rtt_ms']['p99'])}  response p99 {_ms(report['response_ms']['p99'])}  "
+            f"CPU {b['cpu_percent']}%  {verdict}")
+
+
+def _ms(value) -> str:
+    return "n/a" if value is None else f"{value:.1f} ms"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Client swarm that drives ``/ws/{client_id}`` like real browsers.
+
+Each simulated client sends the config handshake, then streams 16 kHz mic
+audio in 32 ms chunks with speech/silence cycles (``user_activity``),
+camera/screen frames, occasional text and a ``ping`` every second. It
+records:
+
+* ping RTT through the backend (relay latency of a control message), and
+* response latency: user speech end / text send to the first model audio
+  chunk received (includes the fake Gemini's think time).
+
+Run standalone against a running backend:
+    python -m loadtest.swarm --url ws://127.0.0.1:8000 --sessions 50
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import websockets
+
+from wire_protocol import KIND_AUDIO, KIND_IMAGE, decode_frame, encode_frame
+
+CHUNK_SAMPLES = 512
+CHUNK_S = CHUNK_SAMPLES / 16000
+
+
+@dataclass
+class SwarmConfig:
+    url: str = "ws://127.0.0.1:8000"
+    sessions: int = 10
+    duration_s: float = 30.0
+    ramp_s: float = 5.0
+    protocol: str = "json"          # 'json' | 'binary'
+    speech_s: float = 2.0
+    silence_s: float = 3.0
+    image_interval_s: float = 1.0   # 0 disables
+    image_bytes: int = 40_000
+    text_interval_s: float = 15.0   # 0 disables
+    video_id: str = ""              # join a YouTube chat if set
+    seed: int = 0
+
+
+@dataclass
+class SessionResult:
+    connected: bool = False
+    got_audio: bool = False
+    error: Optional[str] = None
+    ping_rtt_ms: List[float] = field(default_factory=list)
+    response_ms: List[float] = field(default_factory=list)
+    audio_in: int = 0
+    sent: int = 0
+
+
+async def run_client(cfg: SwarmConfig, index: int, start_delay: float) -> SessionResult:
+    result = SessionResult()
+    rng = random.Random(cfg.seed * 100003 + index)
+    await asyncio.sleep(start_delay)
+    binary = cfg.protocol == "binary"
+    pcm = os.urandom(CHUNK_SAMPLES * 2)
+    pcm_b64 = base64.b64encode(pcm).decode("ascii")
+    frame = os.urandom(cfg.image_bytes)
+    waiting_since: Optional[float] = None
+
+    try:
+        async with websockets.connect(f"{cfg.url}/ws/swarm-{index}", max_size=None) as ws:
+            await ws.send(json.dumps({
+                "type": "config",
+                "protocol": cfg.protocol,
+                "config": {"voice": "Puck", "systemPrompt": "You are Eva, a load-test persona."},
+            }))
+            result.connected = True
+            deadline = time.monotonic() + cfg.duration_s - start_delay
+
+            async def send(obj):
+                result.sent += 1
+                await ws.send(obj if isinstance(obj, (bytes, str)) else json.dumps(obj))
+
+            async def mic():
+                nonlocal waiting_since
+                while time.monotonic() < deadline:
+                    await send({"type": "user_activity", "speaking": True})
+                    end = time.monotonic() + cfg.speech_s * rng.uniform(0.5, 1.5)
+                    while time.monotonic() < end:
+                        await send(encode_frame(KIND_AUDIO, pcm) if binary else {"type": "audio", "data": pcm_b64})
+                        await asyncio.sleep(CHUNK_S)
+                    await send({"type": "user_activity", "speaking": False})
+                    if waiting_since is None:
+                        waiting_since = time.perf_counter()
+                    end = time.monotonic() + cfg.silence_s * rng.uniform(0.5, 1.5)
+                    while time.monotonic() < end:
+                        # Browsers keep streaming (quiet) mic audio between utterances
+                        await send(encode_frame(KIND_AUDIO, pcm) if binary else {"type": "audio", "data": pcm_b64})
+                        await asyncio.sleep(CHUNK_S)
+
+            async def camera():
+                await send({"type": "mode", "mode": "screen"})
+                b64 = base64.b64encode(frame).decode("ascii")
+                while time.monotonic() < deadline:
+                    await send(encode_frame(KIND_IMAGE, frame) if binary else {"type": "image", "data": b64})
+                    await asyncio.sleep(cfg.image_interval_s)
+
+            async def texts():
+                nonlocal waiting_since
+                while True:
+                    wait = cfg.text_interval_s * rng.uniform(0.5, 1.5)
+                    if time.monotonic() + wait >= deadline:
+                        return  # don't hold the session open past the deadline
+                    await asyncio.sleep(wait)
+                    await send({"type": "text", "data": "Eva, what do you think about this?"})
+                    if waiting_since is None:
+                        waiting_since = time.perf_counter()
+
+            async def pings():
+                while time.monotonic() < deadline:
+                    await send({"type": "ping", "ts": time.perf_counter()})
+                    await asyncio.sleep(1.0)
+
+            async def receiver():
+                nonlocal waiting_since
+                async for msg in ws:
+                    is_audio = False
+                    if isinstance(msg, bytes):
+                        kind, _flags, _payload = decode_frame(msg)
+                        is_audio = kind == KIND_AUDIO
+                    else:
+                        data = json.loads(msg)
+                        t = data.get("type")
+                        if t == "pong" and isinstance(data.get("ts"), float):
+                            result.ping_rtt_ms.append((time.perf_counter() - data["ts"]) * 1000.0)
+                        is_audio = t == "audio"
+                    if is_audio:
+                        result.audio_in += 1
+                        result.got_audio = True
+                        if waiting_since is not None:
+                            result.response_ms.append((time.perf_counter() - waiting_since) * 1000.0)
+                            waiting_since = None
+
+            if cfg.video_id:
+                await send({"type": "yt_chat_start", "video_id": cfg.video_id})
+            producers = [mic(), pings()]
+            if cfg.image_interval_s > 0:
+                producers.append(camera())
+            if cfg.text_interval_s > 0:
+                producers.append(texts())
+            recv_task = asyncio.create_task(receiver())
+            try:
+                await asyncio.gather(*producers)
+            finally:
+                recv_task.cancel()
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+async def run_swarm(cfg: SwarmConfig) -> List[SessionResult]:
+    step = cfg.ramp_s / max(1, cfg.sessions)
+    return await asyncio.gather(*(run_client(cfg, i, i * step) for i in range(cfg.sessions)))
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def summarize(results: List[SessionResult]) -> dict:
+    rtts = [v for r in results for v in r.ping_rtt_ms]
+    responses = [v for r in results for v in r.response_ms]
+    errors = [r.error for r in results if r.error]
+    return {
+        "sessions": len(results),
+        "connected": sum(r.connected for r in results),
+        "served": sum(r.got_audio and not r.error for r in results),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "messages_sent": sum(r.sent for r in results),
+        "audio_chunks_received": sum(r.audio_in for r in results),
+        "ping_rtt_ms": {"p50": percentile(rtts, 50), "p99": percentile(rtts, 99), "n": len(rtts)},
+        "response_ms": {"p50": percentile(responses, 50), "p99": percentile(responses, 99), "n": len(responses)},
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    d = SwarmConfig()
+    parser.add_argument("--sessions", type=int, default=d.sessions)
+    parser.add_argument("--duration", type=float, default=d.duration_s)
+    parser.add_argument("--ramp", type=float, default=d.ramp_s)
+    parser.add_argument("--protocol", choices=("json", "binary"), default=d.protocol)
+    parser.add_argument("--speech-s", type=float, default=d.speech_s)
+    parser.add_argument("--silence-s", type=float, default=d.silence_s)
+    parser.add_argument("--image-interval", type=float, default=d.image_interval_s)
+    parser.add_argument("--image-bytes", type=int, default=d.image_bytes)
+    parser.add_argument("--text-interval", type=float, default=d.text_interval_s)
+    parser.add_argument("--video-id", default=d.video_id)
+    parser.add_argument("--seed", type=int, default=d.seed)
+
+
+def config_from_args(args, url: str) -> SwarmConfig:
+    return SwarmConfig(
+        url=url,
+        sessions=args.sessions,
+        duration_s=args.duration,
+        ramp_s=args.ramp,
+        protocol=args.protocol,
+        speech_s=args.speech_s,
+        silence_s=args.silence_s,
+        image_interval_s=args.image_interval,
+        image_bytes=args.image_bytes,
+        text_interval_s=args.text_interval,
+        video_id=args.video_id,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive /ws/{client_id} with simulated clients")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000")
+    add_arguments(parser)
+    args = parser.parse_args()
+    results = asyncio.run(run_swarm(config_from_args(args, args.url)))
+    print(json.dumps(summarize(results), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Event-loop health: lag sampling, stall stacks and per-session task CPU.
+
+Every session shares one asyncio loop, so a single blocking call shows up
+as jitter for every client at once. ``LoopMonitor`` keeps three cheap
+signals on all the time:
+
+* lag: a task sleeps ``interval`` seconds and records how late it wakes up
+  (``eva_loop_lag_seconds``);
+* stalls: a watchdog thread checks that the lag task woke up on time; when
+  the loop is more than ``stall_s`` late it grabs the loop thread's stack
+  once (``sys._current_frames``), logs it and keeps the last ``max_events``
+  for ``snapshot()``. The thread only wakes every ``stall_s / 2`` and does
+  no work while the loop is healthy;
+* task CPU: session coroutines are wrapped with ``meter(account, name,
+  coro)`` before they become tasks; the thread CPU time of each step is
+  charged to the session's ``SessionCpu`` account
+  (``eva_task_cpu_seconds_total`` by task name, top sessions in
+  ``snapshot()``).
+
+With ``enabled=False`` nothing runs and ``meter`` returns the coroutine
+unchanged.
+"""
+
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Coroutine
+from typing import Any, Deque, Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCpu:
+    __slots__ = ("client_id", "started", "cpu_seconds", "steps", "by_task")
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.started = time.time()
+        self.cpu_seconds = 0.0
+        self.steps = 0
+        self.by_task: Dict[str, float] = {}
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "client_id": self.client_id,
+            "cpu_ms": round(self.cpu_seconds * 1000.0, 1),
+            "steps": self.steps,
+            "age_s": round(time.time() - self.started, 1),
+            "by_task_ms": {k: round(v * 1000.0, 1) for k, v in self.by_task.items()},
+        }
+
+
+class _MeteredCoroutine(Coroutine):
+    """Wraps a coroutine and charges the thread CPU time of each step to an account."""
+
+    __slots__ = ("_coro", "_account", "_task")
+
+    def __init__(self, coro, account: SessionCpu, task: str):
+        self._coro = coro
+        self._account = account
+        self._task = task
+
+    def _charge(self, start: float):
+        spent = time.thread_time() - start
+        account = self._account
+        account.cpu_seconds += spent
+        account.steps += 1
+        account.by_task[self._task] = account.by_task.get(self._task, 0.0) + spent
+        metrics.task_cpu_seconds.inc(self._task, value=spent)
+
+    def send(self, value):
+        start = time.thread_time()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._charge(start)
+
+    def throw(self, typ, val=None, tb=None):
+        start = time.thread_time()
+        try:
+            if val is None and tb is None:
+                return self._coro.throw(typ)
+            return self._coro.throw(typ, val, tb)
+        finally:
+            self._charge(start)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.5, stall_s: float = 0.1, max_events: int = 20, enabled: bool = True):
+        self.enabled = enabled
+        self.interval = interval
+        self.stall_s = stall_s
+        self.events: Deque[Dict[str, Any]] = collections.deque(maxlen=max_events)
+        self.sessions: Dict[str, SessionCpu] = {}
+
+        self._deadline = 0.0          # when the lag task should wake up next (monotonic)
+        self._captured = False        # stack already taken for the current stall
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+        self.samples = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def account(self, client_id: str) -> SessionCpu:
+        """New CPU account for a session (replaces an older session with the same id)."""
+        account = SessionCpu(client_id)
+        if self.enabled:
+            self.sessions[client_id] = account
+        return account
+
+    def meter(self, account: SessionCpu, name: str, coro):
+        """Wrap ``coro`` so the CPU time of each step is charged to ``account`` under ``name``."""
+        if not self.enabled:
+            return coro
+        return _MeteredCoroutine(coro, account, name)
+
+    def forget(self, account: SessionCpu):
+        if self.sessions.get(account.client_id) is account:
+            del self.sessions[account.client_id]
+
+    def snapshot(self, top: int = 10) -> Dict[str, object]:
+        busiest = sorted(self.sessions.values(), key=lambda s: s.cpu_seconds, reverse=True)[:top]
+        return {
+            "interval_s": self.interval,
+            "stall_ms": self.stall_s * 1000.0,
+            "samples": self.samples,
+            "lag_ms": {"last": round(self.last_lag * 1000.0, 2), "max": round(self.max_lag * 1000.0, 2)},
+            "stalls": self.stalls,
+            "recent_stalls": list(self.events),
+            "sessions": len(self.sessions),
+            "top_sessions": [s.as_dict() for s in busiest],
+        }
+
+    async def _sample(self):
+        while True:
+            # time.monotonic() rather than loop.time() so the watchdog thread can compare
+            self._deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._deadline)
+            self.samples += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            metrics.loop_lag_seconds.observe(lag)
+            if lag > self.stall_s:
+                self.stalls += 1
+                metrics.loop_stalls.inc()
+                if self._captured and self.events:
+                    self.events[-1]["lag_ms"] = round(lag * 1000.0, 1)
+                    logger.warning(f"Event loop stalled {lag * 1000.0:.0f} ms; blocked in:\n{''.join(self.events[-1]['stack'])}")
+                else:
+                    logger.warning(f"Event loop stalled {lag * 1000.0:.0f} ms (stack not captured)")
+            self._captured = False
+
+    def _watch(self):
+        poll = max(0.01, self.stall_s / 2)
+        while not self._stopping.wait(poll):
+            deadline = self._deadline
+            if self._captured or not deadline or time.monotonic() - deadline <= self.stall_s:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)  # type: ignore[arg-type]
+            if frame is None:
+                continue
+            self._captured = True
+            self.events.append({
+                "at": time.time(),
+                "lag_ms": round((time.monotonic() - deadline) * 1000.0, 1),
+                "stack": traceback.format_stack(frame, limit=25),
+            })
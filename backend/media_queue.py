@@ -0,0 +1,200 @@
+"""Bounded per-direction send queues with media-aware drop policies.
+
+Each session has one ``MediaQueue`` towards Gemini and one towards the
+browser, each drained by its own task, so a slow peer on one side no
+longer stalls the relay loop of the other. Entries are zero-argument
+callables returning the awaitable that performs the actual send, and
+they are sent in FIFO order. What happens under pressure depends on the
+kind of entry:
+
+* audio: once more than ``max_audio`` chunks are queued the oldest one is
+  dropped, and chunks that waited longer than ``audio_budget_ms`` are
+  dropped when they reach the head of the queue ("stale"). ``drop_audio``
+  discards every queued chunk at once (barge-in).
+* image: only the newest frame is kept; a new frame supersedes a queued one.
+* control (text, turn_complete, ...): never dropped; ``put_control`` waits
+  while ``max_control`` control entries are queued (backpressure).
+* event (YouTube chat lines and notices for the UI): never waits, for
+  callers that can't; past ``max_events`` queued events the oldest is
+  dropped.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Send = Callable[[], Awaitable[Any]]
+
+AUDIO = "audio"
+IMAGE = "image"
+CONTROL = "control"
+EVENT = "event"
+
+
+class _Entry:
+    __slots__ = ("kind", "send", "queued_at", "alive")
+
+    def __init__(self, kind: str, send: Send):
+        self.kind = kind
+        self.send = send
+        self.queued_at = time.monotonic()
+        self.alive = True
+
+
+class MediaQueue:
+    def __init__(
+        self,
+        name: str,
+        max_audio: int = 64,
+        audio_budget_ms: float = 500.0,
+        max_control: int = 256,
+        max_events: int = 64,
+    ):
+        self.name = name
+        self.max_audio = max_audio
+        self.audio_budget_ms = audio_budget_ms
+        self.max_control = max_control
+        self.max_events = max_events
+
+        self._entries: Deque[_Entry] = collections.deque()
+        self._audio: Deque[_Entry] = collections.deque()
+        self._image: Optional[_Entry] = None
+        self._events: Deque[_Entry] = collections.deque()
+        self._control = 0
+        self._ready = asyncio.Event()
+        self._control_space = asyncio.Event()
+        self._control_space.set()
+
+        # Counters (see stats())
+        self.sent = 0
+        self.send_errors = 0
+        self.dropped_audio_overflow = 0
+        self.dropped_audio_stale = 0
+        self.dropped_audio_flushed = 0
+        self.dropped_image = 0
+        self.dropped_events = 0
+        self.control_waits = 0
+        self.max_depth = 0
+
+    def put_audio(self, send: Send):
+        entry = _Entry(AUDIO, send)
+        self._audio.append(entry)
+        while len(self._audio) > self.max_audio:
+            self._audio.popleft().alive = False
+            self.dropped_audio_overflow += 1
+        self._push(entry)
+
+    def drop_audio(self) -> int:
+        """Drop every queued audio chunk; returns how many were dropped."""
+        dropped = 0
+        for entry in self._audio:
+            if entry.alive:
+                entry.alive = False
+                dropped += 1
+        self._audio.clear()
+        self.dropped_audio_flushed += dropped
+        return dropped
+
+    def put_image(self, send: Send):
+        if self._image is not None and self._image.alive:
+            self._image.alive = False
+            self.dropped_image += 1
+        self._image = _Entry(IMAGE, send)
+        self._push(self._image)
+
+    async def put_control(self, send: Send):
+        while self._control >= self.max_control:
+            self.control_waits += 1
+            self._control_space.clear()
+            await self._control_space.wait()
+        self._control += 1
+        self._push(_Entry(CONTROL, send))
+
+    def put_event(self, send: Send):
+        """Queue without waiting; drops the oldest queued event past ``max_events``."""
+        entry = _Entry(EVENT, send)
+        self._events.append(entry)
+        while len(self._events) > self.max_events:
+            self._events.popleft().alive = False
+            self.dropped_events += 1
+        self._push(entry)
+
+    async def get(self) -> Tuple[str, Send]:
+        """Next live entry as ``(kind, send)``; skips dropped and stale audio."""
+        while True:
+            while not self._entries:
+                self._ready.clear()
+                await self._ready.wait()
+            entry = self._entries.popleft()
+            if entry.kind == CONTROL:
+                self._control -= 1
+                self._control_space.set()
+                return entry.kind, entry.send
+            if entry.kind == AUDIO:
+                if self._audio and self._audio[0] is entry:
+                    self._audio.popleft()
+                if not entry.alive:
+                    continue
+                if (time.monotonic() - entry.queued_at) * 1000.0 > self.audio_budget_ms:
+                    self.dropped_audio_stale += 1
+                    continue
+                return entry.kind, entry.send
+            if entry.kind == EVENT:
+                if self._events and self._events[0] is entry:
+                    self._events.popleft()
+                if entry.alive:
+                    return entry.kind, entry.send
+                continue
+            if entry.alive:
+                if self._image is entry:
+                    self._image = None
+                return entry.kind, entry.send
+
+    async def drain(self):
+        """Send entries forever; run as a task and cancel it to stop."""
+        while True:
+            kind, send = await self.get()
+            try:
+                await send()
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.send_errors += 1
+                logger.warning(f"{self.name} {kind} send failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "audio_depth": len(self._audio),
+            "control_depth": self._control,
+            "event_depth": len(self._events),
+            "sent": self.sent,
+            "send_errors": self.send_errors,
+            "dropped_audio_overflow": self.dropped_audio_overflow,
+            "dropped_audio_stale": self.dropped_audio_stale,
+            "dropped_audio_flushed": self.dropped_audio_flushed,
+            "dropped_image": self.dropped_image,
+            "dropped_events": self.dropped_events,
+            "control_waits": self.control_waits,
+        }
+
+    def depth(self) -> int:
+        """Live entries waiting to be sent."""
+        image = 1 if self._image is not None and self._image.alive else 0
+        return len(self._audio) + self._control + len(self._events) + image
+
+    def _push(self, entry: _Entry):
+        self._entries.append(entry)
+        if len(self._entries) > 2 * (self.max_audio + self.max_control + self.max_events) + 2:
+            # A stalled sender leaves dropped entries behind; keep the deque bounded
+            self._entries = collections.deque(e for e in self._entries if e.alive)
+        depth = self.depth()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._ready.set()
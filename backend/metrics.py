@@ -0,0 +1,166 @@
+"""Minimal Prometheus-style metrics for the backend.
+
+Everything is recorded from the single asyncio thread that runs all
+sessions, so counters and histograms are plain Python ints/lists with no
+locks: recording a value is a dict lookup plus a bisect. ``render()``
+produces the Prometheus text exposition format served at ``/metrics``.
+"""
+
+import bisect
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, from a few ms (relay) up to turn lengths
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, value: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, value: float = 1):
+        self.inc(*labels, value=-value)
+
+    def set(self, *labels: str, value: float):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)..., sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            inf = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())  # type: ignore[attr-defined]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+active_sessions = registry.register(Gauge(
+    "eva_active_sessions", "Open browser WebSocket sessions"))
+messages = registry.register(Counter(
+    "eva_messages_total", "Messages sent or received, by direction (client_in/out, gemini_in/out) and type",
+    ("direction", "type")))
+message_bytes = registry.register(Counter(
+    "eva_message_bytes_total", "Payload bytes relayed, by direction and type", ("direction", "type")))
+gemini_connect_seconds = registry.register(Histogram(
+    "eva_gemini_connect_seconds", "Gemini Live connect time, by stage (dial, setup)", ("stage",)))
+gemini_reconnects = registry.register(Counter(
+    "eva_gemini_reconnects_total", "Gemini reconnects, by path and close code", ("path", "code")))
+speech_to_audio_seconds = registry.register(Histogram(
+    "eva_speech_end_to_first_audio_seconds", "User speech end to first model audio chunk"))
+turn_seconds = registry.register(Histogram(
+    "eva_turn_duration_seconds", "First model output of a turn to turnComplete"))
+barge_ins = registry.register(Counter(
+    "eva_barge_ins_total", "Model turns cut short by user speech, by who noticed first", ("source",)))
+barge_in_dropped_audio = registry.register(Counter(
+    "eva_barge_in_dropped_audio_total", "Model audio chunks dropped by barge-in, by stage", ("stage",)))
+load_level = registry.register(Gauge(
+    "eva_load_level", "Load-shedding level (0 normal, 1 fewer images, 2 no proactive prompts, 3 refusing sessions)"))
+load_shed = registry.register(Counter(
+    "eva_load_shed_total", "Work shed under load, by action", ("action",)))
+moderation_blocked = registry.register(Counter(
+    "eva_moderation_blocked_total", "Text held back from Gemini by local pre-moderation, by reason", ("reason",)))
+moderation_learned = registry.register(Counter(
+    "eva_moderation_learned_total", "1007 unsafe-prompt closes learned into the deny cache"))
+loop_lag_seconds = registry.register(Histogram(
+    "eva_loop_lag_seconds", "How late the event loop ran a timed callback",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+loop_stalls = registry.register(Counter(
+    "eva_loop_stalls_total", "Event loop stalls longer than LOOP_STALL_MS"))
+task_cpu_seconds = registry.register(Counter(
+    "eva_task_cpu_seconds_total", "CPU time spent in session tasks, by task", ("task",)))
+
+
+# Label for values outside a fixed set (e.g. client-chosen message types)
+OTHER = "other"
+
+
+def count_message(direction: str, kind: str, nbytes: int):
+    messages.inc(direction, kind)
+    message_bytes.inc(direction, kind, value=nbytes)
@@ -0,0 +1,238 @@
+"""Local pre-moderation for YouTube chat text the server sends to Gemini.
+
+YouTube chat lines reach the model without the user typing them. When one
+trips Gemini's safety filter the server closes the session with 1007 and
+the link has to switch to a new connection, losing the conversation
+context; on hostile streams that repeats constantly. ``Moderator`` screens
+each line locally first:
+
+* ``sanitize_for_model``: one ``str.translate`` pass that turns control
+  characters into spaces and deletes invisible ones (zero-width spaces,
+  soft hyphens, bidi overrides) often used to dodge filters;
+* a blocklist, compiled once into an Aho-Corasick automaton, so a line is
+  scanned in a single pass whatever the number of patterns. Text and
+  patterns are case-folded with punctuation turned into spaces, so
+  ``B.A.D`` matches ``bad``; a pattern only matches whole words (``ass``
+  doesn't match ``class``). Scripts written without spaces (Thai, CJK)
+  can't be split into words, so a pattern edge in such a script matches
+  anywhere;
+* a deny cache learned from 1007 closes: the fingerprint of a line that
+  was sent on its own is denied for ``deny_ttl`` seconds; lines that were
+  part of a multi-line digest get half a strike each, so one bad line
+  doesn't ban its neighbours after a single close.
+
+One ``Moderator`` is shared by every session of the worker, so a line fanned
+out to many sessions that got one of them closed is held back for the rest.
+Only chat lines are ever learned: a 1007 that follows the server's own
+prompts is usually caused by the session's screen or audio, and denying a
+constant prompt would silence it for every session of the worker.
+"""
+
+import collections
+import hashlib
+import logging
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import metrics
+from chat_digest import normalize
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_BLOCKLIST = "blocklist"
+BLOCKED_DENIED = "deny_cache"
+
+_SANITIZE: Dict[int, Optional[str]] = {c: " " for c in range(32) if c != 0x09}
+_SANITIZE.update({c: " " for c in range(0x7F, 0xA0)})
+_SANITIZE.update(dict.fromkeys(
+    (0x00AD, 0x200B, 0x2060, 0xFEFF, *range(0x202A, 0x202F), *range(0x2066, 0x206A)), None))
+
+
+def sanitize_for_model(s: str, max_len: int = 500) -> str:
+    """Strip control/invisible characters and cap the length of text bound for the model."""
+    s = s.translate(_SANITIZE)
+    try:
+        s.encode("utf-8")
+    except UnicodeEncodeError:
+        # Lone surrogates can't be sent in a text frame
+        s = s.encode("utf-8", "ignore").decode("utf-8", "ignore")
+    s = s.strip()
+    if len(s) > max_len:
+        s = s[:max_len] + '…'
+    return s
+
+
+def match_key(text: str) -> str:
+    """Blocklist form: case-folded words (letters/digits/marks) separated by single spaces.
+
+    Unlike the digest's ``normalize`` repeats are kept: squashing them turns
+    ``class`` into ``clas`` and ``hello`` into ``helo``.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join("".join(ch if unicodedata.category(ch)[0] in "LNM" else " " for ch in text).split())
+
+
+def _bounded(ch: str) -> bool:
+    # Cased letters and digits belong to scripts that separate words with
+    # spaces; uncased letters (Thai, CJK, ...) don't
+    return ch.isdigit() or ch.lower() != ch.upper()
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over a fixed set of ``match_key`` patterns, matching whole words."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = sorted({p for p in patterns if p})
+        # Whether the pattern needs a word boundary before / after it
+        self._edges: List[Tuple[bool, bool]] = [(_bounded(p[0]), _bounded(p[-1])) for p in self.patterns]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]  # indexes of the patterns ending at this state
+        for i, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = (i,)
+        # Breadth-first: fail links point at the longest proper suffix that is also a prefix
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> Optional[str]:
+        """First pattern found as whole words in ``text`` (a ``match_key``), or None."""
+        goto, fail, out = self._goto, self._fail, self._out
+        last = len(text) - 1
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for i in out[state]:
+                pattern = self.patterns[i]
+                start = end - len(pattern) + 1
+                left, right = self._edges[i]
+                if left and start > 0 and text[start - 1] != " ":
+                    continue
+                if right and end < last and text[end + 1] != " ":
+                    continue
+                return pattern
+        return None
+
+
+class DenyCache:
+    """Fingerprints of text that got a session closed, with strikes and expiry."""
+
+    def __init__(self, ttl: float = 600.0, size: int = 4096):
+        self.ttl = ttl
+        self.size = size
+        self._entries: "collections.OrderedDict[bytes, Tuple[float, float]]" = collections.OrderedDict()  # -> (strikes, expires)
+
+    @staticmethod
+    def fingerprint(key: str) -> bytes:
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+
+    def add(self, key: str, strike: float = 1.0):
+        fp = self.fingerprint(key)
+        now = time.monotonic()
+        strikes, expires = self._entries.pop(fp, (0.0, 0.0))
+        if expires <= now:
+            strikes = 0.0
+        self._entries[fp] = (strikes + strike, now + self.ttl)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def denied(self, key: str) -> bool:
+        fp = self.fingerprint(key)
+        entry = self._entries.get(fp)
+        if entry is None:
+            return False
+        strikes, expires = entry
+        if expires <= time.monotonic():
+            del self._entries[fp]
+            return False
+        return strikes >= 1.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Moderator:
+    def __init__(self, blocklist: Iterable[str] = (), deny_ttl: float = 600.0, deny_size: int = 4096, enabled: bool = True):
+        self.enabled = enabled
+        self.matcher = PatternMatcher(match_key(p) for p in blocklist)
+        self.deny = DenyCache(deny_ttl, deny_size)
+        # The same chat line is checked once per subscribed session: memoize its keys
+        self._keys: "collections.OrderedDict[str, Tuple[str, str]]" = collections.OrderedDict()
+        self._keys_size = 1024
+
+        self.checked = 0
+        self.blocked_blocklist = 0
+        self.blocked_denied = 0
+        self.learned = 0
+
+    def check(self, text: str) -> Optional[str]:
+        """None if ``text`` may be sent, else why not (BLOCKED_*)."""
+        if not self.enabled:
+            return None
+        self.checked += 1
+        keys = self._keys.get(text)
+        if keys is None:
+            # Deny cache: the digest's dedup key, so "spam!!" and "SPAM" are one line
+            keys = self._keys[text] = (normalize(text), match_key(text))
+            if len(self._keys) > self._keys_size:
+                self._keys.popitem(last=False)
+        deny_key, blocklist_key = keys
+        if self.deny.denied(deny_key):
+            self.blocked_denied += 1
+            metrics.moderation_blocked.inc(BLOCKED_DENIED)
+            return BLOCKED_DENIED
+        if self.matcher.patterns and self.matcher.search(blocklist_key) is not None:
+            self.blocked_blocklist += 1
+            metrics.moderation_blocked.inc(BLOCKED_BLOCKLIST)
+            return BLOCKED_BLOCKLIST
+        return None
+
+    def learn(self, lines: Iterable[str]):
+        """Record a 1007 close blamed on a digest made of the chat ``lines``."""
+        lines = list(lines)
+        if not self.enabled or not lines:
+            return
+        strike = 1.0 if len(lines) == 1 else 0.5
+        for line in lines:
+            self.deny.add(normalize(line), strike)
+        self.learned += 1
+        metrics.moderation_learned.inc()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "patterns": len(self.matcher.patterns),
+            "deny_entries": len(self.deny),
+            "checked": self.checked,
+            "blocked_blocklist": self.blocked_blocklist,
+            "blocked_denied": self.blocked_denied,
+            "learned": self.learned,
+        }
+
+
+def load_blocklist(path: str) -> List[str]:
+    """One pattern per line; blank lines and ``#`` comments are skipped."""
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
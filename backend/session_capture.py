@@ -0,0 +1,151 @@
+"""Append-only binary capture of a session's inbound traffic, for replay.
+
+With ``CAPTURE_DIR`` set, every message the backend receives on a session
+(client text and binary frames, Gemini server messages) is recorded with a
+monotonic timestamp relative to the session start. ``loadtest.replay``
+feeds a capture back through the backend against a local Gemini stand-in.
+
+File layout: the 8-byte magic ``EVACAP1\\n`` followed by records of
+
+    uint64  microseconds since session start (little-endian)
+    uint8   source (SOURCE_CLIENT_TEXT / SOURCE_CLIENT_BINARY / SOURCE_GEMINI)
+    uint32  payload length
+    bytes   payload (UTF-8 text or raw binary frame, as received)
+
+``SessionRecorder.record`` only packs a header and appends to an in-memory
+batch; batches are written by a background task through the default
+executor every ``flush_interval`` seconds or once ``max_batch_bytes`` are
+pending, so the relay loops never wait on disk. Captures hold raw user
+audio and screen frames: keep ``CAPTURE_DIR`` off in production unless
+you mean to collect them.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import struct
+import time
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"EVACAP1\n"
+
+SOURCE_CLIENT_TEXT = 1
+SOURCE_CLIENT_BINARY = 2
+SOURCE_GEMINI = 3
+
+_RECORD = struct.Struct("<QBI")
+
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class CaptureRecord(NamedTuple):
+    t: float  # seconds since session start
+    source: int
+    payload: bytes
+
+
+class SessionRecorder:
+    def __init__(self, path: str, flush_interval: float = 0.5, max_batch_bytes: int = 256 * 1024):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch_bytes = max_batch_bytes
+        self._origin = time.monotonic()
+        self._batch: List[bytes] = [MAGIC]
+        self._batch_bytes = len(MAGIC)
+        self._file: Optional[BinaryIO] = None
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._writer())
+
+        self.records = 0
+        self.bytes_written = 0
+        self.batches = 0
+
+    def record(self, source: int, payload: Union[str, bytes, memoryview]):
+        if self._closed:
+            return
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        t_us = int((time.monotonic() - self._origin) * 1_000_000)
+        self._batch.append(_RECORD.pack(t_us, source, len(payload)))
+        self._batch.append(bytes(payload))
+        self._batch_bytes += _RECORD.size + len(payload)
+        self.records += 1
+        if self._batch_bytes >= self.max_batch_bytes:
+            self._wakeup.set()
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        try:
+            await self._task
+        except Exception as e:
+            logger.warning(f"Session capture {self.path} failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "path": self.path,
+            "records": self.records,
+            "bytes_written": self.bytes_written,
+            "batches": self.batches,
+            "pending_bytes": self._batch_bytes,
+        }
+
+    async def _writer(self):
+        try:
+            self._file = await asyncio.to_thread(open, self.path, "ab")
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self._flush()
+                if self._closed:
+                    return
+        except Exception:
+            # Stop buffering rather than growing without bound
+            self._closed = True
+            self._batch = []
+            self._batch_bytes = 0
+            raise
+        finally:
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+
+    async def _flush(self):
+        if not self._batch:
+            return
+        data = b"".join(self._batch)
+        self._batch = []
+        self._batch_bytes = 0
+        await asyncio.to_thread(self._file.write, data) # type: ignore[union-attr]
+        self.bytes_written += len(data)
+        self.batches += 1
+
+
+def open_recorder(directory: str, client_id: str) -> SessionRecorder:
+    """Start a capture for one session in ``directory`` (which must exist)."""
+    name = f"{_UNSAFE_NAME.sub('_', client_id)}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.evacap"
+    return SessionRecorder(os.path.join(directory, name))
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """Iterate the records of a capture file; a truncated last record is ignored."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session capture")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return
+            t_us, source, length = _RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield CaptureRecord(t_us / 1_000_000, source, payload)
@@ -0,0 +1,509 @@
+"""Session registry: who owns which ``client_id``, and YouTube chat fan-out.
+
+``SessionRegistry`` keeps the sessions of one process (the old
+``connections`` / ``yt_watchers`` / ``client_states`` globals) and enforces
+``max_sessions``. ``BrokerRegistry`` adds a tiny broker shared by every
+uvicorn worker on the host, reached over a Unix socket (or TCP), so that:
+
+* session routing: the broker knows which worker owns each ``client_id``.
+  A reconnect that lands on another worker takes the id over and the old
+  owner is told to evict its stale session.
+* per-host cap: ``max_sessions`` counts sessions across all workers.
+* YouTube fan-out: only one worker polls a given ``video_id``; its chat
+  lines are forwarded to every other worker with subscribers. If that
+  worker unsubscribes or dies, the broker hands polling to another one.
+
+The first worker to start binds the socket and runs the broker in its own
+event loop; the others connect to it (``python -m session_registry`` runs
+a standalone broker instead). The wire format is one JSON object per line.
+
+If the broker goes away (its worker crashed, the standalone broker was
+killed) the workers keep serving on their own: ``register`` falls back to
+this worker's sessions and cap, and subscribed videos are polled locally.
+Meanwhile each worker reconnects with ``Backoff``, taking the broker over
+when nobody serves it any more, then re-claims its sessions and chat
+subscriptions. ``register`` never waits on the broker for more than
+``register_timeout`` seconds.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import fcntl
+import itertools
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from gemini_failover import Backoff
+from yt_chat_hub import ChatCallback, ChatHub, ChatSubscription
+
+logger = logging.getLogger(__name__)
+
+EvictCallback = Callable[[], Awaitable[None]]
+
+
+class SessionRegistry:
+    """In-process registry: sessions of this worker only."""
+
+    def __init__(self, chat_hub: ChatHub, max_sessions: int = 0):
+        # max_sessions <= 0 means unlimited
+        self.max_sessions = max_sessions
+        self.chat_hub = chat_hub
+        self._sessions: Dict[str, Tuple[str, Any, Optional[EvictCallback]]] = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def register(self, client_id: str, session: Any, on_evict: Optional[EvictCallback] = None) -> Optional[str]:
+        """Claim ``client_id``; returns a token, or None when the host is full."""
+        previous = self._sessions.get(client_id)
+        if previous is None and 0 < self.max_sessions <= len(self._sessions):
+            return None
+        token = uuid.uuid4().hex
+        self._sessions[client_id] = (token, session, on_evict)
+        if previous is not None:
+            self._evict(previous)
+        return token
+
+    async def unregister(self, client_id: str, token: str):
+        entry = self._sessions.get(client_id)
+        if entry is not None and entry[0] == token:
+            del self._sessions[client_id]
+
+    def get(self, client_id: str) -> Any:
+        entry = self._sessions.get(client_id)
+        return entry[1] if entry is not None else None
+
+    def local_count(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, object]:
+        return {"backend": "local", "sessions": len(self._sessions), "max_sessions": self.max_sessions}
+
+    def _evict(self, entry: Tuple[str, Any, Optional[EvictCallback]]):
+        on_evict = entry[2]
+        if on_evict is not None:
+            asyncio.ensure_future(on_evict())
+
+    def _evict_local(self, client_id: str, token: str):
+        entry = self._sessions.get(client_id)
+        if entry is not None and entry[0] == token:
+            del self._sessions[client_id]
+            self._evict(entry)
+
+
+# ---------------------------------------------------------------------------
+# Broker (one per host)
+# ---------------------------------------------------------------------------
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """``unix:/path`` or ``tcp:host:port``."""
+    kind, _, rest = address.partition(":")
+    if kind == "unix":
+        return "unix", rest
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"unsupported registry address {address!r}")
+
+
+def _send(writer: asyncio.StreamWriter, msg: dict):
+    writer.write(json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+class Broker:
+    def __init__(self, max_sessions: int = 0):
+        self.max_sessions = max_sessions
+        self._workers: Dict[str, asyncio.StreamWriter] = {}
+        self._owners: Dict[str, Tuple[str, str]] = {}      # client_id -> (worker, token)
+        self._chat_subs: Dict[str, Set[str]] = {}          # video_id -> workers
+        self._pollers: Dict[str, str] = {}                 # video_id -> worker
+
+    async def serve(self, address: str):
+        kind, where = parse_address(address)
+        if kind == "unix":
+            return await asyncio.start_unix_server(self.handle, path=where)
+        return await asyncio.start_server(self.handle, host=where[0], port=where[1])
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                op = msg.get("op")
+                if op == "hello":
+                    worker = msg["worker"]
+                    self._workers[worker] = writer
+                elif worker is None:
+                    continue
+                elif op == "register":
+                    self._register(worker, writer, msg)
+                elif op == "claim":
+                    self._claim(worker, writer, msg)
+                elif op == "unregister":
+                    owner = self._owners.get(msg["id"])
+                    if owner == (worker, msg["token"]):
+                        del self._owners[msg["id"]]
+                elif op == "sub":
+                    self._chat_subs.setdefault(msg["video"], set()).add(worker)
+                    if msg["video"] not in self._pollers:
+                        self._pollers[msg["video"]] = worker
+                        _send(writer, {"op": "poll", "video": msg["video"]})
+                elif op == "unsub":
+                    self._unsub(worker, msg["video"])
+                elif op == "chat":
+                    for other in self._chat_subs.get(msg["video"], ()):
+                        if other != worker and other in self._workers:
+                            _send(self._workers[other], msg)
+                await writer.drain()
+        except (ConnectionError, json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"Registry broker dropped worker {worker}: {e}")
+        finally:
+            if worker is not None:
+                self._drop_worker(worker)
+            writer.close()
+
+    def _register(self, worker: str, writer: asyncio.StreamWriter, msg: dict):
+        client_id = msg["id"]
+        previous = self._owners.get(client_id)
+        if previous is None and 0 < self.max_sessions <= len(self._owners):
+            _send(writer, {"op": "reply", "req": msg["req"], "ok": False})
+            return
+        self._owners[client_id] = (worker, msg["token"])
+        _send(writer, {"op": "reply", "req": msg["req"], "ok": True})
+        if previous is not None and previous[0] in self._workers:
+            # Route the takeover to the old owner so it drops its stale session
+            _send(self._workers[previous[0]], {"op": "evict", "id": client_id, "token": previous[1]})
+
+    def _claim(self, worker: str, writer: asyncio.StreamWriter, msg: dict):
+        # A worker that reconnected re-claims the sessions it kept serving;
+        # an id taken over elsewhere in the meantime stays with the newer owner
+        client_id = msg["id"]
+        owner = self._owners.setdefault(client_id, (worker, msg["token"]))
+        if owner != (worker, msg["token"]):
+            _send(writer, {"op": "evict", "id": client_id, "token": msg["token"]})
+
+    def _unsub(self, worker: str, video_id: str):
+        subs = self._chat_subs.get(video_id)
+        if subs is None:
+            return
+        subs.discard(worker)
+        if not subs:
+            del self._chat_subs[video_id]
+            self._pollers.pop(video_id, None)
+        elif self._pollers.get(video_id) == worker:
+            # Hand polling to another subscribed worker
+            successor = next(iter(subs))
+            self._pollers[video_id] = successor
+            if successor in self._workers:
+                _send(self._workers[successor], {"op": "poll", "video": video_id})
+
+    def _drop_worker(self, worker: str):
+        self._workers.pop(worker, None)
+        for client_id in [c for c, (w, _t) in self._owners.items() if w == worker]:
+            del self._owners[client_id]
+        for video_id in [v for v, subs in self._chat_subs.items() if worker in subs]:
+            self._unsub(worker, video_id)
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+class SharedChatHub:
+    """``ChatHub`` facade that polls each video on one worker per host."""
+
+    def __init__(self, local: ChatHub, registry: "BrokerRegistry"):
+        self._local = local
+        self._registry = registry
+        self._subs: Dict[str, List[ChatSubscription]] = {}
+        self._polls: Dict[str, ChatSubscription] = {}
+
+    def subscribe(self, video_id: str, callback: ChatCallback) -> ChatSubscription:
+        sub = ChatSubscription(self, video_id, callback)  # type: ignore[arg-type]
+        subs = self._subs.setdefault(video_id, [])
+        subs.append(sub)
+        if len(subs) == 1:
+            if self._registry.connected:
+                self._registry._post({"op": "sub", "video": video_id})
+            else:
+                self._start_polling(video_id)
+        return sub
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            vid: {"subscribers": len(subs), "polling": vid in self._polls}
+            for vid, subs in self._subs.items()
+        }
+
+    def _unsubscribe(self, sub: ChatSubscription):
+        subs = self._subs.get(sub.video_id)
+        if not subs or sub not in subs:
+            return
+        subs.remove(sub)
+        if not subs:
+            del self._subs[sub.video_id]
+            poll = self._polls.pop(sub.video_id, None)
+            if poll is not None:
+                poll.close()
+            self._registry._post({"op": "unsub", "video": sub.video_id})
+
+    def _start_polling(self, video_id: str):
+        if video_id in self._subs and video_id not in self._polls:
+            self._polls[video_id] = self._local.subscribe(
+                video_id, lambda user, msg: self._publish(video_id, user, msg)
+            )
+
+    def _poll_all_locally(self):
+        # Broker gone: nobody else polls for this worker any more
+        for video_id in list(self._subs):
+            self._start_polling(video_id)
+
+    def _resubscribe(self):
+        # Broker back: let it pick one poller per video again
+        for poll in self._polls.values():
+            poll.close()
+        self._polls.clear()
+        for video_id in self._subs:
+            self._registry._post({"op": "sub", "video": video_id})
+
+    def _publish(self, video_id: str, user: str, msg: str):
+        self._registry._post({"op": "chat", "video": video_id, "user": user, "msg": msg})
+        self._deliver(video_id, user, msg)
+
+    def _deliver(self, video_id: str, user: str, msg: str):
+        for sub in list(self._subs.get(video_id, ())):
+            try:
+                sub._callback(user, msg)
+            except Exception as e:
+                logger.error(f"YouTube chat subscriber error for {video_id}: {e}")
+
+
+class BrokerRegistry(SessionRegistry):
+    """Registry shared by all workers on the host through a ``Broker``."""
+
+    def __init__(
+        self,
+        chat_hub: ChatHub,
+        address: str,
+        max_sessions: int = 0,
+        worker_id: Optional[str] = None,
+        register_timeout: float = 2.0,
+    ):
+        super().__init__(SharedChatHub(chat_hub, self), max_sessions)  # type: ignore[arg-type]
+        self.address = address
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.register_timeout = register_timeout
+        self.connected = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._requests = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._backoff = Backoff(initial=0.2, maximum=5.0)
+
+        self.reconnects = 0
+        self.takeovers = 0
+        self.local_registrations = 0
+
+    async def start(self):
+        try:
+            await self._attach()
+        except OSError as e:
+            logger.warning(f"Session registry broker unavailable at {self.address} ({e}), serving locally")
+            self.chat_hub._poll_all_locally()  # type: ignore[attr-defined]
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._server is not None:
+            self._server.close()
+
+    async def register(self, client_id: str, session: Any, on_evict: Optional[EvictCallback] = None) -> Optional[str]:
+        if not self.connected:
+            return await self._register_locally(client_id, session, on_evict)
+        token = uuid.uuid4().hex
+        req = next(self._requests)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req] = fut
+        self._post({"op": "register", "id": client_id, "token": token, "req": req})
+        try:
+            ok = await asyncio.wait_for(fut, self.register_timeout)
+        except asyncio.TimeoutError:
+            ok = None
+        finally:
+            self._pending.pop(req, None)
+        if ok is None:
+            # Broker lost or not answering: don't hold the client hostage
+            logger.warning(f"Session registry broker did not answer for {client_id}, registering locally")
+            return await self._register_locally(client_id, session, on_evict)
+        if not ok:
+            return None
+        previous = self._sessions.get(client_id)
+        self._sessions[client_id] = (token, session, on_evict)
+        if previous is not None:
+            self._evict(previous)
+        return token
+
+    async def unregister(self, client_id: str, token: str):
+        await super().unregister(client_id, token)
+        self._post({"op": "unregister", "id": client_id, "token": token})
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": "broker",
+            "worker": self.worker_id,
+            "broker": self._server is not None,
+            "connected": self.connected,
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "reconnects": self.reconnects,
+            "takeovers": self.takeovers,
+            "local_registrations": self.local_registrations,
+        }
+
+    async def _register_locally(self, client_id: str, session: Any, on_evict: Optional[EvictCallback]) -> Optional[str]:
+        # The cap then only counts this worker's sessions; they are
+        # re-claimed with the broker once it is back
+        self.local_registrations += 1
+        return await super().register(client_id, session, on_evict)
+
+    async def _attach(self):
+        """Connect to the broker, becoming it if nobody serves the address."""
+        kind, where = parse_address(self.address)
+        try:
+            await self._connect(kind, where)
+            return
+        except OSError:
+            pass
+        if kind == "unix":
+            # Serialize takeover between the surviving workers so only one
+            # of them unlinks the stale socket and binds a new one
+            with open(f"{where}.lock", "a") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise OSError(f"broker takeover of {where} in progress elsewhere")
+                try:
+                    await self._connect(kind, where)
+                    return
+                except OSError:
+                    pass
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(where)  # stale socket from a dead broker
+                await self._serve()
+        else:
+            try:
+                await self._serve()
+            except OSError:
+                pass  # another worker won the race
+        await self._connect(kind, where)
+
+    async def _serve(self):
+        if self._server is not None:
+            self._server.close()
+        self._server = await Broker(self.max_sessions).serve(self.address)
+        self.takeovers += 1
+        logger.info(f"Session registry broker listening on {self.address}")
+
+    async def _connect(self, kind: str, where: Any):
+        if kind == "unix":
+            self._reader, self._writer = await asyncio.open_unix_connection(where)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(where[0], where[1])
+        self.connected = True
+        self._post({"op": "hello", "worker": self.worker_id})
+
+    def _post(self, msg: dict):
+        if self.connected and self._writer is not None and not self._writer.is_closing():
+            _send(self._writer, msg)
+
+    async def _run(self):
+        hub: SharedChatHub = self.chat_hub  # type: ignore[assignment]
+        while True:
+            if self.connected:
+                await self._read_loop()
+                self._detach()
+                hub._poll_all_locally()
+            await asyncio.sleep(self._backoff.next())
+            try:
+                await self._attach()
+            except OSError as e:
+                logger.debug(f"Session registry reconnect failed: {e}")
+                continue
+            self._backoff.reset()
+            self.reconnects += 1
+            logger.info(f"Reconnected to the session registry broker at {self.address}")
+            for client_id, (token, _session, _on_evict) in list(self._sessions.items()):
+                self._post({"op": "claim", "id": client_id, "token": token})
+            hub._resubscribe()
+
+    def _detach(self):
+        self.connected = False
+        if self._writer is not None:
+            self._writer.close()
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_result(None)
+        self._pending.clear()
+
+    async def _read_loop(self):
+        hub: SharedChatHub = self.chat_hub  # type: ignore[assignment]
+        try:
+            while True:
+                line = await self._reader.readline()  # type: ignore[union-attr]
+                if not line:
+                    break
+                msg = json.loads(line)
+                op = msg.get("op")
+                if op == "reply":
+                    fut = self._pending.pop(msg["req"], None)
+                    if fut is not None and not fut.done():
+                        fut.set_result(bool(msg["ok"]))
+                elif op == "evict":
+                    self._evict_local(msg["id"], msg["token"])
+                elif op == "poll":
+                    hub._start_polling(msg["video"])
+                elif op == "chat":
+                    hub._deliver(msg["video"], msg["user"], msg["msg"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Session registry connection error: {e}")
+        logger.error("Lost connection to the session registry broker, serving locally until it is back")
+
+
+def create_registry(backend: str, chat_hub: ChatHub, address: str, max_sessions: int) -> SessionRegistry:
+    if backend == "broker":
+        return BrokerRegistry(chat_hub, address, max_sessions)
+    return SessionRegistry(chat_hub, max_sessions)
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Run a standalone session registry broker")
+    parser.add_argument("--address", default="unix:/tmp/ai-eva-registry.sock")
+    parser.add_argument("--max-sessions", type=int, default=0)
+    args = parser.parse_args()
+    server = await Broker(args.max_sessions).serve(args.address)
+    print(f"Session registry broker listening on {args.address}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,144 @@
+"""Per-client session state as one compact, typed object.
+
+``Session`` replaces the free-form ``st`` / ``session`` dicts that
+``websocket_endpoint`` used to share with the registry and its closures.
+It holds the Gemini link and connection, the YouTube chat subscription,
+the session's timers, tasks and chat digest, its model turn tracker
+(``barge_in.TurnTracker``), plus the timestamps the idle / proactive
+logic reads on every message.
+
+Fields live in ``__slots__``: no per-instance ``__dict__``, attribute
+access is a fixed offset instead of a hash lookup, and a mostly idle
+session costs a few hundred bytes of state (see
+``benchmarks/bench_sessions.py``).
+
+``close()`` releases everything the session owns (timers, tasks,
+subscription, digest, Gemini link) exactly once, whatever state the
+session got to; call it from the endpoint's ``finally``.
+"""
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Set, Tuple
+
+from chat_digest import ChatDigest
+from timer_wheel import Timer
+from yt_chat_hub import ChatSubscription
+
+if TYPE_CHECKING:  # pragma: no cover
+    from barge_in import TurnTracker
+    from gemini_failover import GeminiLink
+
+logger = logging.getLogger(__name__)
+
+MODES = ("audio", "camera", "screen")
+
+
+class Session:
+    __slots__ = (
+        "client_id", "mode", "closed",
+        # owned resources, released by close()
+        "link", "gemini", "yt", "digest", "idle_timer", "proactive_timer", "tasks",
+        # model turns and barge-in, set once the downstream queue exists
+        "turn",
+        # wall-clock timestamps (time.time()) for idle / proactive decisions
+        "last_activity", "last_image", "last_yt_chat", "last_proactive",
+        "allow_yt_reply",
+        # monotonic timestamp for the image hot path
+        "image_sent_at",
+        # last text the server sent on its own (YT digest / proactive prompt), for 1007 blame
+        "server_text", "server_text_lines", "server_text_at",
+    )
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.mode = "audio"  # 'audio' | 'camera' | 'screen'
+        self.closed = False
+
+        self.link: Optional["GeminiLink"] = None
+        self.gemini: Any = None  # GeminiConnection currently used by the link
+        self.yt: Optional[ChatSubscription] = None
+        self.digest: Optional[ChatDigest] = None
+        self.idle_timer: Optional[Timer] = None
+        self.proactive_timer: Optional[Timer] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self.turn: Optional["TurnTracker"] = None
+
+        self.last_activity = time.time()
+        self.last_image = 0.0  # last screen/camera frame received
+        self.last_yt_chat = 0.0  # last YouTube chat line received
+        self.last_proactive = 0.0  # cooldown for proactive prompts
+        self.allow_yt_reply = False  # idle: YT chat and proactive prompts may reach the model
+
+        self.image_sent_at = 0.0  # last frame forwarded to the transcoder/Gemini (monotonic)
+
+        self.server_text: Optional[str] = None
+        self.server_text_lines: Sequence[str] = ()
+        self.server_text_at = 0.0  # monotonic
+
+    def sent_server_text(self, payload: str, lines: Sequence[str]):
+        self.server_text = payload
+        self.server_text_lines = lines
+        self.server_text_at = time.monotonic()
+
+    def take_server_text(self, within: float) -> Optional[Tuple[str, Sequence[str]]]:
+        """The last server-originated text if it was sent less than ``within`` seconds ago (once)."""
+        payload, self.server_text = self.server_text, None
+        if payload is None or time.monotonic() - self.server_text_at > within:
+            return None
+        return payload, self.server_text_lines
+
+    def track(self, task: asyncio.Task) -> asyncio.Task:
+        """Cancel ``task`` on close() unless it finished before."""
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def subscribe_yt(self, sub: Optional[ChatSubscription]):
+        """Replace the YouTube chat subscription (None to stop)."""
+        if self.yt is not None:
+            self.yt.close()
+        self.yt = sub
+
+    def rearm_idle(self, timer: Timer):
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+        self.idle_timer = timer
+
+    def rearm_proactive(self, timer: Optional[Timer]):
+        if self.proactive_timer is not None:
+            self.proactive_timer.cancel()
+        self.proactive_timer = timer
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.rearm_proactive(None)
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        if self.digest is not None:
+            self.digest.close()
+        try:
+            self.subscribe_yt(None)
+        except Exception as e:
+            logger.warning(f"Closing YouTube chat subscription for {self.client_id} failed: {e}")
+            self.yt = None
+        for task in list(self.tasks):
+            task.cancel()
+        if self.link is not None:
+            await self.link.close()
+        self.gemini = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "mode": self.mode,
+            "idle": self.allow_yt_reply,
+            "idle_s": round(time.time() - self.last_activity, 1),
+            "tasks": len(self.tasks),
+            "turns": self.turn.turns if self.turn is not None else 0,
+            "barge_ins": self.turn.barge_ins if self.turn is not None else 0,
+            "yt_chat": self.yt is not None,
+        }
@@ -0,0 +1,104 @@
+import admission
+from admission import (
+    LEVEL_NO_PROACTIVE,
+    LEVEL_NORMAL,
+    LEVEL_REDUCE_IMAGES,
+    LEVEL_REFUSE,
+    REFUSED_OVERLOAD,
+    REFUSED_RATE,
+    AdmissionController,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Queue:
+    def __init__(self, depth=0):
+        self._depth = depth
+
+    def depth(self):
+        return self._depth
+
+
+def _controller(monkeypatch, lag=0.0, **kwargs):
+    clock = _Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    state = {"lag": lag}
+    kwargs.setdefault("smoothing", 1.0)
+    kwargs.setdefault("interval", 0.0)
+    ctl = AdmissionController(lambda: state["lag"], **kwargs)
+    return ctl, clock, state
+
+
+def test_lag_ladder_goes_up_at_once_and_down_one_step_per_cooldown(monkeypatch):
+    ctl, clock, state = _controller(monkeypatch, lag_ms=(50, 100, 250), cooldown=5.0)
+    assert ctl.level == LEVEL_NORMAL
+    state["lag"] = 0.3
+    assert ctl.level == LEVEL_REFUSE
+    assert ctl.admit() == REFUSED_OVERLOAD
+    assert not ctl.proactive_allowed()
+
+    state["lag"] = 0.0
+    clock.now += 4.0
+    assert ctl.level == LEVEL_REFUSE  # not calm long enough yet
+    clock.now += 1.0
+    assert ctl.level == LEVEL_NO_PROACTIVE
+    clock.now += 5.0
+    assert ctl.level == LEVEL_REDUCE_IMAGES
+    assert ctl.proactive_allowed()
+    clock.now += 5.0
+    assert ctl.level == LEVEL_NORMAL
+    assert ctl.stats()["level_changes"] == 4
+
+
+def test_queue_depth_drives_the_level_and_images_are_spaced(monkeypatch):
+    ctl, clock, _ = _controller(monkeypatch, queue_depth=(8, 16, 32), image_interval=2.0)
+    queues = (_Queue(10), _Queue(10))
+    ctl.watch(*queues)
+    assert ctl.level == LEVEL_REDUCE_IMAGES
+    assert not ctl.image_allowed(last_sent=clock.now - 1.0)
+    assert ctl.image_allowed(last_sent=clock.now - 2.0)
+    ctl.unwatch(*queues)
+    assert ctl.stats()["queues"] == 0
+
+
+def test_disabled_thresholds_never_trip(monkeypatch):
+    ctl, _, _ = _controller(monkeypatch, lag=10.0, lag_ms=(0, 0, 0))
+    assert ctl.level == LEVEL_NORMAL
+
+
+def test_token_bucket_and_refund(monkeypatch):
+    ctl, clock, _ = _controller(monkeypatch, rate=1.0, burst=2)
+    assert ctl.admit() is None and ctl.admit() is None
+    assert ctl.admit() == REFUSED_RATE
+    # Registry full: the last admitted session gives its token back
+    ctl.refund()
+    assert ctl.admit() is None
+    assert ctl.admit() == REFUSED_RATE
+    clock.now += 1.0
+    assert ctl.admit() is None
+    stats = ctl.stats()
+    assert (stats["admitted"], stats["refused_rate"], stats["refunded"]) == (3, 2, 1)
+
+
+def test_refund_never_overfills_the_bucket(monkeypatch):
+    ctl, _, _ = _controller(monkeypatch, rate=1.0, burst=1)
+    ctl.refund()
+    assert ctl.admit() is None
+    assert ctl.admit() == REFUSED_RATE
+
+
+def test_evaluation_is_rate_limited(monkeypatch):
+    ctl, clock, state = _controller(monkeypatch, interval=1.0, lag_ms=(50, 100, 250))
+    clock.now += 1.0
+    assert ctl.level == LEVEL_NORMAL
+    state["lag"] = 1.0
+    assert ctl.level == LEVEL_NORMAL  # sampled less than interval ago
+    clock.now += 1.0
+    assert ctl.level == LEVEL_REFUSE
@@ -0,0 +1,83 @@
+import asyncio
+
+from audio_coalescer import AudioCoalescer
+
+CHUNK = b"\x01\x00" * 512  # 32 ms at 16 kHz
+
+
+def _coalescer(sent, **kwargs):
+    async def send(data):
+        sent.append(data)
+    return AudioCoalescer(send, **kwargs)
+
+
+def test_window_flush_joins_chunks_in_order():
+    async def main():
+        sent = []
+        batcher = _coalescer(sent, window_ms=100.0)
+        chunks = [bytes([i]) * len(CHUNK) for i in range(4)]
+        for chunk in chunks:
+            await batcher.add(chunk)
+        assert sent == [b"".join(chunks)]  # 4 x 32 ms >= 100 ms
+        assert batcher.stats()["flushes"]["window"] == 1
+        assert batcher.stats()["buffered_bytes"] == 0
+
+    asyncio.run(main())
+
+
+def test_deadline_flushes_a_partial_window():
+    async def main():
+        sent = []
+        assert _coalescer(sent, window_ms=100.0, max_delay_ms=20.0).max_delay_ms == 100.0  # never below the window
+        batcher = _coalescer(sent, window_ms=10.0, max_delay_ms=20.0)
+        short = CHUNK[:64]  # 2 ms
+        await batcher.add(short)
+        assert sent == []
+        await asyncio.sleep(0.05)
+        assert sent == [short] and batcher.stats()["flushes"]["deadline"] == 1
+
+    asyncio.run(main())
+
+
+def test_speech_end_and_close():
+    async def main():
+        sent = []
+        batcher = _coalescer(sent)
+        await batcher.add(CHUNK)
+        await batcher.flush("speech_end")
+        await batcher.flush("speech_end")  # nothing buffered: no empty message
+        await batcher.add(CHUNK)
+        await batcher.close()
+        await batcher.add(CHUNK)  # closed: ignored
+        assert sent == [CHUNK, CHUNK]
+        flushes = batcher.stats()["flushes"]
+        assert (flushes["speech_end"], flushes["close"]) == (1, 1)
+        await asyncio.sleep(0.25)
+        assert len(sent) == 2  # the deadline was cancelled
+
+    asyncio.run(main())
+
+
+def test_disabled_window_passes_chunks_through():
+    async def main():
+        sent = []
+        batcher = _coalescer(sent, window_ms=0)
+        await batcher.add(CHUNK)
+        await batcher.add(CHUNK)
+        assert sent == [CHUNK, CHUNK]
+        assert batcher.stats()["chunks_per_message"] == 1.0
+
+    asyncio.run(main())
+
+
+def test_buffered_chunks_are_copied():
+    async def main():
+        sent = []
+        batcher = _coalescer(sent)
+        buf = bytearray(CHUNK)
+        await batcher.add(memoryview(buf))
+        buf[:] = b"\x00" * len(buf)  # the receive buffer gets reused
+        await batcher.flush("speech_end")
+        assert sent == [CHUNK]
+
+    asyncio.run(main())
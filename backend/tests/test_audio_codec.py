@@ -0,0 +1,80 @@
+import struct
+
+import numpy as np
+
+from audio_codec import (
+    ENCODING_MULAW,
+    ENCODING_PCM16,
+    AudioEncoder,
+    mulaw_decode,
+    mulaw_encode,
+    negotiate_audio_encoding,
+)
+
+
+def _reference_mulaw(sample: int) -> int:
+    # Scalar G.711 encoder (Sun's linear2ulaw)
+    sign = 0x80 if sample < 0 else 0
+    magnitude = min(abs(sample), 32635) + 0x84
+    exponent = 7
+    while exponent > 0 and not magnitude & (0x4000 >> (7 - exponent)):
+        exponent -= 1
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def _pcm(samples) -> bytes:
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+def test_encode_table_matches_reference_for_every_sample():
+    samples = list(range(-32768, 32768))
+    assert list(mulaw_encode(_pcm(samples))) == [_reference_mulaw(s) for s in samples]
+
+
+def test_decode_inverts_encode():
+    codes = bytes(range(256))
+    # 0x7F is negative zero, which encodes back as 0xFF
+    expected = bytes(b if b != 0x7F else 0xFF for b in codes)
+    assert mulaw_encode(mulaw_decode(codes)) == expected
+
+
+def test_round_trip_error_is_within_one_step():
+    samples = np.arange(-32768, 32768, 7, dtype=np.int32)
+    back = np.frombuffer(mulaw_decode(mulaw_encode(samples.astype("<i2").tobytes())), dtype="<i2")
+    error = np.abs(back - samples)
+    # Steps double per segment, from 8 near zero to 1024 at the top, plus clipping above 32635
+    assert error.max() <= 1024 + (32768 - 32635)
+    assert error[np.abs(samples) < 256].max() <= 8
+
+
+def test_negotiate_audio_encoding():
+    assert negotiate_audio_encoding({"audioEncoding": "mulaw"}) == ENCODING_MULAW
+    assert negotiate_audio_encoding({"config": {"audioEncoding": "mulaw"}}) == ENCODING_MULAW
+    assert negotiate_audio_encoding({"audioEncoding": "adpcm"}) == ENCODING_PCM16
+    assert negotiate_audio_encoding({}) == ENCODING_PCM16
+
+
+def test_encoder_reframes_into_exact_packets_and_flushes_the_tail():
+    encoder = AudioEncoder(ENCODING_PCM16, frame_ms=10.0)  # 240 samples, 480 bytes
+    assert encoder.encode(b"\x00" * 300) == []
+    packets = encoder.encode(b"\x00" * 1000)
+    assert [len(p) for p in packets] == [480, 480]
+    assert [len(p) for p in encoder.flush()] == [340]
+    assert encoder.flush() == []
+    stats = encoder.stats()
+    assert (stats["frames"], stats["bytes_in"], stats["bytes_out"]) == (3, 1300, 1300)
+
+
+def test_mulaw_encoder_halves_packets_and_drops_odd_bytes():
+    encoder = AudioEncoder(ENCODING_MULAW, frame_ms=10.0)
+    assert [len(p) for p in encoder.encode(b"\x10\x00" * 500)] == [240, 240]
+    encoder.encode(b"\x10")
+    assert [len(p) for p in encoder.flush()] == [20]
+
+
+def test_reset_discards_buffered_audio():
+    encoder = AudioEncoder(ENCODING_PCM16, frame_ms=10.0)
+    encoder.encode(b"\x00" * 100)
+    assert encoder.reset() == 100
+    assert encoder.flush() == []
@@ -0,0 +1,189 @@
+import asyncio
+
+import barge_in
+from barge_in import TurnTracker
+from gemini_decoder import KIND_AUDIO, KIND_INTERRUPTED, KIND_TEXT, KIND_TURN_COMPLETE, ServerMessage
+from media_queue import CONTROL, MediaQueue
+
+# 0.5 s of 24 kHz PCM16, base64
+HALF_SECOND = "A" * 32000
+
+
+def _msg(kind, parts=(), turn_complete=False, interrupted=False):
+    response = ServerMessage(kind)
+    response.parts = list(parts)
+    response.turn_complete = turn_complete
+    response.interrupted = interrupted
+    return response
+
+
+class _Encoder:
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+        return 0
+
+
+def _tracker(monkeypatch, **kwargs):
+    now = [100.0]
+    monkeypatch.setattr(barge_in.time, "monotonic", lambda: now[0])
+    downstream, sent = MediaQueue("downstream"), []
+
+    async def send_interrupted():
+        sent.append("interrupted")
+
+    turn = TurnTracker(downstream, send_interrupted, **kwargs)
+    return turn, downstream, sent, now
+
+
+async def _queue_model_audio(turn, downstream, chunks=3):
+    response = _msg(KIND_AUDIO, [(KIND_AUDIO, HALF_SECOND)])
+    await turn.model_response(response)
+    if response.parts:
+        turn.audio_sent(HALF_SECOND)
+        for _ in range(chunks):
+            downstream.put_audio(lambda: asyncio.sleep(0))
+
+
+async def _drain(downstream):
+    kinds = []
+    while downstream.depth():
+        kind, send = await downstream.get()
+        kinds.append(kind)
+        await send()
+    return kinds
+
+
+def test_speech_onset_mid_turn_drops_queued_audio_and_queues_interrupted(monkeypatch):
+    async def main():
+        encoder = _Encoder()
+        turn, downstream, sent, _ = _tracker(monkeypatch, encoder=encoder)
+        await _queue_model_audio(turn, downstream)
+        assert turn.talking() and downstream.depth() == 3
+
+        assert await turn.speech_started("vad") is True
+        assert turn.interrupted and not turn.talking() and not turn.playing()
+        assert await _drain(downstream) == [CONTROL]
+        assert sent == ["interrupted"] and encoder.resets == 1
+        assert turn.stats()["barge_ins"] == 1 and turn.stats()["dropped_queued"] == 3
+
+    asyncio.run(main())
+
+
+def test_incoming_audio_is_dropped_until_turn_complete(monkeypatch):
+    async def main():
+        turn, downstream, sent, _ = _tracker(monkeypatch)
+        await _queue_model_audio(turn, downstream)
+        await turn.speech_started("client")
+
+        rest = _msg(KIND_AUDIO, [(KIND_AUDIO, HALF_SECOND), (KIND_TEXT, "still talking"), (KIND_AUDIO, HALF_SECOND)])
+        await turn.model_response(rest)
+        assert rest.parts == [(KIND_TEXT, "still talking")]
+        assert turn.stats()["dropped_incoming"] == 2
+
+        await turn.model_response(_msg(KIND_TURN_COMPLETE, turn_complete=True))
+        turn.turn_complete()
+        assert not turn.interrupted and turn.turns == 1
+
+        reply = _msg(KIND_AUDIO, [(KIND_AUDIO, HALF_SECOND)])
+        await turn.model_response(reply)
+        assert reply.parts == [(KIND_AUDIO, HALF_SECOND)] and turn.talking()
+
+    asyncio.run(main())
+
+
+def test_gemini_interrupted_ends_the_drop_without_a_second_flush(monkeypatch):
+    async def main():
+        turn, downstream, sent, _ = _tracker(monkeypatch)
+        await _queue_model_audio(turn, downstream)
+        await turn.speech_started("vad")
+
+        await turn.model_response(_msg(KIND_INTERRUPTED, interrupted=True))
+        assert not turn.interrupted and turn.barge_ins == 1
+
+        reply = _msg(KIND_AUDIO, [(KIND_AUDIO, HALF_SECOND)])
+        await turn.model_response(reply)
+        assert reply.parts == [(KIND_AUDIO, HALF_SECOND)]
+        assert await _drain(downstream) == [CONTROL] and sent == ["interrupted"]
+
+    asyncio.run(main())
+
+
+def test_gemini_interrupted_flushes_when_no_barge_in_did(monkeypatch):
+    async def main():
+        turn, downstream, sent, _ = _tracker(monkeypatch, enabled=False)
+        await _queue_model_audio(turn, downstream)
+        # Barge-in disabled: the user's speech alone doesn't cut the model off
+        assert await turn.speech_started("vad") is False
+        assert downstream.depth() == 3
+
+        await turn.model_response(_msg(KIND_INTERRUPTED, interrupted=True))
+        assert turn.barge_ins == 1 and not turn.interrupted and not turn.talking()
+        assert await _drain(downstream) == [CONTROL] and sent == ["interrupted"]
+
+    asyncio.run(main())
+
+
+def test_reconnect_clears_the_interrupted_state(monkeypatch):
+    async def main():
+        turn, downstream, _, _ = _tracker(monkeypatch)
+        await _queue_model_audio(turn, downstream)
+        await turn.speech_started("vad")
+        assert turn.interrupted
+
+        turn.reconnected()
+        assert not turn.interrupted and turn.turn_started_at is None
+        reply = _msg(KIND_AUDIO, [(KIND_AUDIO, HALF_SECOND)])
+        await turn.model_response(reply)
+        assert reply.parts == [(KIND_AUDIO, HALF_SECOND)] and turn.talking()
+
+    asyncio.run(main())
+
+
+def test_no_flush_when_idle_and_playback_finished(monkeypatch):
+    async def main():
+        turn, downstream, sent, now = _tracker(monkeypatch)
+        assert await turn.speech_started("vad") is False
+
+        await _queue_model_audio(turn, downstream)
+        turn.turn_complete()
+        assert not turn.talking() and turn.playing()
+        now[0] += 0.6  # the browser played the 0.5 s reply
+
+        assert await turn.speech_started("vad") is False
+        assert downstream.depth() == 3 and downstream.stats()["dropped_audio_flushed"] == 0
+        assert sent == [] and turn.barge_ins == 0
+
+    asyncio.run(main())
+
+
+def test_speech_during_playback_flushes_without_interrupting_the_next_turn(monkeypatch):
+    async def main():
+        turn, downstream, sent, now = _tracker(monkeypatch)
+        await _queue_model_audio(turn, downstream)
+        turn.turn_complete()
+        now[0] += 0.2  # still playing the reply
+
+        assert await turn.speech_started("client") is True
+        assert not turn.interrupted and not turn.playing()
+        assert await _drain(downstream) == [CONTROL] and sent == ["interrupted"]
+
+    asyncio.run(main())
+
+
+def test_speech_to_audio_latency_is_observed_once(monkeypatch):
+    async def main():
+        turn, downstream, _, now = _tracker(monkeypatch)
+        seen = []
+        monkeypatch.setattr(barge_in.metrics.speech_to_audio_seconds, "observe", lambda v, *a: seen.append(v))
+        turn.speech_ended()
+        now[0] += 0.1
+        turn.speech_ended(keep_first=True)
+        now[0] += 0.3
+        await _queue_model_audio(turn, downstream)
+        await _queue_model_audio(turn, downstream)
+        assert [round(v, 6) for v in seen] == [0.4]
+
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+import chat_digest
+from chat_digest import ChatDigest, normalize
+
+
+class _Timer:
+    def __init__(self, delay, callback):
+        self.delay = delay
+        self.callback = callback
+        self.active = True
+
+    def cancel(self):
+        self.active = False
+
+
+class _Timers:
+    """Stand-in for TimerWheel: the test decides when timers fire."""
+
+    def __init__(self):
+        self.timers = []
+
+    def schedule(self, delay, callback, *args):
+        timer = _Timer(delay, lambda: callback(*args))
+        self.timers.append(timer)
+        return timer
+
+    def fire(self):
+        due, self.timers = [t for t in self.timers if t.active], []
+        for timer in due:
+            timer.callback()
+
+
+def _digest(monkeypatch, allow=lambda: True, **kwargs):
+    now = [1000.0]
+    monkeypatch.setattr(chat_digest.time, "monotonic", lambda: now[0])
+    sent, timers = [], _Timers()
+    digest = ChatDigest(lambda text, lines: sent.append((text, lines)), allow, timers, **kwargs)
+    return digest, sent, timers, now
+
+
+def test_normalize():
+    assert normalize("SPAM!!! spaaam 🎉") == "spam spam"
+    assert normalize("  Hello,   World ") == "helo world"
+    assert normalize("🎉🎉") == ""
+
+
+def test_lines_in_one_window_become_one_turn(monkeypatch):
+    digest, sent, timers, _ = _digest(monkeypatch)
+    digest.add("ann", "hello eva")
+    digest.add("bob", "HELLO EVA!!")  # same line: merged into the pending one
+    digest.add("cid", "what game is this?")
+    assert len(timers.timers) == 1 and timers.timers[0].delay == 3.0
+    timers.fire()
+    assert sent == [(
+        "[YouTube] 2 new chat messages:\n- ann: hello eva (x2)\n- cid: what game is this?",
+        ["hello eva", "what game is this?"],
+    )]
+    digest.add("dan", "just one")
+    timers.fire()
+    assert sent[-1] == ("[YouTube] dan: just one", ["just one"])
+
+
+def test_recently_sent_lines_are_dropped_until_the_dedup_window_passes(monkeypatch):
+    digest, sent, timers, now = _digest(monkeypatch, dedup_window=60.0, author_per_minute=0)
+    digest.add("ann", "gg")
+    timers.fire()
+    digest.add("bob", "GG")
+    assert digest.stats()["dropped_duplicate"] == 1 and digest.stats()["pending"] == 0
+    now[0] += 61.0
+    digest.add("bob", "GG")
+    timers.fire()
+    assert [lines for _, lines in sent] == [["gg"], ["GG"]]
+
+
+def test_author_rate_limit(monkeypatch):
+    digest, _, _, now = _digest(monkeypatch, author_per_minute=2.0)
+    for i in range(3):
+        digest.add("spammer", f"line {i}")
+    assert digest.stats()["dropped_rate"] == 1
+    now[0] += 30.0  # one token back
+    digest.add("spammer", "line 3")
+    digest.add("spammer", "line 4")
+    assert digest.stats()["dropped_rate"] == 2
+    digest.add("other", "line 5")
+    assert digest.stats()["pending"] == 4
+
+
+def test_only_the_newest_lines_are_kept(monkeypatch):
+    digest, sent, timers, _ = _digest(monkeypatch, max_lines=2, author_per_minute=0)
+    for i in range(4):
+        digest.add("ann", f"line {i}")
+    timers.fire()
+    assert sent[0][1] == ["line 2", "line 3"] and digest.stats()["dropped_overflow"] == 2
+
+
+def test_turn_budget_defers_the_digest(monkeypatch):
+    digest, sent, timers, now = _digest(monkeypatch, turns_per_minute=1, author_per_minute=0)
+    digest.add("ann", "first")
+    timers.fire()
+    now[0] += 10.0
+    digest.add("ann", "second")
+    timers.fire()
+    assert len(sent) == 1 and digest.stats()["deferred"] == 1
+    assert timers.timers[0].delay == 50.0  # until the first turn leaves the minute
+    digest.add("bob", "third")  # still collected while deferred
+    now[0] += 50.0
+    timers.fire()
+    assert sent[1][1] == ["second", "third"]
+
+
+def test_pending_lines_are_discarded_while_not_idle(monkeypatch):
+    active = [False]
+    digest, sent, timers, _ = _digest(monkeypatch, allow=lambda: active[0])
+    digest.add("ann", "hi")
+    timers.fire()
+    assert sent == [] and digest.stats()["dropped_inactive"] == 1
+
+
+def test_close_cancels_the_timer(monkeypatch):
+    digest, sent, timers, _ = _digest(monkeypatch)
+    digest.add("ann", "hi")
+    digest.close()
+    timers.fire()
+    assert sent == [] and digest.stats()["pending"] == 0
@@ -0,0 +1,57 @@
+import io
+import time
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+from frame_filter import TILES, FrameFilter, changed_tiles, signature  # noqa: E402
+
+
+def screen(lines: int, quality: int = 80, width: int = 1920, height: int = 1080) -> bytes:
+    img = Image.new("RGB", (width, height), (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, width, 40], fill=(40, 40, 60))
+    for i in range(lines):
+        draw.text((60, 80 + i * 22), f"def function_{i}(arg): return compute(arg, {i * 7}) + other_{i}", fill=(20, 20, 20))
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+def test_signature_is_one_byte_per_tile():
+    assert len(signature(screen(3))) == TILES
+
+
+def test_typed_lines_change_tiles_reencoding_does_not():
+    base = signature(screen(20))
+    assert changed_tiles(base, signature(screen(24)), 4) > 0
+    assert changed_tiles(base, signature(screen(21)), 4) > 0
+    assert changed_tiles(base, signature(screen(20, quality=70)), 4) == 0
+
+
+def test_byte_hash_fallback_only_matches_exact_duplicates():
+    assert signature(b"not a jpeg") == signature(b"not a jpeg")
+    assert changed_tiles(signature(b"a"), signature(b"a"), 4) == 0
+    assert changed_tiles(signature(b"a"), signature(b"b"), 4) == TILES
+
+
+def test_filter_drops_duplicates_until_keyframe(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    frame_filter = FrameFilter(threshold=0, tile_delta=4, keyframe_interval=10.0)
+    same = screen(20)
+    assert frame_filter.should_send(same)
+    assert not frame_filter.should_send(screen(20, quality=70))
+    assert frame_filter.should_send(screen(22))
+    now[0] += 10.0
+    assert frame_filter.should_send(screen(22))  # keyframe
+    assert frame_filter.stats()["keyframes"] == 1
+    assert (frame_filter.sent, frame_filter.dropped) == (3, 1)
+
+
+def test_disabled_filter_sends_everything():
+    frame_filter = FrameFilter(threshold=-1)
+    assert frame_filter.should_send(b"x") and frame_filter.should_send(b"x")
+    assert frame_filter.reference() is None
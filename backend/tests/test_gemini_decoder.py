@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from gemini_decoder import (
+    KIND_AUDIO,
+    KIND_INTERRUPTED,
+    KIND_OTHER,
+    KIND_SETUP_COMPLETE,
+    KIND_TEXT,
+    KIND_TURN_COMPLETE,
+    audio_json_frame,
+    decode_server_message,
+)
+
+
+def _turn(*parts, **content):
+    return json.dumps({"serverContent": {"modelTurn": {"parts": list(parts)}, **content}})
+
+
+@pytest.mark.parametrize("raw", [str, lambda s: s.encode()])
+def test_lone_audio_part_is_sliced_without_parsing(raw):
+    msg = decode_server_message(raw(_turn({"inlineData": {"mimeType": "audio/pcm", "data": "AAEC"}})))
+    assert msg.kind == KIND_AUDIO and msg.fast
+    assert [(k, bytes(d) if isinstance(d, bytes) else d) for k, d in msg.parts] == [(KIND_AUDIO, raw("AAEC"))]
+
+
+def test_mixed_and_control_messages_take_the_full_parse():
+    msg = decode_server_message(_turn({"text": "hi"}, {"inlineData": {"data": "AA=="}}, turnComplete=True))
+    assert not msg.fast and msg.kind == KIND_TEXT and msg.turn_complete
+    assert msg.parts == [(KIND_TEXT, "hi"), (KIND_AUDIO, "AA==")]
+
+    # An escaped payload is left to the JSON parser
+    escaped = decode_server_message('{"serverContent":{"modelTurn":{"parts":[{"inlineData":{"data":"A\\/A="}}]}}}')
+    assert not escaped.fast and escaped.parts == [(KIND_AUDIO, "A/A=")]
+
+    assert decode_server_message('{"setupComplete":{}}').kind == KIND_SETUP_COMPLETE
+    assert decode_server_message(json.dumps({"serverContent": {"turnComplete": True}})).kind == KIND_TURN_COMPLETE
+    assert decode_server_message(json.dumps({"serverContent": {"interrupted": True}})).interrupted
+    assert decode_server_message(json.dumps({"serverContent": {"interrupted": True}})).kind == KIND_INTERRUPTED
+    assert decode_server_message("[]").kind == KIND_OTHER
+
+
+@pytest.mark.parametrize("raw", [
+    "{not json",
+    b"\xff\xfe",
+    _turn({"inlineData": {}}),
+    _turn(3),
+    _turn({"inlineData": 3}),
+])
+def test_malformed_messages_raise_what_the_receiver_catches(raw):
+    # receive_from_gemini counts and skips exactly these
+    with pytest.raises((ValueError, KeyError, TypeError)):
+        decode_server_message(raw)
+
+
+def test_audio_json_frame_matches_json_dumps():
+    assert json.loads(audio_json_frame(b"AAEC")) == {"type": "audio", "data": "AAEC"}
+    assert json.loads(audio_json_frame("AAEC", "mulaw")) == {"type": "audio", "data": "AAEC", "encoding": "mulaw"}
@@ -0,0 +1,178 @@
+import asyncio
+
+from gemini_failover import PCM_BYTES_PER_MS, Backoff, GeminiLink
+
+
+class _State:
+    def __init__(self, name):
+        self.name = name
+
+
+class _WS:
+    def __init__(self):
+        self.state = _State("OPEN")
+
+
+class _Conn:
+    def __init__(self, n):
+        self.n = n
+        self.ws = _WS()
+        self.audio = []
+        self.closed = False
+
+    async def send_audio_bytes(self, pcm):
+        self.audio.append(pcm)
+
+    async def close(self):
+        self.closed = True
+        self.ws.state = _State("CLOSED")
+
+
+class _Pool:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.leased = []
+
+    async def acquire(self, config):
+        await asyncio.sleep(self.delay)
+        conn = _Conn(len(self.leased))
+        self.leased.append(conn)
+        return conn
+
+
+def test_backoff_grows_to_the_cap_with_jitter():
+    backoff = Backoff(initial=0.5, maximum=4.0, jitter=0.0)
+    assert [backoff.next() for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+    backoff.reset()
+    assert backoff.next() == 0.5
+    jittery = Backoff(initial=1.0, jitter=0.2)
+    delays = []
+    for _ in range(20):
+        delays.append(jittery.next())
+        jittery.reset()
+    assert all(0.8 <= d <= 1.2 for d in delays) and len(set(delays)) > 1
+
+
+def test_switch_without_standby_leases_from_the_pool():
+    async def main():
+        pool = _Pool()
+        link = GeminiLink(pool, {})
+        first = await link.start()
+        await asyncio.sleep(0)
+        assert len(pool.leased) == 1  # no standby
+        # Two receivers see the same close: only one switch happens
+        a, b = await asyncio.gather(link.switch(first), link.switch(first))
+        assert a is b is link.active and a is not first
+        assert first.closed and link.stats()["switches"] == 1 and len(pool.leased) == 2
+
+    asyncio.run(main())
+
+
+def test_standby_switch_replays_recent_and_in_flight_audio():
+    async def main():
+        pool = _Pool(delay=0.01)
+        link = GeminiLink(pool, {}, standby=True, replay_ms=64.0)
+        first = await link.start()
+        await asyncio.sleep(0.05)
+        assert link.stats()["standby_ready"]
+        standby = pool.leased[1]
+
+        chunk = b"\x00" * (32 * PCM_BYTES_PER_MS)
+        for i in range(4):
+            await link.send_audio(bytes([i]) * len(chunk))
+        assert len(first.audio) == 4
+
+        fresh = await link.switch(first)
+        assert fresh is standby and link.stats()["standby_hits"] == 1
+        # The last 64 ms before the switch go to the new connection
+        assert fresh.audio == [bytes([2]) * len(chunk) + bytes([3]) * len(chunk)]
+        await asyncio.sleep(0.05)
+        assert link.stats()["standby_ready"] and len(pool.leased) == 3
+
+    asyncio.run(main())
+
+
+def test_audio_sent_during_a_switch_is_replayed_not_lost():
+    async def main():
+        pool = _Pool()
+        link = GeminiLink(pool, {}, standby=True, replay_ms=1000.0)
+        first = await link.start()
+        await asyncio.sleep(0.01)
+        pool.delay = 0.05
+        link._standby = None  # force a pool lease, slow enough to talk over
+        switching = asyncio.create_task(link.switch(first))
+        await asyncio.sleep(0.01)
+        await link.send_audio(b"during")
+        assert first.audio == []  # held back while switching
+        fresh = await switching
+        assert fresh.audio == [b"during"]
+
+    asyncio.run(main())
+
+
+def test_closed_standby_is_discarded():
+    async def main():
+        pool = _Pool()
+        link = GeminiLink(pool, {}, standby=True)
+        first = await link.start()
+        await asyncio.sleep(0.01)
+        stale = link._standby
+        await stale.close()
+        fresh = await link.switch(first)
+        assert fresh is not stale and link.stats()["standby_hits"] == 0
+
+    asyncio.run(main())
+
+
+def test_close_releases_both_connections():
+    async def main():
+        pool = _Pool()
+        link = GeminiLink(pool, {}, standby=True)
+        active = await link.start()
+        await asyncio.sleep(0.01)
+        standby = link._standby
+        await link.close()
+        assert active.closed and standby.closed and link.active is None
+
+    asyncio.run(main())
+
+
+def test_audio_sent_during_a_slow_replay_is_replayed_too():
+    class _SlowConn(_Conn):
+        async def send_audio_bytes(self, pcm):
+            await asyncio.sleep(0.03)
+            self.audio.append(pcm)
+
+    class _SlowPool(_Pool):
+        async def acquire(self, config):
+            conn = _SlowConn(len(self.leased))
+            self.leased.append(conn)
+            return conn
+
+    async def main():
+        pool = _SlowPool()
+        link = GeminiLink(pool, {}, standby=True, replay_ms=1000.0)
+        first = await link.start()
+        await asyncio.sleep(0.01)
+        await link.send_audio(b"A")
+        switching = asyncio.create_task(link.switch(first))
+        await asyncio.sleep(0.01)  # replay of "A" in flight
+        await link.send_audio(b"X")
+        fresh = await switching
+        assert fresh.audio == [b"A", b"X"]
+        assert link.stats()["replayed_bytes"] == 2
+
+    asyncio.run(main())
+
+
+def test_second_caller_with_the_failed_connection_does_not_switch_again():
+    async def main():
+        pool = _Pool()
+        link = GeminiLink(pool, {})
+        failed = await link.start()
+        # Sender and receiver see the same close one after the other
+        fresh = await link.switch(failed)
+        assert await link.switch(failed) is fresh
+        assert len(pool.leased) == 2 and not fresh.closed
+
+    asyncio.run(main())
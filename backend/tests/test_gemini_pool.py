@@ -0,0 +1,133 @@
+import asyncio
+
+from gemini_pool import GeminiPool, _Idle, is_open
+
+
+class _State:
+    def __init__(self, name):
+        self.name = name
+
+
+class _WS:
+    def __init__(self):
+        self.state = _State("OPEN")
+
+    async def ping(self):
+        fut = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(_Conn.ping_delay, fut.set_result, None)
+        return fut
+
+
+class _Conn:
+    dialed = 0
+    ping_delay = 0.0
+
+    def __init__(self):
+        self.ws = None
+        self.config = None
+        self.closed = False
+
+    def set_config(self, config):
+        self.config = config
+
+    async def connect(self):
+        _Conn.dialed += 1
+        self.ws = _WS()
+
+    async def close(self):
+        self.closed = True
+        self.ws.state = _State("CLOSED")
+
+
+def _pool(**kw) -> GeminiPool:
+    _Conn.dialed = 0
+    _Conn.ping_delay = 0.0
+    return GeminiPool(_Conn, "model-x", **kw)
+
+
+CONFIG = {"voice": "Puck", "systemPrompt": "hi"}
+
+
+def test_is_open():
+    assert not is_open(None)
+    assert is_open(_WS())
+
+    class Legacy:
+        open = True
+
+    assert is_open(Legacy())
+
+
+def test_miss_then_hit():
+    async def main():
+        pool = _pool(min_size=1, max_size=2)
+        first = await pool.acquire(CONFIG)
+        assert first.config == CONFIG and pool.misses == 1
+        await asyncio.sleep(0)  # refill dial
+        second = await pool.acquire(CONFIG)
+        assert second is not first and pool.hits == 1
+        await pool.stop()
+
+    asyncio.run(main())
+
+
+def test_check_never_leases_a_connection_twice():
+    async def main():
+        pool = _pool(min_size=2, max_size=2, ping_timeout=1.0)
+        key = pool.key_for("model-x", CONFIG)
+        await pool.acquire(CONFIG)
+        await asyncio.sleep(0)
+        assert len(pool._idle[key]) == 2
+        _Conn.ping_delay = 0.05
+
+        check = asyncio.create_task(pool._check())
+        await asyncio.sleep(0.01)  # _check is awaiting a ping
+        leased = [await pool.acquire(CONFIG) for _ in range(2)]
+        await check
+        await asyncio.sleep(0)
+        idle = [e.conn for e in pool._idle[key]]
+        for conn in leased:
+            assert conn not in idle
+        # Nothing leaked: every connection is leased, idle or closed
+        assert len({id(c) for c in idle}) == len(idle) <= pool.max_size
+        await pool.stop()
+
+    asyncio.run(main())
+
+
+def test_check_keeps_connections_dialed_meanwhile():
+    async def main():
+        pool = _pool(min_size=1, max_size=3, ping_timeout=1.0)
+        key = pool.key_for("model-x", CONFIG)
+        await pool.acquire(CONFIG)
+        await asyncio.sleep(0)
+        old = pool._idle[key][0].conn
+        _Conn.ping_delay = 0.05
+        check = asyncio.create_task(pool._check())
+        await asyncio.sleep(0.01)
+        fresh = _Conn()
+        await fresh.connect()
+        pool._idle.setdefault(key, []).append(_Idle(fresh))  # what _dial does when it lands
+        await check
+        idle = [e.conn for e in pool._idle[key]]
+        assert old in idle and fresh in idle
+        # Newest is leased first
+        assert await pool.acquire(CONFIG) is fresh
+        await pool.stop()
+
+    asyncio.run(main())
+
+
+def test_check_evicts_stale_and_unused_keys():
+    async def main():
+        pool = _pool(min_size=1, max_size=2, max_idle=60.0, key_ttl=0.0)
+        key = pool.key_for("model-x", CONFIG)
+        await pool.acquire(CONFIG)
+        await asyncio.sleep(0)
+        conn = pool._idle[key][0].conn
+        await asyncio.sleep(0.01)
+        await pool._check()
+        assert key not in pool._idle and conn.closed
+        await pool.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import asyncio
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from frame_filter import FrameFilter  # noqa: E402
+from image_transcoder import ImageTranscoder, process, transcode  # noqa: E402
+
+
+def jpeg(width: int, height: int, color=(200, 40, 40), quality: int = 90) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+def test_transcode_fits_max_edge():
+    data = transcode(jpeg(3840, 2160), 1024, 70)
+    assert Image.open(io.BytesIO(data)).size == (1024, 576)
+
+
+def test_small_frame_that_would_not_shrink_is_unchanged():
+    small = jpeg(64, 64, quality=10)
+    assert transcode(small, 1024, 95) is small
+
+
+def test_process_drops_duplicates_before_transcoding():
+    frame = jpeg(1920, 1080)
+    sig, data, failed = process(frame, 1024, 70, None, 0, 4)
+    assert sig is not None and data is not None and not failed
+    assert process(frame, 1024, 70, sig, 0, 4) == (sig, None, False)
+    # Dedup off: no signature, always forwarded
+    assert process(frame, 0, 70, sig, -1, 4) == (None, frame, False)
+
+
+def test_process_keeps_signature_of_undecodable_frames():
+    sig, data, failed = process(b"garbage", 1024, 70, None, 0, 4)
+    assert data == b"garbage" and failed
+    assert process(b"garbage", 1024, 70, sig, 0, 4) == (sig, None, False)
+
+
+def test_submit_through_pool_with_filter():
+    async def main():
+        transcoder = ImageTranscoder(1024, 70, workers=1)
+        transcoder.start()
+        try:
+            frame_filter = FrameFilter(threshold=0, tile_delta=4)
+            first = await transcoder.submit(jpeg(1920, 1080), frame_filter)
+            assert first is not None and Image.open(io.BytesIO(first)).size == (1024, 576)
+            assert await transcoder.submit(jpeg(1920, 1080), frame_filter) is None
+            assert await transcoder.submit(jpeg(1920, 1080, (20, 20, 220)), frame_filter) is not None
+            stats = transcoder.stats()
+            assert stats["duplicates"] == 1 and stats["transcoded"] == 2
+            assert (frame_filter.sent, frame_filter.dropped) == (2, 1)
+        finally:
+            await transcoder.stop()
+
+    asyncio.run(main())
+
+
+def test_submit_without_pool_passes_through():
+    async def main():
+        transcoder = ImageTranscoder(0, 70, dedup=False)
+        frame = jpeg(32, 32)
+        assert not transcoder.enabled
+        assert await transcoder.submit(frame, FrameFilter(threshold=-1)) is frame
+
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from loop_monitor import LoopMonitor
+
+
+def _block(seconds):
+    time.sleep(seconds)  # the blocking call the watchdog should catch
+
+
+def test_stall_is_measured_and_its_stack_captured():
+    async def main():
+        monitor = LoopMonitor(interval=0.02, stall_s=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            _block(0.2)
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+        return monitor.snapshot()
+
+    snap = asyncio.run(main())
+    assert snap["stalls"] >= 1 and snap["lag_ms"]["max"] >= 100
+    stack = "".join(snap["recent_stalls"][-1]["stack"])
+    assert "_block" in stack
+
+
+def test_meter_charges_cpu_to_the_session():
+    async def work():
+        deadline = time.thread_time() + 0.02
+        while time.thread_time() < deadline:
+            pass
+        await asyncio.sleep(0)
+        return "done"
+
+    async def main():
+        monitor = LoopMonitor()
+        account = monitor.account("c1")
+        result = await asyncio.create_task(monitor.meter(account, "upstream", work()))
+        assert result == "done"
+        assert account.cpu_seconds >= 0.015 and account.steps == 2
+        assert set(account.by_task) == {"upstream"}
+        assert monitor.snapshot()["top_sessions"][0]["client_id"] == "c1"
+
+        # A reconnect with the same id replaces the account; forgetting the old one keeps the new
+        newer = monitor.account("c1")
+        monitor.forget(account)
+        assert monitor.sessions["c1"] is newer
+        monitor.forget(newer)
+        assert monitor.sessions == {}
+
+    asyncio.run(main())
+
+
+def test_metered_coroutines_propagate_cancellation():
+    async def main():
+        monitor = LoopMonitor()
+        task = asyncio.create_task(monitor.meter(monitor.account("c1"), "gemini", asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+
+
+def test_disabled_monitor_does_nothing():
+    async def main():
+        monitor = LoopMonitor(enabled=False)
+        monitor.start()
+        coro = asyncio.sleep(0)
+        assert monitor.meter(monitor.account("c1"), "client", coro) is coro
+        await coro
+        assert monitor._task is None and monitor.sessions == {}
+        await monitor.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+import asyncio
+
+import media_queue
+from media_queue import AUDIO, CONTROL, EVENT, IMAGE, MediaQueue
+
+
+def _send(log, name):
+    async def send():
+        log.append(name)
+    return lambda: send()
+
+
+async def _take(queue, n):
+    out = []
+    for _ in range(n):
+        kind, send = await queue.get()
+        out.append(kind)
+        await send()
+    return out
+
+
+def test_fifo_across_kinds():
+    async def main():
+        queue, log = MediaQueue("test"), []
+        queue.put_audio(_send(log, "a1"))
+        await queue.put_control(_send(log, "c1"))
+        queue.put_image(_send(log, "i1"))
+        queue.put_audio(_send(log, "a2"))
+        assert queue.depth() == 4
+        assert await _take(queue, 4) == [AUDIO, CONTROL, IMAGE, AUDIO]
+        assert log == ["a1", "c1", "i1", "a2"] and queue.depth() == 0
+
+    asyncio.run(main())
+
+
+def test_audio_overflow_drops_the_oldest_chunks():
+    async def main():
+        queue, log = MediaQueue("test", max_audio=2), []
+        for i in range(4):
+            queue.put_audio(_send(log, f"a{i}"))
+        await queue.put_control(_send(log, "c"))
+        await _take(queue, 3)
+        assert log == ["a2", "a3", "c"]
+        assert queue.stats()["dropped_audio_overflow"] == 2
+
+    asyncio.run(main())
+
+
+def test_stale_audio_is_dropped_at_the_head(monkeypatch):
+    async def main():
+        now = [100.0]
+        monkeypatch.setattr(media_queue.time, "monotonic", lambda: now[0])
+        queue, log = MediaQueue("test", audio_budget_ms=500.0), []
+        queue.put_audio(_send(log, "old"))
+        now[0] += 0.6
+        queue.put_audio(_send(log, "fresh"))
+        await _take(queue, 1)
+        assert log == ["fresh"] and queue.stats()["dropped_audio_stale"] == 1
+
+    asyncio.run(main())
+
+
+def test_newest_image_supersedes_a_queued_one():
+    async def main():
+        queue, log = MediaQueue("test"), []
+        queue.put_image(_send(log, "i1"))
+        queue.put_image(_send(log, "i2"))
+        await queue.put_control(_send(log, "c"))
+        assert queue.depth() == 2
+        await _take(queue, 2)
+        assert log == ["i2", "c"] and queue.stats()["dropped_image"] == 1
+
+    asyncio.run(main())
+
+
+def test_drop_audio_keeps_control_and_images():
+    async def main():
+        queue, log = MediaQueue("test"), []
+        queue.put_audio(_send(log, "a1"))
+        queue.put_image(_send(log, "i"))
+        queue.put_audio(_send(log, "a2"))
+        await queue.put_control(_send(log, "c"))
+        assert queue.drop_audio() == 2
+        await _take(queue, 2)
+        assert log == ["i", "c"] and queue.stats()["dropped_audio_flushed"] == 2
+
+    asyncio.run(main())
+
+
+def test_control_backpressure_waits_for_space():
+    async def main():
+        queue, log = MediaQueue("test", max_control=1), []
+        await queue.put_control(_send(log, "c1"))
+        blocked = asyncio.create_task(queue.put_control(_send(log, "c2")))
+        await asyncio.sleep(0.01)
+        assert not blocked.done() and queue.stats()["control_waits"] == 1
+        await _take(queue, 1)
+        await asyncio.wait_for(blocked, 1.0)
+        await _take(queue, 1)
+        assert log == ["c1", "c2"]
+
+    asyncio.run(main())
+
+
+def test_events_never_wait_and_drop_the_oldest():
+    async def main():
+        queue, log = MediaQueue("test", max_control=1, max_events=2), []
+        await queue.put_control(_send(log, "c"))
+        for i in range(4):
+            queue.put_event(_send(log, f"e{i}"))
+        assert queue.drop_audio() == 0 and queue.depth() == 3
+        assert await _take(queue, 3) == [CONTROL, EVENT, EVENT]
+        assert log == ["c", "e2", "e3"] and queue.stats()["dropped_events"] == 2
+
+    asyncio.run(main())
+
+
+def test_drain_survives_send_errors():
+    async def main():
+        queue, log = MediaQueue("test"), []
+
+        async def fail():
+            raise ConnectionError("gone")
+
+        queue.put_audio(lambda: fail())
+        queue.put_audio(_send(log, "a"))
+        task = asyncio.create_task(queue.drain())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        assert log == ["a"]
+        assert (queue.stats()["sent"], queue.stats()["send_errors"]) == (1, 1)
+
+    asyncio.run(main())
+
+
+def test_dead_entries_are_compacted_when_the_sender_stalls():
+    async def main():
+        queue = MediaQueue("test", max_audio=2, max_control=1, max_events=1)
+        for _ in range(100):
+            queue.put_audio(_send([], "a"))
+            queue.put_event(_send([], "e"))
+        assert len(queue._entries) <= 2 * (2 + 1 + 1) + 2
+        assert queue.depth() == 3
+
+    asyncio.run(main())
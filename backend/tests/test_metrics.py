@@ -0,0 +1,37 @@
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    counter = registry.register(Counter("c_total", "A counter", ("kind",)))
+    gauge = registry.register(Gauge("g", "A gauge"))
+    counter.inc("a")
+    counter.inc("a", value=2)
+    counter.inc('we"ird\n')
+    gauge.inc()
+    gauge.dec(value=3)
+    text = registry.render()
+    assert '# TYPE c_total counter' in text
+    assert 'c_total{kind="a"} 3' in text
+    assert 'c_total{kind="we\\"ird\\n"} 1' in text
+    assert "g -2" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram("h_seconds", "A histogram", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        hist.observe(value)
+    lines = hist.render()
+    assert 'h_seconds_bucket{le="0.1"} 2' in lines
+    assert 'h_seconds_bucket{le="1.0"} 3' in lines
+    assert 'h_seconds_bucket{le="+Inf"} 4' in lines
+    assert "h_seconds_count 4" in lines
+    assert hist.count() == 4
+
+
+def test_count_message():
+    before = metrics.messages.get("gemini_out", "audio")
+    metrics.count_message("gemini_out", "audio", 100)
+    assert metrics.messages.get("gemini_out", "audio") == before + 1
+    assert metrics.message_bytes.get("gemini_out", "audio") >= 100
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from moderation import (
+    BLOCKED_BLOCKLIST,
+    BLOCKED_DENIED,
+    DenyCache,
+    Moderator,
+    PatternMatcher,
+    load_blocklist,
+    match_key,
+    sanitize_for_model,
+)
+
+BLOCKLIST = ["ass", "hell", "kill", "bad word", "คำหยาบ"]
+
+
+def test_sanitize_strips_control_and_invisible_characters():
+    assert sanitize_for_model("a​b­‮c\x00d\ne") == "abc d e"
+    assert sanitize_for_model("x\ud800y") == "xy"
+    assert sanitize_for_model("a" * 10, max_len=4) == "aaaa…"
+
+
+def test_match_key_keeps_words_and_repeats():
+    assert match_key("  HeLLo,   World!! ") == "hello world"
+    assert match_key("B.A.D") == "b a d"
+    assert match_key("ｆｕｌｌ") == "full"
+
+
+@pytest.mark.parametrize("line", [
+    "I was in class",
+    "hello everyone",
+    "skills are great",
+    "passing the assessment",
+    "shell script",
+    "as you wish",
+    "helium balloon",
+    "badword",  # one word, not the two-word pattern
+])
+def test_benign_near_misses_pass(line):
+    assert Moderator(BLOCKLIST).check(line) is None
+
+
+@pytest.mark.parametrize("line", [
+    "what the hell",
+    "HELL yeah",
+    "kill it!",
+    "you ass.",
+    "such a bad   word",
+    "bad-word",
+    "นี่มันคำหยาบนะ",  # Thai has no spaces between words
+])
+def test_blocklisted_words_are_blocked(line):
+    assert Moderator(BLOCKLIST).check(line) == BLOCKED_BLOCKLIST
+
+
+def test_matcher_agrees_with_naive_whole_word_search():
+    patterns = ["he", "she", "his", "hers", "s h", "e"]
+    matcher = PatternMatcher(patterns)
+    texts = ["ushers", "she sells", "his hers", "e", "s he", "xhe ehis", "a s h b", "", "hershe he"]
+    for text in texts:
+        padded = f" {text} "
+        expected = {p for p in patterns if f" {p} " in padded}
+        found = matcher.search(text)
+        assert (found is not None) == bool(expected), text
+        if found is not None:
+            assert found in expected
+
+
+def test_deny_cache_strikes_and_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = DenyCache(ttl=10, size=2)
+    cache.add("a", 0.5)
+    assert not cache.denied("a")
+    cache.add("a", 0.5)
+    assert cache.denied("a")
+    now[0] += 11
+    assert not cache.denied("a") and len(cache) == 0
+    # Expired strikes don't add up with new ones
+    cache.add("b", 0.5)
+    now[0] += 11
+    cache.add("b", 0.5)
+    assert not cache.denied("b")
+    # Oldest entries go first past ``size``
+    cache.add("c")
+    cache.add("d")
+    assert len(cache) == 2 and not cache.denied("b") and cache.denied("d")
+
+
+def test_learn_single_line_and_digest():
+    moderator = Moderator()
+    moderator.learn(["first", "second"])
+    assert moderator.check("first") is None  # half a strike
+    moderator.learn(["alone"])
+    assert moderator.check("ALONE!!") == BLOCKED_DENIED
+    moderator.learn(["first", "third"])
+    assert moderator.check("first") == BLOCKED_DENIED
+
+
+def test_learn_ignores_server_prompts():
+    # A 1007 after a proactive prompt (no chat lines) must not deny anything
+    moderator = Moderator()
+    moderator.learn([])
+    assert moderator.learned == 0 and len(moderator.deny) == 0
+
+
+def test_disabled_moderator_passes_everything():
+    moderator = Moderator(BLOCKLIST, enabled=False)
+    moderator.learn(["kill"])
+    assert moderator.check("kill") is None
+
+
+def test_load_blocklist(tmp_path):
+    path = tmp_path / "blocklist.txt"
+    path.write_text("# comment\nbad\n\n  worse  \n", encoding="utf-8")
+    assert load_blocklist(str(path)) == ["bad", "worse"]
+    assert load_blocklist("") == []
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from session_capture import (
+    MAGIC,
+    SOURCE_CLIENT_BINARY,
+    SOURCE_CLIENT_TEXT,
+    SOURCE_GEMINI,
+    SessionRecorder,
+    open_recorder,
+    read_capture,
+)
+
+
+def test_records_round_trip_in_order(tmp_path):
+    path = str(tmp_path / "s.evacap")
+
+    async def main():
+        recorder = SessionRecorder(path, flush_interval=0.01)
+        recorder.record(SOURCE_CLIENT_TEXT, '{"type":"config","note":"é"}')
+        recorder.record(SOURCE_CLIENT_BINARY, memoryview(b"\x01\x01\x00\x00pcm"))
+        await asyncio.sleep(0.03)  # first batch on disk
+        recorder.record(SOURCE_GEMINI, b'{"setupComplete":{}}')
+        await recorder.close()
+        recorder.record(SOURCE_GEMINI, b"after close")  # ignored
+        return recorder.stats()
+
+    stats = asyncio.run(main())
+    records = list(read_capture(path))
+    assert [(r.source, r.payload) for r in records] == [
+        (SOURCE_CLIENT_TEXT, '{"type":"config","note":"é"}'.encode()),
+        (SOURCE_CLIENT_BINARY, b"\x01\x01\x00\x00pcm"),
+        (SOURCE_GEMINI, b'{"setupComplete":{}}'),
+    ]
+    assert records[0].t <= records[1].t < records[2].t
+    assert stats["records"] == 3 and stats["batches"] >= 2
+    assert stats["bytes_written"] == (tmp_path / "s.evacap").stat().st_size
+
+
+def test_large_batches_flush_before_the_interval(tmp_path):
+    path = str(tmp_path / "s.evacap")
+
+    async def main():
+        recorder = SessionRecorder(path, flush_interval=60.0, max_batch_bytes=1024)
+        recorder.record(SOURCE_CLIENT_BINARY, b"x" * 2048)
+        await asyncio.sleep(0.05)
+        written = recorder.stats()["bytes_written"]
+        await recorder.close()
+        return written
+
+    assert asyncio.run(main()) > 2048
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / "s.evacap"
+
+    async def main():
+        recorder = SessionRecorder(str(path), flush_interval=0.01)
+        recorder.record(SOURCE_GEMINI, b"one")
+        recorder.record(SOURCE_GEMINI, b"two")
+        await recorder.close()
+
+    asyncio.run(main())
+    path.write_bytes(path.read_bytes()[:-2])
+    assert [r.payload for r in read_capture(str(path))] == [b"one"]
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"NOTACAP\n")
+    with pytest.raises(ValueError):
+        list(read_capture(str(path)))
+
+
+def test_open_recorder_sanitizes_the_client_id(tmp_path):
+    async def main():
+        recorder = open_recorder(str(tmp_path), "../evil id")
+        await recorder.close()
+        return recorder.path
+
+    path = asyncio.run(main())
+    assert path.startswith(str(tmp_path)) and "/../" not in path
+    with open(path, "rb") as f:
+        assert f.read() == MAGIC
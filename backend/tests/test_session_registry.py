@@ -0,0 +1,139 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from session_registry import Broker, BrokerRegistry, SessionRegistry, parse_address
+from yt_chat_hub import ChatHub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Chat:
+    def is_alive(self):
+        return False
+
+
+def _hub() -> ChatHub:
+    return ChatHub(lambda **_kw: _Chat(), poll_interval=0.01)
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.02)
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/x.sock") == ("unix", "/tmp/x.sock")
+    assert parse_address("tcp::9000") == ("tcp", ("127.0.0.1", 9000))
+    assert parse_address("tcp:10.0.0.1:9000") == ("tcp", ("10.0.0.1", 9000))
+
+
+def test_local_registry_cap_and_takeover():
+    async def main():
+        registry = SessionRegistry(_hub(), max_sessions=1)
+        evicted = []
+
+        async def on_evict():
+            evicted.append(True)
+
+        first = await registry.register("a", "s1", on_evict)
+        assert first is not None
+        assert await registry.register("b", "s2") is None
+        # The same client_id supersedes the old session
+        second = await registry.register("a", "s3")
+        await asyncio.sleep(0)
+        assert second != first and registry.get("a") == "s3" and evicted
+        await registry.unregister("a", first)  # stale token: no-op
+        assert registry.get("a") == "s3"
+        await registry.unregister("a", second)
+        assert registry.local_count() == 0
+
+    asyncio.run(main())
+
+
+def test_broker_cap_across_workers_and_eviction(tmp_path):
+    async def main():
+        address = f"unix:{tmp_path}/reg.sock"
+        w1 = BrokerRegistry(_hub(), address, max_sessions=2, worker_id="w1")
+        w2 = BrokerRegistry(_hub(), address, max_sessions=2, worker_id="w2")
+        await w1.start()
+        await w2.start()
+        try:
+            assert w1.stats()["broker"] and not w2.stats()["broker"]
+            evicted = asyncio.Event()
+
+            async def on_evict():
+                evicted.set()
+
+            assert await w1.register("a", "s1", on_evict)
+            assert await w2.register("b", "s2")
+            assert await w2.register("c", "s3") is None  # host cap counts both workers
+            # Reconnect on the other worker: the old owner is told to evict
+            assert await w2.register("a", "s4")
+            await asyncio.wait_for(evicted.wait(), 2)
+            assert w1.get("a") is None
+        finally:
+            await w2.stop()
+            await w1.stop()
+
+    asyncio.run(main())
+
+
+def test_broker_death_falls_back_and_recovers(tmp_path):
+    async def main():
+        address = f"unix:{tmp_path}/reg.sock"
+        broker = subprocess.Popen(
+            [sys.executable, "-m", "session_registry", "--address", address],
+            cwd=BACKEND_DIR, stdout=subprocess.PIPE,
+        )
+        try:
+            broker.stdout.readline()  # listening
+            w1 = BrokerRegistry(_hub(), address, worker_id="w1", register_timeout=0.5)
+            w2 = BrokerRegistry(_hub(), address, worker_id="w2", register_timeout=0.5)
+            await w1.start()
+            await w2.start()
+            token = await w1.register("a", "s1")
+            assert token and w1.connected
+
+            broker.kill()
+            broker.wait()
+            await _wait_for(lambda: not w1.connected or w1.reconnects)
+
+            # Never hangs on the dead broker
+            started = time.monotonic()
+            assert await asyncio.wait_for(w2.register("b", "s2"), 1.0)
+            assert time.monotonic() - started < 0.6
+
+            # One survivor takes the broker over, both reconnect and re-claim
+            await _wait_for(lambda: w1.connected and w2.connected and w1.reconnects and w2.reconnects)
+            assert w1.stats()["broker"] != w2.stats()["broker"]
+            assert await w2.register("a", "s3")  # takeover routed to w1 again
+            await _wait_for(lambda: w1.get("a") is None)
+            await w1.stop()
+            await w2.stop()
+        finally:
+            broker.kill()
+            broker.wait()
+
+    asyncio.run(main())
+
+
+def test_claim_keeps_newer_owner():
+    async def main():
+        broker = Broker()
+        sent = []
+
+        class _Writer:
+            def write(self, data):
+                sent.append(data)
+
+        broker._owners["a"] = ("w2", "new")
+        broker._claim("w1", _Writer(), {"id": "a", "token": "old"})  # type: ignore[arg-type]
+        assert broker._owners["a"] == ("w2", "new")
+        assert b'"evict"' in sent[0] and b'"old"' in sent[0]
+
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+import session_state
+from session_state import Session
+
+
+class _Closable:
+    def __init__(self, fail=False):
+        self.closed = 0
+        self.fail = fail
+
+    def close(self):
+        self.closed += 1
+        if self.fail:
+            raise RuntimeError("already gone")
+
+
+class _Timer:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _Link:
+    def __init__(self):
+        self.closed = 0
+
+    async def close(self):
+        self.closed += 1
+
+
+def test_slots_reject_unknown_fields():
+    session = Session("c1")
+    assert not hasattr(session, "__dict__")
+    with pytest.raises(AttributeError):
+        session.last_imgae = 1.0  # typo
+
+
+def test_server_text_is_taken_once_within_the_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(session_state.time, "monotonic", lambda: now[0])
+    session = Session("c1")
+    session.sent_server_text("[YouTube] a: hi", ["hi"])
+    now[0] += 1.0
+    assert session.take_server_text(within=2.0) == ("[YouTube] a: hi", ["hi"])
+    assert session.take_server_text(within=2.0) is None
+
+    session.sent_server_text("proactive", ())
+    now[0] += 3.0
+    assert session.take_server_text(within=2.0) is None
+
+
+def test_rearming_cancels_the_previous_timer():
+    session = Session("c1")
+    first, second = _Timer(), _Timer()
+    session.rearm_idle(first)
+    session.rearm_idle(second)
+    assert first.cancelled and not second.cancelled
+    session.rearm_proactive(first)
+    session.rearm_proactive(None)
+    assert session.proactive_timer is None
+
+
+def test_close_releases_everything_once():
+    async def main():
+        session = Session("c1")
+        idle, proactive = _Timer(), _Timer()
+        session.rearm_idle(idle)
+        session.rearm_proactive(proactive)
+        session.digest = _Closable()
+        session.yt = _Closable(fail=True)  # a failing subscription doesn't stop the rest
+        session.link = _Link()
+        task = session.track(asyncio.create_task(asyncio.sleep(10)))
+        done = session.track(asyncio.create_task(asyncio.sleep(0)))
+        await done
+        assert session.tasks == {task}
+
+        await session.close()
+        await session.close()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)  # done callbacks
+        assert idle.cancelled and proactive.cancelled
+        assert session.digest.closed == 1 and session.yt is None
+        assert task.cancelled() and session.link.closed == 1
+        assert session.stats()["tasks"] == 0
+
+    asyncio.run(main())
+
+
+def test_subscribe_yt_replaces_the_old_subscription():
+    session = Session("c1")
+    old, new = _Closable(), _Closable()
+    session.subscribe_yt(old)
+    session.subscribe_yt(new)
+    assert old.closed == 1 and session.yt is new and session.stats()["yt_chat"]
@@ -0,0 +1,88 @@
+import asyncio
+
+from timer_wheel import TimerWheel
+
+
+def test_timers_never_fire_early_and_fire_in_deadline_order():
+    async def main():
+        loop = asyncio.get_running_loop()
+        wheel = TimerWheel(tick=0.01)
+        start = loop.time()
+        fired = []
+        for delay in (0.05, 0.0, 0.025):
+            wheel.schedule(delay, lambda d=delay: fired.append((d, loop.time() - start)))
+        await asyncio.sleep(0.12)
+        assert [d for d, _ in fired] == [0.0, 0.025, 0.05]
+        assert all(elapsed >= d for d, elapsed in fired)
+        assert wheel.stats()["fired"] == 3
+
+    asyncio.run(main())
+
+
+def test_cancel_and_sleep_when_empty():
+    async def main():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        timer = wheel.schedule(0.02, fired.append, "cancelled")
+        assert timer.active
+        timer.cancel()
+        timer.cancel()  # idempotent
+        assert not timer.active and wheel.stats()["pending"] == 0
+        assert wheel._handle is None  # nothing pending: no wakeups at all
+        await asyncio.sleep(0.05)
+        assert fired == [] and wheel.stats()["wakeups"] == 0
+
+    asyncio.run(main())
+
+
+def test_deadlines_past_one_rotation_wait_for_their_turn():
+    async def main():
+        wheel = TimerWheel(tick=0.01, slots=4)
+        fired = []
+        wheel.schedule(0.015, fired.append, "near")
+        wheel.schedule(0.065, fired.append, "far")  # same slot as "near", two rotations later
+        await asyncio.sleep(0.035)
+        assert fired == ["near"]
+        await asyncio.sleep(0.06)
+        assert fired == ["near", "far"]
+
+    asyncio.run(main())
+
+
+def test_callbacks_can_reschedule_and_cancel_and_errors_are_isolated():
+    async def main():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+
+        def boom():
+            raise RuntimeError("boom")
+
+        def rearm():
+            fired.append("first")
+            wheel.schedule(0.01, fired.append, "rearmed")
+            doomed.cancel()
+
+        wheel.schedule(0.01, boom)
+        wheel.schedule(0.01, rearm)
+        doomed = wheel.schedule(0.03, fired.append, "doomed")
+        await asyncio.sleep(0.06)
+        assert fired == ["first", "rearmed"]
+        assert wheel.stats()["pending"] == 0
+
+    asyncio.run(main())
+
+
+def test_wheel_realigns_after_sleeping():
+    async def main():
+        wheel = TimerWheel(tick=0.01)
+        fired = []
+        wheel.schedule(0.01, fired.append, 1)
+        await asyncio.sleep(0.05)
+        wakeups = wheel.stats()["wakeups"]
+        await asyncio.sleep(0.05)
+        assert wheel.stats()["wakeups"] == wakeups  # asleep while empty
+        wheel.schedule(0.01, fired.append, 2)
+        await asyncio.sleep(0.04)
+        assert fired == [1, 2]
+
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+import numpy as np
+
+import vad
+from vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
+
+RATE = 16000
+CHUNK = 512  # 32 ms
+
+
+def _pcm(samples) -> bytes:
+    return np.asarray(samples).astype("<i2").tobytes()
+
+
+def silence() -> bytes:
+    return _pcm(np.zeros(CHUNK))
+
+
+def voice(amplitude=8000.0) -> bytes:
+    t = np.arange(CHUNK) / RATE
+    return _pcm(amplitude * np.sin(2 * np.pi * 180.0 * t))
+
+
+def hiss(amplitude, seed=0) -> bytes:
+    # Alternating signs: maximal zero-crossing rate, like fan noise
+    rng = np.random.default_rng(seed)
+    return _pcm(amplitude * rng.uniform(0.5, 1.0, CHUNK) * np.where(np.arange(CHUNK) % 2, 1, -1))
+
+
+def _detector(monkeypatch, **kwargs):
+    now = [100.0]
+    monkeypatch.setattr(vad.time, "monotonic", lambda: now[0])
+    kwargs.setdefault("keepalive_ms", 0)
+    return VoiceActivityDetector(RATE, **kwargs), now
+
+
+def test_silence_is_suppressed(monkeypatch):
+    detector, _ = _detector(monkeypatch)
+    for _ in range(10):
+        assert detector.process(silence()) == ([], None)
+    stats = detector.stats()
+    assert (stats["chunks_suppressed"], stats["bytes_suppressed"], stats["chunks_forwarded"]) == (10, 10 * CHUNK * 2, 0)
+
+
+def test_onset_sends_preroll_then_speech(monkeypatch):
+    detector, _ = _detector(monkeypatch, preroll_ms=64.0)
+    quiet = [_pcm(np.full(CHUNK, i)) for i in range(5)]
+    for chunk in quiet:
+        detector.process(chunk)
+    loud = voice()
+    out, event = detector.process(loud)
+    assert event == SPEECH_START and detector.speaking
+    assert out == quiet[-2:] + [loud]  # 64 ms of pre-roll
+    assert detector.stats()["chunks_suppressed"] == 3
+
+
+def test_hangover_then_speech_end(monkeypatch):
+    detector, _ = _detector(monkeypatch, hangover_ms=96.0)
+    detector.process(voice())
+    events = [detector.process(silence()) for _ in range(4)]
+    assert [len(out) for out, _ in events] == [1, 1, 1, 0]
+    assert [event for _, event in events] == [None, None, SPEECH_END, None]
+    assert not detector.speaking
+
+
+def test_keepalive_forwards_one_silent_chunk_per_interval(monkeypatch):
+    detector, now = _detector(monkeypatch, keepalive_ms=1000.0)
+    forwarded = []
+    for _ in range(40):  # 1.28 s of silence
+        out, _ = detector.process(silence())
+        forwarded.append(len(out))
+        now[0] += 0.032
+    assert sum(forwarded) == 2 and forwarded[0] == 1
+
+
+def test_quiet_hiss_is_not_speech_but_loud_noise_is(monkeypatch):
+    detector, _ = _detector(monkeypatch, threshold_db=-50.0, margin_db=10.0)
+    # About -40 dBFS: over the threshold, but unvoiced
+    assert detector.process(hiss(400))[1] is None
+    # About -10 dBFS: loud enough to count whatever it sounds like
+    assert detector.process(hiss(12000))[1] == SPEECH_START
+
+
+def test_noise_floor_follows_the_room(monkeypatch):
+    detector, _ = _detector(monkeypatch)
+    start = detector.noise_floor_db
+    for seed in range(50):
+        detector.process(hiss(300, seed))
+    assert detector.noise_floor_db > start
+
+
+def test_short_and_odd_chunks(monkeypatch):
+    detector, _ = _detector(monkeypatch)
+    assert detector.process(b"") == ([], None)
+    assert detector.process(voice()[:100])[1] == SPEECH_START
@@ -0,0 +1,66 @@
+import base64
+import json
+
+import pytest
+
+from wire_protocol import (
+    FLAG_MULAW,
+    HEADER_SIZE,
+    KIND_AUDIO,
+    KIND_IMAGE,
+    PROTOCOL_BINARY,
+    PROTOCOL_JSON,
+    FrameError,
+    decode_frame,
+    encode_frame,
+    kind_name,
+    media_message,
+    negotiate_protocol,
+)
+
+
+def test_header_layout():
+    frame = encode_frame(KIND_AUDIO, b"\x01\x02", FLAG_MULAW)
+    assert frame == b"\x01\x01\x00\x01\x01\x02"
+    assert HEADER_SIZE == 4
+
+
+@pytest.mark.parametrize("kind", [KIND_AUDIO, KIND_IMAGE])
+def test_round_trip_without_copying(kind):
+    payload = bytes(range(256)) * 4
+    decoded_kind, flags, view = decode_frame(encode_frame(kind, payload))
+    assert (decoded_kind, flags) == (kind, 0)
+    assert isinstance(view, memoryview) and bytes(view) == payload
+
+
+@pytest.mark.parametrize("frame, error", [
+    (b"\x01\x01\x00", "too short"),
+    (b"\x02\x01\x00\x00", "version"),
+    (b"\x01\x07\x00\x00", "kind"),
+])
+def test_bad_frames(frame, error):
+    with pytest.raises(FrameError, match=error):
+        decode_frame(frame)
+
+
+def test_empty_payload_is_valid():
+    assert decode_frame(encode_frame(KIND_IMAGE, b""))[2].nbytes == 0
+
+
+def test_negotiate_protocol():
+    assert negotiate_protocol({"type": "config", "protocol": "binary"}) == PROTOCOL_BINARY
+    assert negotiate_protocol({"type": "config", "config": {"protocol": "binary"}}) == PROTOCOL_BINARY
+    assert negotiate_protocol({"type": "config"}) == PROTOCOL_JSON
+    assert negotiate_protocol({"type": "config", "protocol": "msgpack"}) == PROTOCOL_JSON
+    assert negotiate_protocol({"type": "config", "config": "binary"}) == PROTOCOL_JSON
+
+
+def test_media_message_matches_json_dumps():
+    b64 = base64.b64encode(b"\xff\xd8\xff" * 10).decode("ascii")
+    assert json.loads(media_message(b64, "image/jpeg")) == {
+        "realtime_input": {"media_chunks": [{"data": b64, "mime_type": "image/jpeg"}]}
+    }
+
+
+def test_kind_name():
+    assert (kind_name(KIND_AUDIO), kind_name(KIND_IMAGE), kind_name(9)) == ("audio", "image", None)
@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+from yt_chat_hub import ChatHub
+
+
+def _line(user, msg):
+    return SimpleNamespace(author=SimpleNamespace(name=user), message=msg)
+
+
+class _AsyncChat:
+    created = []
+
+    def __init__(self, video_id, interruptable=True):
+        self.video_id = video_id
+        self.batches = asyncio.Queue()
+        self.alive = True
+        _AsyncChat.created.append(self)
+
+    def is_alive(self):
+        return self.alive
+
+    async def get(self):
+        if not self.alive:
+            return []
+        return SimpleNamespace(items=await self.batches.get())
+
+    def terminate(self):
+        self.alive = False
+        self.batches.put_nowait([])
+
+
+class _SyncChat:
+    def __init__(self, lines):
+        self.lines = list(lines)
+
+    def is_alive(self):
+        return True
+
+    def get(self):
+        lines, self.lines = self.lines, []
+        return SimpleNamespace(sync_items=lambda: lines)
+
+    def terminate(self):
+        pass
+
+
+def test_one_async_watcher_fans_out_without_threads():
+    async def main():
+        _AsyncChat.created = []
+        hub = ChatHub(_AsyncChat)
+        got_a, got_b = [], []
+        sub_a = hub.subscribe("v1", lambda user, msg: got_a.append((user, msg)))
+        sub_b = hub.subscribe("v1", lambda user, msg: got_b.append((user, msg)))
+        await asyncio.sleep(0)
+        assert len(_AsyncChat.created) == 1
+        chat = _AsyncChat.created[0]
+        chat.batches.put_nowait([_line("u1", "hi"), _line("u2", "yo")])
+        await asyncio.sleep(0.01)
+        assert got_a == got_b == [("u1", "hi"), ("u2", "yo")]
+        assert hub.stats() == {"v1": {"subscribers": 2, "messages": 2}}
+
+        sub_a.close()
+        sub_a.close()  # idempotent
+        assert "v1" in hub.stats()
+        sub_b.close()
+        await asyncio.sleep(0.01)
+        assert hub.stats() == {} and not chat.alive
+
+    asyncio.run(main())
+
+
+def test_ended_chat_is_restarted_by_next_subscribe():
+    async def main():
+        _AsyncChat.created = []
+        hub = ChatHub(_AsyncChat)
+        hub.subscribe("v1", lambda user, msg: None)
+        await asyncio.sleep(0)
+        _AsyncChat.created[0].terminate()  # stream over
+        await asyncio.sleep(0.01)
+        assert hub.stats() == {}
+        hub.subscribe("v1", lambda user, msg: None)
+        await asyncio.sleep(0)
+        assert len(_AsyncChat.created) == 2
+
+    asyncio.run(main())
+
+
+def test_blocking_chats_run_in_executor():
+    async def main():
+        hub = ChatHub(lambda video_id, interruptable: _SyncChat([_line("u", "m")]), poll_interval=0.01, blocking=True)
+        got = []
+        sub = hub.subscribe("v1", lambda user, msg: got.append(msg))
+        for _ in range(100):
+            if got:
+                break
+            await asyncio.sleep(0.01)
+        assert got == ["m"]
+        sub.close()
+
+    asyncio.run(main())
+
+
+def test_subscriber_errors_are_isolated():
+    async def main():
+        _AsyncChat.created = []
+        hub = ChatHub(_AsyncChat)
+        got = []
+
+        def broken(user, msg):
+            raise RuntimeError("boom")
+
+        hub.subscribe("v1", broken)
+        hub.subscribe("v1", lambda user, msg: got.append(msg))
+        await asyncio.sleep(0)
+        _AsyncChat.created[0].batches.put_nowait([_line("u", "ok")])
+        await asyncio.sleep(0.01)
+        assert got == ["ok"]
+
+    asyncio.run(main())
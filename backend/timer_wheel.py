@@ -0,0 +1,116 @@
+"""Process-wide hashed timer wheel for per-session deadlines.
+
+Sessions used to poll their own state every second or two. Instead they
+now register deadlines here (idle threshold, proactive cooldown, ...) and
+re-arm them when something happens. The wheel wakes once per ``tick`` while
+any timer is pending, whatever the number of sessions, and sleeps
+completely when nothing is scheduled.
+
+``schedule`` and ``Timer.cancel`` are O(1). Deadlines are rounded up to
+the next tick, so a timer never fires early and fires at most ``tick``
+late (plus event-loop lag).
+"""
+
+import asyncio
+import logging
+import math
+from typing import Any, Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ("target", "callback", "args", "_wheel")
+
+    def __init__(self, wheel: "TimerWheel", target: int, callback: Callable[..., Any], args: tuple):
+        self.target = target
+        self.callback = callback
+        self.args = args
+        self._wheel: Optional[TimerWheel] = wheel
+
+    @property
+    def active(self) -> bool:
+        return self._wheel is not None
+
+    def cancel(self):
+        if self._wheel is not None:
+            self._wheel._remove(self)
+            self._wheel = None
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 0.25, slots: int = 256):
+        self.tick = tick
+        self._slots: List[Set[Timer]] = [set() for _ in range(slots)]
+        self._origin = 0.0
+        self._cursor = 0
+        self._pending = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ticking = False
+
+        self.wakeups = 0
+        self.fired = 0
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args: Any) -> Timer:
+        """Run ``callback(*args)`` on the loop after ``delay`` seconds."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        asleep = self._handle is None and not self._ticking
+        if asleep:
+            # Wheel was asleep: realign it with the clock
+            self._loop = loop
+            self._origin = now
+            self._cursor = 0
+        target = math.ceil((now + max(0.0, delay) - self._origin) / self.tick - 1e-9)
+        timer = Timer(self, max(target, self._cursor + 1), callback, args)
+        self._slots[timer.target % len(self._slots)].add(timer)
+        self._pending += 1
+        if asleep:
+            self._arm()
+        return timer
+
+    def stats(self) -> dict:
+        return {"pending": self._pending, "wakeups": self.wakeups, "fired": self.fired, "tick": self.tick}
+
+    def _remove(self, timer: Timer):
+        slot = self._slots[timer.target % len(self._slots)]
+        if timer in slot:
+            slot.discard(timer)
+            self._pending -= 1
+            if self._pending == 0 and self._handle is not None:
+                self._handle.cancel()
+                self._handle = None
+
+    def _arm(self):
+        when = self._origin + (self._cursor + 1) * self.tick
+        self._handle = self._loop.call_at(when, self._on_tick)  # type: ignore[union-attr]
+
+    def _on_tick(self):
+        self._handle = None
+        self._ticking = True
+        self.wakeups += 1
+        # The loop may run us a hair early; the tick we armed for is due regardless
+        now_tick = max(self._cursor + 1, int((self._loop.time() - self._origin) / self.tick))  # type: ignore[union-attr]
+        # Catch up on every tick we slept through (loop lag)
+        while self._cursor < now_tick and self._pending:
+            self._cursor += 1
+            slot = self._slots[self._cursor % len(self._slots)]
+            if not slot:
+                continue
+            due = [t for t in slot if t.target <= self._cursor]
+            for timer in due:
+                if timer._wheel is None:
+                    continue  # cancelled by an earlier callback this tick
+                slot.discard(timer)
+                self._pending -= 1
+                timer._wheel = None
+                self.fired += 1
+                try:
+                    timer.callback(*timer.args)
+                except Exception as e:
+                    logger.error(f"Timer callback error: {e}")
+        self._cursor = max(self._cursor, now_tick)
+        self._ticking = False
+        if self._pending:
+            self._arm()
@@ -0,0 +1,148 @@
+"""Server-side voice activity detection for upstream mic audio.
+
+Most mic audio a session streams is silence. ``VoiceActivityDetector``
+classifies each 16 kHz PCM16 chunk with vectorised NumPy features computed
+over short frames (RMS energy in dBFS against an adaptive noise floor, and
+zero-crossing rate) and decides what to forward:
+
+* speech chunks, plus ``hangover_ms`` of audio after speech stops so word
+  endings are not cut;
+* on speech onset, the last ``preroll_ms`` of audio before it, so the first
+  syllable is not clipped;
+* during silence, one chunk every ``keepalive_ms`` (0 drops silence
+  entirely) so Gemini still hears the pause.
+
+``process`` also reports speech start/end, which the backend uses as user
+activity instead of relying only on the client's ``user_activity``.
+"""
+
+import collections
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SPEECH_START = "start"
+SPEECH_END = "end"
+
+_FULL_SCALE_POWER = 32768.0 ** 2
+
+
+class VoiceActivityDetector:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: float = 16.0,
+        threshold_db: float = -50.0,
+        margin_db: float = 10.0,
+        zcr_max: float = 0.35,
+        hangover_ms: float = 300.0,
+        preroll_ms: float = 200.0,
+        keepalive_ms: float = 1000.0,
+    ):
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.zcr_max = zcr_max
+        self.hangover_ms = hangover_ms
+        self.keepalive_ms = keepalive_ms
+        self._bytes_per_ms = sample_rate * 2 / 1000.0
+        self._preroll_bytes = int(preroll_ms * self._bytes_per_ms)
+
+        self.noise_floor_db = threshold_db - margin_db
+        self.speaking = False
+        self._hang_left_ms = 0.0
+        self._preroll: Deque[bytes] = collections.deque()
+        self._preroll_size = 0
+        self._last_keepalive = 0.0
+
+        # Counters (see stats())
+        self.chunks_in = 0
+        self.chunks_speech = 0
+        self.chunks_forwarded = 0
+        self.chunks_suppressed = 0
+        self.bytes_suppressed = 0
+        self.onsets = 0
+
+    def process(self, pcm: bytes) -> Tuple[List[bytes], Optional[str]]:
+        """Classify one chunk; returns (chunks to forward, SPEECH_START/SPEECH_END/None)."""
+        self.chunks_in += 1
+        chunk_ms = len(pcm) / self._bytes_per_ms
+        is_speech = self._is_speech(pcm)
+        event = None
+        out: List[bytes] = []
+
+        if is_speech:
+            self.chunks_speech += 1
+            self._hang_left_ms = self.hangover_ms
+            if not self.speaking:
+                self.speaking = True
+                self.onsets += 1
+                event = SPEECH_START
+                # Pre-roll goes out after all, so it no longer counts as suppressed
+                out.extend(self._preroll)
+                self.chunks_suppressed -= len(self._preroll)
+                self.bytes_suppressed -= self._preroll_size
+                self._preroll.clear()
+                self._preroll_size = 0
+            out.append(pcm)
+        elif self.speaking:
+            self._hang_left_ms -= chunk_ms
+            out.append(pcm)
+            if self._hang_left_ms <= 0:
+                self.speaking = False
+                event = SPEECH_END
+        else:
+            now = time.monotonic()
+            if self.keepalive_ms > 0 and (now - self._last_keepalive) * 1000.0 >= self.keepalive_ms:
+                self._last_keepalive = now
+                out.append(pcm)
+            else:
+                self._remember(bytes(pcm))
+                self.chunks_suppressed += 1
+                self.bytes_suppressed += len(pcm)
+
+        self.chunks_forwarded += len(out)
+        return out, event
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "speaking": self.speaking,
+            "noise_floor_db": round(self.noise_floor_db, 1),
+            "chunks_in": self.chunks_in,
+            "chunks_speech": self.chunks_speech,
+            "chunks_forwarded": self.chunks_forwarded,
+            "chunks_suppressed": self.chunks_suppressed,
+            "bytes_suppressed": self.bytes_suppressed,
+            "onsets": self.onsets,
+        }
+
+    def _is_speech(self, pcm: bytes) -> bool:
+        samples = np.frombuffer(pcm, dtype="<i2")
+        n = (len(samples) // self.frame_len) * self.frame_len
+        if n == 0:
+            frames = samples.astype(np.float32)[np.newaxis, :]
+        else:
+            frames = samples[:n].astype(np.float32).reshape(-1, self.frame_len)
+        if frames.shape[1] == 0:
+            return False
+
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) / _FULL_SCALE_POWER + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1) if frames.shape[1] > 1 else np.zeros(len(frames))
+
+        threshold = max(self.threshold_db, self.noise_floor_db + self.margin_db)
+        # Loud frames count regardless of ZCR; quieter ones must look voiced (low ZCR)
+        voiced = (energy_db > threshold) & ((zcr < self.zcr_max) | (energy_db > threshold + self.margin_db))
+        speech = bool(voiced.any())
+
+        if not speech:
+            # Track the background level so the threshold follows the room
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * float(np.median(energy_db))
+        return speech
+
+    def _remember(self, pcm: bytes):
+        self._preroll.append(pcm)
+        self._preroll_size += len(pcm)
+        while self._preroll and self._preroll_size - len(self._preroll[0]) >= self._preroll_bytes:
+            self._preroll_size -= len(self._preroll.popleft())
@@ -0,0 +1,101 @@
+"""Binary WebSocket frame protocol between the browser and the backend.
+
+Every binary frame is a fixed 4-byte header followed by the raw payload:
+
+    byte 0     protocol version (currently 1)
+    byte 1     frame kind (KIND_AUDIO / KIND_IMAGE)
+    bytes 2-3  flags, big-endian uint16 (FLAG_MULAW, otherwise 0)
+
+Audio payloads are raw little-endian PCM16 (16 kHz upstream, 24 kHz
+downstream; G.711 μ-law with FLAG_MULAW when that downstream encoding was
+negotiated, see audio_codec.py), image payloads are raw JPEG bytes. Control messages (config,
+text, ping, yt_chat_*, ...) stay on JSON text frames.
+
+The protocol is opt-in: the client asks for it in the initial config
+message (``{"type": "config", "protocol": "binary", ...}``) and the server
+acknowledges with ``{"type": "protocol", "data": "binary"}``. Clients that
+never ask keep the original base64-in-JSON path.
+"""
+
+import struct
+from typing import Optional, Tuple
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+SUPPORTED_PROTOCOLS = (PROTOCOL_JSON, PROTOCOL_BINARY)
+
+VERSION = 1
+
+KIND_AUDIO = 0x01
+KIND_IMAGE = 0x02
+
+# Audio payload is G.711 μ-law instead of PCM16
+FLAG_MULAW = 0x0001
+
+_HEADER = struct.Struct("!BBH")
+HEADER_SIZE = _HEADER.size
+
+
+class FrameError(ValueError):
+    """Raised when a binary frame cannot be parsed."""
+
+
+def negotiate_protocol(config_message: dict) -> str:
+    """Pick the wire protocol requested in the initial config message.
+
+    The field is accepted either at the top level of the message or inside
+    the nested ``config`` object; anything unknown falls back to JSON.
+    """
+    requested = config_message.get("protocol")
+    if requested is None:
+        nested = config_message.get("config")
+        if isinstance(nested, dict):
+            requested = nested.get("protocol")
+    if requested in SUPPORTED_PROTOCOLS:
+        return requested  # type: ignore[return-value]
+    return PROTOCOL_JSON
+
+
+def encode_frame(kind: int, payload: bytes, flags: int = 0) -> bytes:
+    """Prefix ``payload`` with a binary frame header."""
+    return _HEADER.pack(VERSION, kind, flags) + payload
+
+
+def decode_frame(frame: bytes) -> Tuple[int, int, memoryview]:
+    """Split a binary frame into ``(kind, flags, payload)``.
+
+    The payload is returned as a memoryview so large frames are not copied.
+    """
+    if len(frame) < HEADER_SIZE:
+        raise FrameError(f"frame too short ({len(frame)} bytes)")
+    version, kind, flags = _HEADER.unpack_from(frame)
+    if version != VERSION:
+        raise FrameError(f"unsupported frame version {version}")
+    if kind not in (KIND_AUDIO, KIND_IMAGE):
+        raise FrameError(f"unknown frame kind {kind}")
+    return kind, flags, memoryview(frame)[HEADER_SIZE:]
+
+
+def media_message(b64_data: str, mime_type: str) -> str:
+    """Build a Gemini ``realtime_input`` message for an already base64 payload.
+
+    Base64 is plain ASCII with no characters that need JSON escaping, so the
+    message is assembled directly instead of going through ``json.dumps``.
+    Only use this for data the backend encoded itself.
+    """
+    return (
+        '{"realtime_input":{"media_chunks":[{"data":"'
+        + b64_data
+        + '","mime_type":"'
+        + mime_type
+        + '"}]}}'
+    )
+
+
+def kind_name(kind: int) -> Optional[str]:
+    """Map a frame kind to the JSON message type it replaces."""
+    if kind == KIND_AUDIO:
+        return "audio"
+    if kind == KIND_IMAGE:
+        return "image"
+    return None
@@ -0,0 +1,153 @@
+"""Shared YouTube live-chat watchers with per-video fan-out.
+
+One ``pytchat`` poller runs per ``video_id`` no matter how many sessions
+watch that stream. Sessions subscribe with a callback and get a
+``ChatSubscription`` back; the watcher is started by the first subscriber
+and stopped when the last one closes its subscription.
+
+Chats are ``pytchat.LiveChatAsync``-like: created on the event loop,
+fetching with an async HTTP client in their own task, and ``await
+chat.get()`` returns the next batch as soon as it is fetched, so a poll is
+neither a thread hop nor a fixed sleep. A hub built with ``blocking=True``
+takes synchronous ``pytchat.create``-like chats instead and runs their
+``create``/``get`` calls in the default executor, pacing polls by
+``poll_interval``. Either way fan-out and reference counting stay on the
+event loop, and starting or stopping a watcher never waits on a thread.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# callback(user, message); runs on the event loop and must not block
+ChatCallback = Callable[[str, str], None]
+
+
+class ChatSubscription:
+    __slots__ = ("video_id", "_hub", "_callback")
+
+    def __init__(self, hub: "ChatHub", video_id: str, callback: ChatCallback):
+        self.video_id = video_id
+        self._hub = hub
+        self._callback = callback
+
+    def close(self):
+        """Unsubscribe; stops the watcher if this was the last subscriber."""
+        if self._hub is not None:
+            self._hub._unsubscribe(self)
+            self._hub = None  # type: ignore[assignment]
+
+
+class _VideoWatcher:
+    def __init__(self, hub: "ChatHub", video_id: str):
+        self.hub = hub
+        self.video_id = video_id
+        self.subscribers: List[ChatSubscription] = []
+        self.task: Optional[asyncio.Task] = None
+        self.messages = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    async def _run(self):
+        chat = None
+        blocking = self.hub.blocking
+        try:
+            if blocking:
+                chat = await asyncio.to_thread(self.hub._create, video_id=self.video_id, interruptable=False)
+            else:
+                chat = self.hub._create(video_id=self.video_id, interruptable=False)
+            while self.subscribers and chat.is_alive():
+                if blocking:
+                    items = await asyncio.to_thread(_fetch, chat)
+                else:
+                    # Waits for the chat's own fetch task; an ended chat returns an empty batch
+                    data = await chat.get()
+                    items = [(c.author.name, c.message) for c in getattr(data, "items", ())]
+                self._deliver(items)
+                if blocking:
+                    await asyncio.sleep(self.hub.poll_interval)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"YouTube chat watcher for {self.video_id} failed: {e}")
+        finally:
+            if chat is not None:
+                if blocking:
+                    # terminate() may touch the network; don't hold the loop for it
+                    asyncio.get_running_loop().run_in_executor(None, _terminate, chat)
+                else:
+                    _terminate(chat)
+            self.hub._finished(self)
+
+    def _deliver(self, items: List[Tuple[str, str]]):
+        for user, msg in items:
+            self.messages += 1
+            for sub in list(self.subscribers):
+                try:
+                    sub._callback(user, msg)
+                except Exception as e:
+                    logger.error(f"YouTube chat subscriber error for {self.video_id}: {e}")
+
+
+def _fetch(chat: Any) -> List[Tuple[str, str]]:
+    return [(c.author.name, c.message) for c in chat.get().sync_items()]
+
+
+def _terminate(chat: Any):
+    try:
+        chat.terminate()
+    except Exception:
+        pass
+
+
+class ChatHub:
+    def __init__(self, create: Callable[..., Any], poll_interval: float = 0.1, blocking: bool = False):
+        # create(video_id=..., interruptable=False) -> LiveChatAsync-like chat
+        # (or, with blocking=True, a synchronous pytchat.create-like chat)
+        self._create = create
+        self.poll_interval = poll_interval  # blocking chats only
+        self.blocking = blocking
+        self._watchers: Dict[str, _VideoWatcher] = {}
+
+    def subscribe(self, video_id: str, callback: ChatCallback) -> ChatSubscription:
+        """Receive chat lines for ``video_id``; starts a watcher if needed."""
+        watcher = self._watchers.get(video_id)
+        if watcher is None:
+            watcher = _VideoWatcher(self, video_id)
+            self._watchers[video_id] = watcher
+            watcher.start()
+            logger.info(f"Started YouTube chat watcher for {video_id}")
+        sub = ChatSubscription(self, video_id, callback)
+        watcher.subscribers.append(sub)
+        return sub
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            vid: {"subscribers": len(w.subscribers), "messages": w.messages}
+            for vid, w in self._watchers.items()
+        }
+
+    def _unsubscribe(self, sub: ChatSubscription):
+        watcher = self._watchers.get(sub.video_id)
+        if watcher is None:
+            return
+        try:
+            watcher.subscribers.remove(sub)
+        except ValueError:
+            return
+        if not watcher.subscribers:
+            del self._watchers[sub.video_id]
+            watcher.stop()
+            logger.info(f"Stopped YouTube chat watcher for {sub.video_id}")
+
+    def _finished(self, watcher: _VideoWatcher):
+        # Stream ended or poller failed: forget it so the next subscribe restarts it
+        if self._watchers.get(watcher.video_id) is watcher:
+            del self._watchers[watcher.video_id]
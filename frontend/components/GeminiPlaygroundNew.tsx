@@ -1,7 +1,18 @@
 'use client';
 
 import React, { useState, useRef, useEffect, useCallback } from 'react';
-import { base64ToFloat32Array, float32ToPcm16 } from '@/lib/utils';
+import {
+  base64ToArrayBuffer,
+  base64ToFloat32Array,
+  decodeBinaryFrame,
+  encodeBinaryFrame,
+  float32ToPcm16,
+  mulawBytesToFloat32,
+  pcm16BytesToFloat32,
+  FRAME_FLAG_MULAW,
+  FRAME_KIND_AUDIO,
+  FRAME_KIND_IMAGE,
+} from '@/lib/utils';
 import { Config } from '@/types';
 
 // Import new components
@@ -29,6 +40,8 @@ export default function GeminiVoiceChat() {
 
   // Refs
   const wsRef = useRef<WebSocket | null>(null);
+  // True once the backend acknowledged the binary media frame protocol
+  const binaryProtocolRef = useRef<boolean>(false);
   const audioContextRef = useRef<AudioContext | null>(null);
   const outputGainRef = useRef<GainNode | null>(null);
   const audioInputRef = useRef<{
@@ -70,6 +83,7 @@ export default function GeminiVoiceChat() {
   // Audio processing
   const audioBufferRef = useRef<Float32Array[]>([]);
   const isPlayingRef = useRef<boolean>(false);
+  const currentSourceRef = useRef<AudioBufferSourceNode | null>(null);
   const lastActivitySentAtRef = useRef<number>(0);
   const lastSpeakingRef = useRef<boolean>(false);
 
@@ -170,11 +184,23 @@ export default function GeminiVoiceChat() {
       source.connect(audioContextRef.current.destination);
     }
     source.onended = () => {
+      if (currentSourceRef.current !== source) return; // stopped by flushPlayback
+      currentSourceRef.current = null;
       playNextInQueue();
     };
+    currentSourceRef.current = source;
     source.start();
   };
 
+  // Barge-in: drop everything the model was still going to say
+  const flushPlayback = () => {
+    audioBufferRef.current = [];
+    const source = currentSourceRef.current;
+    currentSourceRef.current = null;
+    isPlayingRef.current = false;
+    try { source?.stop(); } catch (e) {}
+  };
+
   // Connection functions
   const kickOffLatencyPings = useCallback(() => {
     if (latencyTimerRef.current) {
@@ -240,13 +266,17 @@ export default function GeminiVoiceChat() {
 
           if (!muted) {
             const pcmData = float32ToPcm16(new Float32Array(inputData));
-            const base64Data = btoa(String.fromCharCode(...new Uint8Array(pcmData.buffer)));
-            wsRef.current.send(
-              JSON.stringify({
-                type: 'audio',
-                data: base64Data,
-              }),
-            );
+            if (binaryProtocolRef.current) {
+              wsRef.current.send(encodeBinaryFrame(FRAME_KIND_AUDIO, pcmData));
+            } else {
+              const base64Data = btoa(String.fromCharCode(...new Uint8Array(pcmData.buffer)));
+              wsRef.current.send(
+                JSON.stringify({
+                  type: 'audio',
+                  data: base64Data,
+                }),
+              );
+            }
           }
 
           const speaking = rms > 0.02;
@@ -280,12 +310,17 @@ export default function GeminiVoiceChat() {
     }
 
     wsRef.current = new WebSocket(`ws://localhost:8000/ws/${clientId.current}`);
+    wsRef.current.binaryType = 'arraybuffer';
+    binaryProtocolRef.current = false;
 
     wsRef.current.onopen = async () => {
       wsRef.current?.send(
         JSON.stringify({
           type: 'config',
           config: config,
+          protocol: 'binary',
+          // Half the downstream bytes of raw PCM16, in evenly sized packets
+          audioEncoding: 'mulaw',
         }),
       );
 
@@ -303,10 +338,27 @@ export default function GeminiVoiceChat() {
     };
 
     wsRef.current.onmessage = async (event: MessageEvent) => {
+      if (event.data instanceof ArrayBuffer) {
+        const frame = decodeBinaryFrame(event.data);
+        if (frame && frame.kind === FRAME_KIND_AUDIO) {
+          playAudioData(
+            frame.flags & FRAME_FLAG_MULAW
+              ? mulawBytesToFloat32(frame.payload)
+              : pcm16BytesToFloat32(frame.payload),
+          );
+        }
+        return;
+      }
       const response = JSON.parse(event.data as string);
-      if (response.type === 'audio') {
-        const audioData = base64ToFloat32Array(response.data);
+      if (response.type === 'protocol') {
+        binaryProtocolRef.current = response.data === 'binary';
+      } else if (response.type === 'audio') {
+        const audioData = response.encoding === 'mulaw'
+          ? mulawBytesToFloat32(base64ToArrayBuffer(response.data))
+          : base64ToFloat32Array(response.data);
         playAudioData(audioData);
+      } else if (response.type === 'interrupted') {
+        flushPlayback();
       } else if (response.type === 'text') {
         const incoming = response.text ?? response.data;
         if (incoming) setText((prev) => prev + incoming + '\\n');
@@ -332,7 +384,10 @@ export default function GeminiVoiceChat() {
       setIsStreaming(false);
     };
 
-    wsRef.current.onclose = () => {
+    wsRef.current.onclose = (event: CloseEvent) => {
+      if (event.code === 1013) {
+        setError('Server is busy, please try again in a moment');
+      }
       setIsStreaming(false);
       setIsConnected(false);
       stopLatencyPings();
@@ -408,6 +463,13 @@ export default function GeminiVoiceChat() {
     canvasRef.current.height = videoRef.current.videoHeight;
 
     context.drawImage(videoRef.current, 0, 0);
+    if (binaryProtocolRef.current) {
+      canvasRef.current.toBlob(async (blob) => {
+        if (!blob || !wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) return;
+        wsRef.current.send(encodeBinaryFrame(FRAME_KIND_IMAGE, await blob.arrayBuffer()));
+      }, 'image/jpeg');
+      return;
+    }
     const base64Image = canvasRef.current.toDataURL('image/jpeg').split(',')[1];
 
     wsRef.current.send(JSON.stringify({
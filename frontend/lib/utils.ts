@@ -37,6 +37,80 @@ export const base64ToFloat32Array = (base64: string): Float32Array => {
   }
 };
 
+// Binary frame protocol (see backend/wire_protocol.py):
+// 4-byte header [version u8][kind u8][flags u16 big-endian] followed by raw payload
+export const FRAME_VERSION = 1;
+export const FRAME_KIND_AUDIO = 0x01;
+export const FRAME_KIND_IMAGE = 0x02;
+// Audio payload is G.711 mu-law instead of PCM16 (negotiated with audioEncoding: 'mulaw')
+export const FRAME_FLAG_MULAW = 0x0001;
+const FRAME_HEADER_SIZE = 4;
+
+export const encodeBinaryFrame = (kind: number, payload: ArrayBuffer | ArrayBufferView, flags: number = 0): ArrayBuffer => {
+  const body = payload instanceof ArrayBuffer
+    ? new Uint8Array(payload)
+    : new Uint8Array(payload.buffer, payload.byteOffset, payload.byteLength);
+  const frame = new Uint8Array(FRAME_HEADER_SIZE + body.byteLength);
+  const view = new DataView(frame.buffer);
+  view.setUint8(0, FRAME_VERSION);
+  view.setUint8(1, kind);
+  view.setUint16(2, flags);
+  frame.set(body, FRAME_HEADER_SIZE);
+  return frame.buffer;
+};
+
+export const decodeBinaryFrame = (frame: ArrayBuffer): { kind: number; flags: number; payload: ArrayBuffer } | null => {
+  if (frame.byteLength < FRAME_HEADER_SIZE) return null;
+  const view = new DataView(frame);
+  if (view.getUint8(0) !== FRAME_VERSION) return null;
+  return {
+    kind: view.getUint8(1),
+    flags: view.getUint16(2),
+    payload: frame.slice(FRAME_HEADER_SIZE),
+  };
+};
+
+// Convert raw little-endian PCM16 bytes to Float32Array
+export const pcm16BytesToFloat32 = (bytes: ArrayBuffer): Float32Array => {
+  const pcm16 = new Int16Array(bytes, 0, Math.floor(bytes.byteLength / 2));
+  const float32 = new Float32Array(pcm16.length);
+  for (let i = 0; i < pcm16.length; i++) {
+    float32[i] = pcm16[i] / 32768.0;
+  }
+  return float32;
+};
+
+// G.711 mu-law (see backend/audio_codec.py): one byte per sample, decoded via a 256-entry table
+const MULAW_DECODE_TABLE: Float32Array = (() => {
+  const table = new Float32Array(256);
+  for (let i = 0; i < 256; i++) {
+    const u = ~i & 0xFF;
+    const exponent = (u >> 4) & 0x07;
+    const mantissa = u & 0x0F;
+    const magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84;
+    table[i] = (u & 0x80 ? -magnitude : magnitude) / 32768.0;
+  }
+  return table;
+})();
+
+export const mulawBytesToFloat32 = (bytes: ArrayBuffer): Float32Array => {
+  const encoded = new Uint8Array(bytes);
+  const float32 = new Float32Array(encoded.length);
+  for (let i = 0; i < encoded.length; i++) {
+    float32[i] = MULAW_DECODE_TABLE[encoded[i]];
+  }
+  return float32;
+};
+
+export const base64ToArrayBuffer = (base64: string): ArrayBuffer => {
+  const binary = atob(base64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes.buffer;
+};
+
 // Audio utility functions
 export const calculateRMS = (audioData: Float32Array): number => {
   let sumSq = 0;